@@ -1,9 +1,24 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response
 from utils.response_generator import ResponseGenerator
+from utils.instrumentation import metrics, get_logger
+from utils.session_store import new_session_id, valid_session_id
 import os
 
+log = get_logger('app')
+
 app = Flask(__name__)
 
+# Upper bound on messages accepted by /chat/batch
+MAX_BATCH_SIZE = 1000
+
+# Longest message (in characters) and session id accepted from clients
+MAX_MESSAGE_LENGTH = 2000
+MAX_SESSION_ID_LENGTH = 64
+
+# Conversations are tracked per session: a "session_id" in the request body,
+# else this cookie, which is set on the first reply
+SESSION_COOKIE = 'chatbot_session'
+
 # Initialize the chatbot
 try:
     response_generator = ResponseGenerator(
@@ -15,6 +30,20 @@ except Exception as e:
     print(f"Error initializing chatbot: {e}")
     response_generator = None
 
+def request_session_id(payload):
+    """Session id from the body, else the cookie; malformed ids get a fresh one"""
+    for session_id in (payload.get('session_id'), request.cookies.get(SESSION_COOKIE)):
+        if session_id:
+            return session_id if valid_session_id(session_id) else new_session_id()
+    return new_session_id()
+
+def with_session(payload, session_id):
+    """JSON response carrying the session id, in the body and as a cookie"""
+    payload['session_id'] = session_id
+    response = jsonify(payload)
+    response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite='Lax')
+    return response
+
 @app.route('/')
 def home():
     """Home page with chat interface"""
@@ -27,19 +56,54 @@ def chat():
         return jsonify({'response': 'Chatbot is not initialized properly. Please check the console for errors.'})
     
     try:
-        user_input = request.json.get('message', '')
+        payload = request.json
+        user_input = payload.get('message', '')
         if not user_input:
             return jsonify({'response': 'Please enter a message.'})
+        if not isinstance(user_input, str) or len(user_input) > MAX_MESSAGE_LENGTH:
+            return jsonify({'response': f'Please send a text message of at most {MAX_MESSAGE_LENGTH} characters.'}), 400
+        session_id = payload.get('session_id')
+        if session_id is not None and (not isinstance(session_id, str) or len(session_id) > MAX_SESSION_ID_LENGTH):
+            return jsonify({'response': 'Invalid session_id.'}), 400
         
-        print(f"User: {user_input}")
-        response = response_generator.process_input(user_input)
-        print(f"Bot: {response}")
+        session_id = request_session_id(payload)
+        response = response_generator.process_input(user_input, session_id)
+        log.info("User: %s | Bot: %s", user_input, response)
         
-        return jsonify({'response': response})
+        return with_session({'response': response}, session_id)
     except Exception as e:
-        print(f"Error in chat endpoint: {e}")
+        log.error("Error in chat endpoint: %s", e, exc_info=True)
+        metrics.increment('request_errors')
         return jsonify({'response': 'Sorry, I encountered an error processing your message.'})
 
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """Handle many chat messages in one request, e.g. log replays and bulk evaluations"""
+    if response_generator is None:
+        return jsonify({'responses': [], 'error': 'Chatbot is not initialized properly. Please check the console for errors.'})
+    
+    payload = request.json or {}
+    messages = payload.get('messages')
+    if not isinstance(messages, list) or not all(isinstance(m, str) for m in messages):
+        return jsonify({'responses': [], 'error': 'Please send a list of messages.'}), 400
+    if len(messages) > MAX_BATCH_SIZE:
+        return jsonify({'responses': [], 'error': f'At most {MAX_BATCH_SIZE} messages per batch.'}), 400
+    
+    # Optional per-message "session_ids"; otherwise every message is stateless
+    session_ids = payload.get('session_ids')
+    if session_ids is not None and (not isinstance(session_ids, list) or len(session_ids) != len(messages)
+                                    or not all(s is None or valid_session_id(s) for s in session_ids)):
+        return jsonify({'responses': [], 'error': 'session_ids must be a list with one id (or null) per message.'}), 400
+    
+    try:
+        responses = response_generator.process_batch(messages, session_ids=session_ids)
+        log.info("Processed batch of %d messages", len(messages))
+        return jsonify({'responses': responses})
+    except Exception as e:
+        log.error("Error in batch chat endpoint: %s", e, exc_info=True)
+        metrics.increment('request_errors')
+        return jsonify({'responses': [], 'error': 'Sorry, I encountered an error processing your messages.'}), 500
+
 @app.route('/health')
 def health():
     """Health check endpoint"""
@@ -48,6 +112,13 @@ def health():
         'chatbot_initialized': response_generator is not None
     })
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Per-stage latency histograms and counters (Prometheus text, or ?format=json)"""
+    if request.args.get('format') == 'json':
+        return jsonify(metrics.snapshot())
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     # Create templates directory if it doesn't exist
     if not os.path.exists('templates'):
@@ -0,0 +1,146 @@
+"""Production entry point: serves the chatbot over ASGI with micro-batched /chat.
+
+Run with:  uvicorn asgi:app --host 0.0.0.0 --port 8080
+      or:  python asgi.py
+
+Incoming /chat requests are queued and grouped into micro-batches (all
+requests that arrive within CHATBOT_BATCH_WINDOW_MS of the first one, up to
+CHATBOT_MAX_BATCH_SIZE), classified with one model call per batch, and each
+request's future is resolved with its own response. Every other route is
+served by the Flask app from app.py.
+"""
+import asyncio
+import json
+import os
+from http.cookies import SimpleCookie
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app as flask_app, response_generator, SESSION_COOKIE, MAX_MESSAGE_LENGTH, MAX_SESSION_ID_LENGTH
+from utils.micro_batcher import MicroBatcher
+from utils.instrumentation import metrics, get_logger
+from utils.session_store import new_session_id, valid_session_id
+
+log = get_logger('asgi')
+
+BATCH_WINDOW_MS = float(os.environ.get('CHATBOT_BATCH_WINDOW_MS', '5'))
+MAX_BATCH_SIZE = int(os.environ.get('CHATBOT_MAX_BATCH_SIZE', '64'))
+
+
+class ChatASGIApp:
+    def __init__(self, wsgi_app, response_generator, window_ms=BATCH_WINDOW_MS, max_batch_size=MAX_BATCH_SIZE):
+        self.fallback = WsgiToAsgi(wsgi_app)
+        self.response_generator = response_generator
+        self.batcher = None
+        if response_generator is not None:
+            self.batcher = MicroBatcher(self._process_batch, window_ms=window_ms, max_batch_size=max_batch_size)
+
+    def _process_batch(self, items):
+        """Batch of (message, session_id) pairs, which may come from many users"""
+        messages = [message for message, _ in items]
+        return self.response_generator.process_batch(messages, session_ids=[session_id for _, session_id in items])
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http' and scope['path'] == '/chat' and scope['method'] == 'POST':
+            await self._chat(scope, receive, send)
+        else:
+            await self.fallback(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.batcher is not None:
+                    # Load NLTK, the model and the index before accepting traffic
+                    await asyncio.get_running_loop().run_in_executor(None, self._warmup)
+                    self.batcher.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.batcher is not None:
+                    await asyncio.get_running_loop().run_in_executor(None, self.batcher.stop)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _warmup(self):
+        try:
+            timings = self.response_generator.warmup()
+            print("Warmed up: " + ', '.join(f'{name} {seconds:.2f}s' for name, seconds in timings.items()))
+        except Exception as e:
+            # Not fatal: whatever failed is loaded (or downloaded) on first use instead
+            log.warning("Warmup failed, continuing without it: %s", e)
+
+    @staticmethod
+    def _cookie_session_id(scope):
+        for name, value in scope.get('headers', []):
+            if name == b'cookie':
+                morsel = SimpleCookie(value.decode('latin-1')).get(SESSION_COOKIE)
+                if morsel is not None:
+                    return morsel.value
+        return None
+
+    async def _chat(self, scope, receive, send):
+        """Same contract as the Flask /chat route, but batched"""
+        if self.batcher is None:
+            await self._send_json(send, {'response': 'Chatbot is not initialized properly. Please check the console for errors.'})
+            return
+
+        body = b''
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+        try:
+            payload = json.loads(body or b'{}')
+            user_input = payload.get('message', '')
+        except (ValueError, AttributeError):
+            await self._send_json(send, {'response': 'Please enter a message.'}, status=400)
+            return
+        if not user_input:
+            await self._send_json(send, {'response': 'Please enter a message.'})
+            return
+        # Checked before batching: a bad item must not reach other users' batch
+        if not isinstance(user_input, str) or len(user_input) > MAX_MESSAGE_LENGTH:
+            await self._send_json(send, {'response': f'Please send a text message of at most {MAX_MESSAGE_LENGTH} characters.'},
+                                  status=400)
+            return
+        session_id = payload.get('session_id')
+        if session_id is not None and (not isinstance(session_id, str) or len(session_id) > MAX_SESSION_ID_LENGTH):
+            await self._send_json(send, {'response': 'Invalid session_id.'}, status=400)
+            return
+
+        session_id = session_id or self._cookie_session_id(scope)
+        if not valid_session_id(session_id):
+            session_id = new_session_id()
+        try:
+            response = await asyncio.wrap_future(self.batcher.submit((user_input, session_id)))
+        except Exception as e:
+            log.error("Error in chat endpoint: %s", e, exc_info=True)
+            metrics.increment('request_errors')
+            response = 'Sorry, I encountered an error processing your message.'
+        cookie = f'{SESSION_COOKIE}={session_id}; HttpOnly; SameSite=Lax; Path=/'.encode('latin-1')
+        await self._send_json(send, {'response': response, 'session_id': session_id},
+                              headers=[(b'set-cookie', cookie)])
+
+    async def _send_json(self, send, payload, status=200, headers=()):
+        body = json.dumps(payload).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'),
+                        (b'content-length', str(len(body)).encode('ascii')), *headers],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+app = ChatASGIApp(flask_app, response_generator)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print("Starting ASGI server with micro-batching...")
+    print("Open http://localhost:8080 in your browser")
+    uvicorn.run(app, host='0.0.0.0', port=8080)
@@ -0,0 +1,315 @@
+"""Benchmark and regression check for the chatbot hot path.
+
+Drives ResponseGenerator.process_input and the Flask /chat endpoint (through
+the test client, so no server or network is needed) with a synthetic
+message corpus built from data/intents.json. Web search is answered by a
+local stub backend and a throwaway answer cache, so results do not depend
+on Google/Wikipedia; the offline knowledge index is the real one.
+
+Reports, per scenario: messages/sec, end-to-end p50/p95/p99 latency and the
+per-stage count/mean/p50/p95/p99 from utils.instrumentation (histogram
+bucket bounds); plus cold-start time (fresh interpreter: imports, model
+load, first reply) and peak RSS.
+
+    python benchmarks/hot_path.py --update-baseline   # record benchmarks/baseline.json
+    python benchmarks/hot_path.py                     # compare, exit 1 on regression
+
+A metric regresses when it is more than --tolerance (default 25%) worse
+than the baseline. A missing baseline exits with status 2, so a CI job
+without one cannot pass by accident; pass --allow-missing-baseline to only
+print the report.
+
+Baselines are machine specific, so none is committed: record one on the
+machine that runs the comparison. In CI, record it on the same runner from
+the target branch before checking the change:
+
+    git worktree add /tmp/base "$BASE_REF"      # e.g. origin/main
+    python /tmp/base/Chatbot/benchmarks/hot_path.py --update-baseline --baseline /tmp/baseline.json
+    python benchmarks/hot_path.py --baseline /tmp/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+CHATBOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(CHATBOT_DIR)
+
+DEFAULT_BASELINE = os.path.join(CHATBOT_DIR, 'benchmarks', 'baseline.json')
+
+# Keep the benchmark's search answers out of the real on-disk answer cache
+os.environ.setdefault('CHATBOT_ANSWER_CACHE', os.path.join(tempfile.mkdtemp(prefix='chatbot-bench-'), 'cache.sqlite'))
+
+FILLERS = ['', 'please ', 'hey, ', 'so ', 'ok ', 'um ']
+ENDINGS = ['', '', '?', '!', '.', ' please']
+
+COLD_START_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+from utils.response_generator import ResponseGenerator
+imported = time.perf_counter()
+sys.path.insert(0, 'benchmarks')
+from hot_path import stub_web_search
+stub_web_search()
+generator = ResponseGenerator(intents_path='data/intents.json', model_path='models/intent_classifier.h5')
+initialized = time.perf_counter()
+generator.process_input(sys.argv[1])
+replied = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - start,
+    'init_s': initialized - imported,
+    'first_reply_s': replied - initialized,
+    'total_s': replied - start,
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10),
+}))
+"""
+
+# Metrics where higher is better; everything else is compared lower-is-better
+HIGHER_IS_BETTER = {'msgs_per_sec'}
+
+# Latencies this close to the baseline are noise, however large the ratio
+MIN_DELTA_MS = 0.1
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def synthetic_corpus(num_messages, num_sessions=50, seed=0):
+    """(message, session_id) pairs: intent patterns with filler words, casing and
+    punctuation varied, and weather questions followed up by a city in the same session"""
+    with open(os.path.join(CHATBOT_DIR, 'data', 'intents.json'), 'r') as file:
+        intents = json.load(file)['intents']
+    patterns = [pattern for intent in intents for pattern in intent['patterns']]
+    weather = next((intent['patterns'] for intent in intents if intent['tag'] == 'weather'), None)
+    cities = ['London', 'Paris', 'Tokyo', 'New York', 'Bologna']
+
+    rng = random.Random(seed)
+    corpus = []
+    while len(corpus) < num_messages:
+        session_id = f'bench-{rng.randrange(num_sessions)}'
+        if weather and rng.random() < 0.05:
+            corpus.append((rng.choice(weather), session_id))
+            corpus.append((f"and in {rng.choice(cities)}", session_id))
+            continue
+        message = rng.choice(FILLERS) + rng.choice(patterns) + rng.choice(ENDINGS)
+        if rng.random() < 0.3:
+            message = message.lower()
+        corpus.append((message, session_id))
+    return corpus[:num_messages]
+
+
+def stub_web_search(latency_ms=0.0):
+    """Point ResponseGenerator at a WebSearch whose only remote backend is a local stub"""
+    import utils.response_generator
+    from utils.search_backends import SearchBackend, SearchResult
+    from utils.web_search import WebSearch
+    from utils.answer_cache import AnswerCache
+
+    class StubBackend(SearchBackend):
+        name = 'stub'
+
+        def search(self, query):
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            return SearchResult(f"Stub answer for: {query}", 0.5, self.name)
+
+    utils.response_generator.web_searcher = WebSearch(backends=[StubBackend()], cache=AnswerCache())
+
+
+def run_scenario(name, send, corpus, warmup, search_latency_ms=0.0):
+    """Time `send(message, session_id)` over the corpus after its first `warmup` messages.
+
+    Each scenario starts from an empty answer cache.
+    """
+    from utils.instrumentation import metrics
+
+    stub_web_search(search_latency_ms)
+    for message, session_id in corpus[:warmup]:
+        send(message, session_id)
+    metrics.reset()
+
+    timed = corpus[warmup:]
+    latencies = []
+    start = time.perf_counter()
+    for message, session_id in timed:
+        t0 = time.perf_counter()
+        send(message, session_id)
+        latencies.append(time.perf_counter() - t0)
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    snapshot = metrics.snapshot()
+    return {
+        'scenario': name,
+        'messages': len(timed),
+        'msgs_per_sec': len(timed) / wall if wall > 0 else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'stages': snapshot['stages'],
+        'counters': snapshot['counters'],
+    }
+
+
+def measure_cold_start(message='how is the weather today'):
+    """Imports, model load and first reply in a fresh interpreter"""
+    output = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT, message], cwd=CHATBOT_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    # The chatbot prints while loading; the measurement is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_benchmarks(num_messages, warmup, search_latency_ms, seed, cold_start=True):
+    os.chdir(CHATBOT_DIR)
+    results = {'cold_start': measure_cold_start() if cold_start else None}
+
+    from utils.response_generator import ResponseGenerator
+    import app as chat_app
+
+    corpus = synthetic_corpus(warmup + num_messages, seed=seed)
+    generator = ResponseGenerator(intents_path='data/intents.json', model_path='models/intent_classifier.h5')
+    scenarios = [run_scenario('process_input', generator.process_input, corpus, warmup, search_latency_ms)]
+
+    if chat_app.response_generator is None:
+        print("Skipping /chat: the app's chatbot failed to initialize")
+    else:
+        client = chat_app.app.test_client()
+
+        def post_chat(message, session_id):
+            response = client.post('/chat', json={'message': message, 'session_id': session_id})
+            if response.status_code != 200:
+                raise RuntimeError(f"/chat returned {response.status_code}")
+
+        scenarios.append(run_scenario('/chat', post_chat, corpus, warmup, search_latency_ms))
+
+    results['scenarios'] = {scenario['scenario']: scenario for scenario in scenarios}
+    results['peak_rss_mb'] = peak_rss_mb()
+    results['environment'] = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'messages': num_messages,
+        'search_latency_ms': search_latency_ms,
+    }
+    return results
+
+
+def regression_metrics(results):
+    """Flat name -> value map of the numbers compared against the baseline"""
+    values = {'peak_rss_mb': results['peak_rss_mb']}
+    if results.get('cold_start'):
+        values['cold_start.total_s'] = results['cold_start']['total_s']
+    for name, scenario in results['scenarios'].items():
+        for key in ('msgs_per_sec', 'p50_ms', 'p95_ms', 'p99_ms'):
+            values[f'{name}.{key}'] = scenario[key]
+        # Means are exact (sum/count); the stage percentiles are bucket bounds
+        for stage, stats in scenario['stages'].items():
+            if stats['mean_ms'] is not None:
+                values[f'{name}.stage.{stage}.mean_ms'] = stats['mean_ms']
+    return values
+
+
+def compare(results, baseline, tolerance):
+    """[(metric, baseline, current, change)] for metrics worse than the baseline by more than `tolerance`
+    (and, for latencies, by more than MIN_DELTA_MS)"""
+    current = regression_metrics(results)
+    previous = regression_metrics(baseline)
+    regressions = []
+    for metric, old in sorted(previous.items()):
+        new = current.get(metric)
+        if new is None or not old:
+            continue
+        key = metric.rsplit('.', 1)[-1]
+        change = (old - new) / old if key in HIGHER_IS_BETTER else (new - old) / old
+        if key.endswith('_ms') and new - old < MIN_DELTA_MS:
+            continue
+        if change > tolerance:
+            regressions.append((metric, old, new, change))
+    return regressions
+
+
+def format_ms(value):
+    return f"{value:8.2f}" if value is not None else f"{'-':>8}"
+
+
+def print_report(results):
+    cold = results.get('cold_start')
+    if cold:
+        print(f"Cold start: {cold['total_s']:.2f}s (imports {cold['import_s']:.2f}s, "
+              f"init {cold['init_s']:.2f}s, first reply {cold['first_reply_s']:.2f}s), "
+              f"peak RSS {cold['peak_rss_mb']:.0f} MB")
+    print(f"Peak RSS of the benchmark process: {results['peak_rss_mb']:.0f} MB")
+    for name, scenario in results['scenarios'].items():
+        print(f"\n{name}: {scenario['messages']} messages, {scenario['msgs_per_sec']:.1f} msgs/s, "
+              f"p50 {scenario['p50_ms']:.2f} ms, p95 {scenario['p95_ms']:.2f} ms, p99 {scenario['p99_ms']:.2f} ms")
+        print(f"  {'stage':<16} {'count':>7} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for stage, stats in scenario['stages'].items():
+            print(f"  {stage:<16} {stats['count']:>7} {format_ms(stats['mean_ms'])} {format_ms(stats['p50_ms'])} "
+                  f"{format_ms(stats['p95_ms'])} {format_ms(stats['p99_ms'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=2000, help='Timed messages per scenario')
+    parser.add_argument('--warmup', type=int, default=200, help='Untimed messages before each scenario')
+    parser.add_argument('--search-latency-ms', type=float, default=0.0, help='Simulated latency of the stub search backend')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic corpus')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--update-baseline', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown as a fraction of the baseline')
+    parser.add_argument('--allow-missing-baseline', action='store_true',
+                        help='Exit 0 instead of 2 when there is no baseline to compare against')
+    parser.add_argument('--no-cold-start', action='store_true', help='Skip the fresh-interpreter cold start measurement')
+    parser.add_argument('--json', help='Also write the full results to this file')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.messages, args.warmup, args.search_latency_ms, args.seed,
+                             cold_start=not args.no_cold_start)
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0 if args.allow_missing_baseline else 2
+
+    with open(args.baseline, 'r') as file:
+        baseline = json.load(file)
+    if baseline.get('environment', {}).get('messages') != args.messages:
+        print(f"\nWarning: baseline was recorded with {baseline.get('environment', {}).get('messages')} messages")
+
+    regressions = compare(results, baseline, args.tolerance)
+    if not regressions:
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+        return 0
+
+    print(f"\nPERFORMANCE REGRESSION against {args.baseline} (tolerance {args.tolerance:.0%}):")
+    for metric, old, new, change in regressions:
+        print(f"  {metric:<48} {old:>10.2f} -> {new:>10.2f}  ({change:+.0%} worse)")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Import-time report for the chatbot entry points.
+
+Imports each module in a fresh interpreter with `python -X importtime`
+and reports the wall time plus the slowest top-level packages (the
+import time of all their modules, excluding what they import from other
+packages), e.g. to check that NLTK, TensorFlow or the search
+clients are not loaded at startup:
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --module app --module main --top 15
+
+Pass --compare DIR to run the same imports in another checkout (e.g. one
+made with `git worktree add /tmp/before HEAD~1`) and print the before/after wall times.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+CHATBOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ['utils.response_generator', 'main', 'app']
+
+SCRIPT = """
+import sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+print(f"WALL {time.perf_counter() - start}")
+"""
+
+
+def measure_imports(module, chatbot_dir=CHATBOT_DIR):
+    """(wall seconds, {top-level package: seconds}) for importing `module` in a fresh interpreter"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', SCRIPT, module], cwd=chatbot_dir,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed in {chatbot_dir}:\n{result.stderr[-2000:]}")
+
+    wall = next(float(line.split()[1]) for line in result.stdout.splitlines() if line.startswith('WALL '))
+    packages = {}
+    # Lines look like "import time: self [us] | cumulative | imported package";
+    # summing the self times per package never counts a nested import twice
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1e6
+    return wall, packages
+
+
+def print_report(module, wall, packages, top):
+    print(f"import {module}: {wall:.3f}s")
+    for package, seconds in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:<28} {seconds:7.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', action='append', help='Module to import (repeatable)')
+    parser.add_argument('--top', type=int, default=10, help='Packages listed per module')
+    parser.add_argument('--compare', help='Another Chatbot checkout to measure the same imports in')
+    args = parser.parse_args()
+
+    for module in args.module or DEFAULT_MODULES:
+        wall, packages = measure_imports(module)
+        if args.compare:
+            before, _ = measure_imports(module, args.compare)
+            print(f"import {module}: {before:.3f}s in {args.compare} -> {wall:.3f}s here "
+                  f"({(before - wall) / before:.0%} faster)")
+        print_report(module, wall, packages, args.top)
+        print()
+
+
+if __name__ == '__main__':
+    main()
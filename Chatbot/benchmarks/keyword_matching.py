@@ -0,0 +1,112 @@
+"""Micro-benchmark for the keyword heuristics in ResponseGenerator.
+
+Compares the per-message cost of the original implementation (a fresh list
+and an `any(word in text)` scan per helper, with is_question evaluated up
+to four times per message by process_input) against KeywordMatcher, which
+finds every category in one pass over a single compiled regex.
+
+    python benchmarks/keyword_matching.py
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+CHATBOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(CHATBOT_DIR)
+
+from utils.keyword_matcher import KeywordMatcher
+
+
+def legacy_categories(text):
+    """The heuristics as process_input used to evaluate them"""
+    def is_question(text):
+        question_words = ['what', 'who', 'when', 'where', 'why', 'how', 'which', '?',
+                         'explain', 'tell me', 'can you', 'could you', 'would you']
+        text_lower = text.lower()
+        return any(word in text_lower for word in question_words)
+
+    def is_greeting(text):
+        greetings = ['hello', 'hi', 'hey', 'hola', 'greetings', 'good morning',
+                    'good afternoon', 'good evening', 'howdy', 'sup', 'yo',
+                    'what\'s up', 'good day', 'hello there', 'hi there']
+        text_lower = text.lower()
+        return any(greeting in text_lower for greeting in greetings)
+
+    def is_thanks(text):
+        thanks_words = ['thank', 'thanks', 'appreciate', 'grateful', 'cheers']
+        text_lower = text.lower()
+        return any(word in text_lower for word in thanks_words)
+
+    def is_goodbye(text):
+        goodbye_words = ['bye', 'goodbye', 'see you', 'farewell', 'later',
+                        'take care', 'adios', 'ciao', 'so long']
+        text_lower = text.lower()
+        return any(word in text_lower for word in goodbye_words)
+
+    def has_search_pattern(text):
+        search_patterns = [
+            'how to', 'what is', 'who is', 'when did', 'where is',
+            'why does', 'explain', 'tell me about', 'can you tell me'
+        ]
+        text_lower = text.lower()
+        return any(pattern in text_lower for pattern in search_patterns)
+
+    categories = set()
+    if is_greeting(text):
+        categories.add('greeting')
+    if is_thanks(text):
+        categories.add('thanks')
+    if is_goodbye(text):
+        categories.add('goodbye')
+    # handle_short_message, process_input (twice) and should_search_web
+    for _ in range(4):
+        if is_question(text):
+            categories.add('question')
+    if has_search_pattern(text):
+        categories.add('search')
+    return categories
+
+
+def load_messages():
+    with open(os.path.join(CHATBOT_DIR, 'data', 'intents.json'), 'r') as file:
+        data = json.load(file)
+    return [pattern for intent in data['intents'] for pattern in intent['patterns']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200, help='Passes over the message corpus')
+    args = parser.parse_args()
+
+    messages = load_messages()
+    matcher = KeywordMatcher.from_file(os.path.join(CHATBOT_DIR, 'data', 'keywords.json'))
+
+    for message in messages:
+        assert matcher.match(message) == legacy_categories(message), message
+
+    def run_legacy():
+        for message in messages:
+            legacy_categories(message)
+
+    def run_matcher():
+        # Bypass the memo cache to time the single regex pass itself
+        for message in messages:
+            matcher._match(message)
+
+    def run_matcher_cached():
+        for message in messages:
+            matcher.match(message)
+
+    total = len(messages) * args.repeat
+    print(f"{len(messages)} messages x {args.repeat} passes")
+    for name, func in [('before: per-helper scans', run_legacy),
+                       ('after: one compiled pass', run_matcher),
+                       ('after: repeated message (memoized)', run_matcher_cached)]:
+        seconds = timeit.timeit(func, number=args.repeat)
+        print(f"{name:<36} {seconds / total * 1e6:8.2f} us/message")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Load test for the chatbot /chat endpoint.
+
+Sends messages from concurrent client threads and reports throughput and
+p50/p90/p99 latency for each server URL given, e.g. to compare the Flask
+dev server with the micro-batched ASGI server:
+
+    python app.py                                   # port 8080
+    uvicorn asgi:app --port 8081
+    python benchmarks/load_test.py --url http://localhost:8080 --url http://localhost:8081
+
+By default the messages are the patterns from data/intents.json. Pass
+--messages-file (one message per line) to replay your own traffic.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import urllib.request
+
+CHATBOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_messages(messages_file=None):
+    if messages_file:
+        with open(messages_file, 'r') as file:
+            return [line.strip() for line in file if line.strip()]
+    with open(os.path.join(CHATBOT_DIR, 'data', 'intents.json'), 'r') as file:
+        data = json.load(file)
+    return [pattern for intent in data['intents'] for pattern in intent['patterns']]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def post_message(url, message, timeout):
+    request = urllib.request.Request(
+        url.rstrip('/') + '/chat',
+        data=json.dumps({'message': message}).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+
+
+def run_load(url, messages, num_requests, concurrency, timeout=30.0, seed=0):
+    rng = random.Random(seed)
+    workload = [rng.choice(messages) for _ in range(num_requests)]
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    next_index = [0]
+
+    def worker():
+        while True:
+            with lock:
+                if next_index[0] >= len(workload):
+                    return
+                message = workload[next_index[0]]
+                next_index[0] += 1
+            start = time.perf_counter()
+            try:
+                post_message(url, message, timeout)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'url': url,
+        'requests': len(latencies),
+        'errors': errors[0],
+        'throughput': len(latencies) / wall if wall > 0 else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p90_ms': percentile(latencies, 90) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', action='append', help='Server base URL (repeat to compare servers)')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per server')
+    parser.add_argument('--concurrency', type=int, default=32, help='Concurrent client threads')
+    parser.add_argument('--messages-file', help='File with one message per line')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds')
+    args = parser.parse_args()
+
+    urls = args.url or ['http://localhost:8080']
+    messages = load_messages(args.messages_file)
+
+    print(f"{'server':<32} {'ok':>6} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    for url in urls:
+        result = run_load(url, messages, args.requests, args.concurrency, args.timeout)
+        print(f"{result['url']:<32} {result['requests']:>6} {result['errors']:>5} "
+              f"{result['throughput']:>8.1f} {result['p50_ms']:>8.1f} {result['p90_ms']:>8.1f} {result['p99_ms']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
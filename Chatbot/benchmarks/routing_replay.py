@@ -0,0 +1,151 @@
+"""Replay traffic through the legacy and calibrated routing policies and compare them.
+
+Every message goes through the same heuristics and classifier as
+process_input, then each policy decides between answering from the
+predicted intent and falling back to web search (no search is actually
+run). Reports, per policy: the search fallback rate, the share of
+replies answered from intents, estimated mean latency (measured
+classification time plus --search-latency-ms per search, an assumed cost)
+and, when messages are labeled, routing accuracy and the precision of
+intent answers.
+
+    python benchmarks/routing_replay.py                        # intents.json patterns
+    python benchmarks/routing_replay.py --traffic chats.jsonl --show 20
+
+--traffic takes JSONL ({"message": ..., "label": <intent tag or "search">},
+label optional) or plain text with one message per line. The default
+traffic is the intents.json patterns labeled with their tags; most were
+training data, so its accuracy is optimistic for both policies.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+CHATBOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(CHATBOT_DIR)
+
+from utils.routing import RoutingPolicy, LegacyPolicy, SEARCH_INTENTS
+
+SEARCH = 'search'
+
+
+def load_traffic(path=None):
+    """[(message, label or None)]"""
+    if path is None:
+        with open(os.path.join(CHATBOT_DIR, 'data', 'intents.json'), 'r') as file:
+            intents = json.load(file)['intents']
+        return [(pattern, intent['tag']) for intent in intents for pattern in intent['patterns']]
+
+    traffic = []
+    with open(path, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith('.jsonl'):
+                record = json.loads(line)
+                traffic.append((record['message'], record.get('label', record.get('tag'))))
+            else:
+                traffic.append((line, None))
+    return traffic
+
+
+def expected_route(label):
+    return SEARCH if label == SEARCH or label in SEARCH_INTENTS else label
+
+
+def replay(generator, traffic, policies):
+    """Per-message routes under each policy: {policy name: [route]}, where a route is
+    'heuristic', 'search' or the answering intent's tag; plus the classifier seconds per message"""
+    routes = {policy.name: [] for policy in policies}
+    classify_seconds = []
+    for message, _ in traffic:
+        start = time.perf_counter()
+        if generator.respond_without_model(message) is not None:
+            classify_seconds.append(time.perf_counter() - start)
+            for policy in policies:
+                routes[policy.name].append('heuristic')
+            continue
+
+        probabilities, artifacts = generator.predict_probabilities([message])
+        categories = generator.keywords.match(message)
+        classify_seconds.append(time.perf_counter() - start)
+        for policy in policies:
+            if probabilities is None:
+                routes[policy.name].append(SEARCH)
+                continue
+            calibrated = policy.calibrate(probabilities)[0]
+            index = int(calibrated.argmax())
+            tag = str(artifacts.label_encoder.inverse_transform([index])[0])
+            routes[policy.name].append(SEARCH if policy.needs_search(tag, calibrated[index], categories) else tag)
+    return routes, classify_seconds
+
+
+def summarize(routes, traffic, classify_seconds, search_latency_ms):
+    classified = [i for i, route in enumerate(routes) if route != 'heuristic']
+    searches = sum(routes[i] == SEARCH for i in classified)
+    answered = [i for i in classified if routes[i] != SEARCH]
+    labeled = [i for i in classified if traffic[i][1] is not None]
+    mean_classify_ms = sum(classify_seconds) / max(len(classify_seconds), 1) * 1000
+
+    summary = {
+        'messages': len(routes),
+        'classified': len(classified),
+        'search_rate': searches / max(len(classified), 1),
+        'intent_rate': len(answered) / max(len(classified), 1),
+        'est_mean_latency_ms': mean_classify_ms + searches / max(len(routes), 1) * search_latency_ms,
+        'accuracy': None,
+        'intent_precision': None,
+    }
+    if labeled:
+        summary['accuracy'] = sum(routes[i] == expected_route(traffic[i][1]) for i in labeled) / len(labeled)
+        answered_labeled = [i for i in answered if traffic[i][1] is not None]
+        if answered_labeled:
+            summary['intent_precision'] = (sum(routes[i] == traffic[i][1] for i in answered_labeled)
+                                           / len(answered_labeled))
+    return summary
+
+
+def format_rate(value):
+    return f"{value:>9.1%}" if value is not None else f"{'-':>9}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--traffic', help='JSONL (message, optional label) or text file, one message per line')
+    parser.add_argument('--routing', help='Routing policy JSON (default: the one loaded with the model)')
+    parser.add_argument('--search-latency-ms', type=float, default=1000.0,
+                        help='Assumed cost of one web search fallback')
+    parser.add_argument('--show', type=int, default=10, help='Messages routed differently to print')
+    args = parser.parse_args()
+
+    os.chdir(CHATBOT_DIR)
+    from utils.response_generator import ResponseGenerator
+    generator = ResponseGenerator(intents_path='data/intents.json', model_path='models/intent_classifier.h5')
+    calibrated = RoutingPolicy.load(args.routing) if args.routing else generator.routing_policy()
+    policies = [LegacyPolicy(), calibrated]
+
+    traffic = load_traffic(args.traffic)
+    routes, classify_seconds = replay(generator, traffic, policies)
+
+    print(f"{len(traffic)} messages, search fallback assumed to cost {args.search_latency_ms:.0f} ms, "
+          f"calibrated policy temperature {calibrated.temperature:.2f}")
+    print(f"{'policy':<12} {'search':>9} {'intent':>9} {'accuracy':>9} {'precision':>9} {'est. ms':>9}")
+    for policy in policies:
+        summary = summarize(routes[policy.name], traffic, classify_seconds, args.search_latency_ms)
+        print(f"{policy.name:<12} {format_rate(summary['search_rate'])} {format_rate(summary['intent_rate'])} "
+              f"{format_rate(summary['accuracy'])} {format_rate(summary['intent_precision'])} "
+              f"{summary['est_mean_latency_ms']:>9.1f}")
+
+    legacy, new = routes[policies[0].name], routes[policies[1].name]
+    changed = [i for i in range(len(traffic)) if legacy[i] != new[i]]
+    print(f"\n{len(changed)} messages routed differently")
+    for i in changed[:args.show]:
+        message, label = traffic[i]
+        print(f"  {message!r:<48} {legacy[i]:>12} -> {new[i]:<12}" + (f" (label: {label})" if label else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+import argparse
+import os
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.knowledge_index import KnowledgeIndex, DEFAULT_CORPUS_PATHS, DEFAULT_INDEX_DIR
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline knowledge index used to answer questions without web search")
+    parser.add_argument('corpus', nargs='*', default=DEFAULT_CORPUS_PATHS,
+                        help="JSONL files (answer/text, optional question/title fields) or plain-text files")
+    parser.add_argument('--out', default=DEFAULT_INDEX_DIR, help="Index directory")
+    args = parser.parse_args()
+    
+    print(f"Building knowledge index from {', '.join(args.corpus)}...")
+    start = time.perf_counter()
+    index = KnowledgeIndex.build(args.corpus, args.out)
+    print(f"Indexed {index.num_docs} documents and {len(index.terms)} terms in {time.perf_counter() - start:.2f}s")
+    print(f"Index written to {args.out}")
+
+if __name__ == "__main__":
+    main()
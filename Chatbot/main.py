@@ -1,4 +1,5 @@
 from utils.response_generator import ResponseGenerator
+from utils.session_store import new_session_id
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -8,7 +9,15 @@ class ChatBot:
             intents_path='data/intents.json',
             model_path='models/intent_classifier.h5'
         )
-        self.conversation_history = []
+        # History is kept (bounded) in this chat's session
+        self.session_id = new_session_id()
+    
+    @property
+    def conversation_history(self):
+        history = []
+        for user_input, response in self.response_generator.session(self.session_id).history:
+            history += [f"You: {user_input}", f"Bot: {response}"]
+        return history
     
     def display_welcome(self):
         print("🤖 Welcome to the Enhanced AI ChatBot!")
@@ -32,18 +41,14 @@ class ChatBot:
                 if not user_input:
                     continue
                 
-                self.conversation_history.append(f"You: {user_input}")
-                
                 if user_input.lower() in ['quit', 'exit', 'bye']:
                     print("🤖 Goodbye! Have a great day!")
                     break
                 
-                response = self.response_generator.process_input(user_input)
+                response = self.response_generator.process_input(user_input, self.session_id)
                 print(f"🤖 {response}")
                 
-                self.conversation_history.append(f"Bot: {response}")
-                
-                if self.response_generator.last_intent == "weather":
+                if self.response_generator.session(self.session_id).last_intent == "weather":
                     print("🤖 (Please tell me which city you're interested in)")
                 
             except KeyboardInterrupt:
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+CHATBOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The app loads data/ and models/ relative to the Chatbot directory, and must
+# not write test answers into the shipped answer cache
+sys.path.insert(0, CHATBOT_DIR)
+os.chdir(CHATBOT_DIR)
+os.environ['CHATBOT_ANSWER_CACHE'] = os.path.join(tempfile.mkdtemp(prefix='chatbot-tests-'), 'cache.sqlite')
@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+
+from utils.answer_cache import AnswerCache, normalize_query, KEY_VERSION
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize('query, key', [
+    ("What is Python?", "what is python"),
+    ("  what   IS python!! ", "what is python"),
+    ("What is C++?", "what is c++"),
+    ("what is c#", "what is c#"),
+    ("Что такое Python?", "что такое python"),
+    ("東京はどこ？", "東京はどこ"),
+    ("ＰＹＴＨＯＮ", "python"),
+    ("Straße", "strasse"),
+])
+def test_normalize_query(query, key):
+    assert normalize_query(query) == key
+
+
+def test_distinct_queries_get_distinct_keys():
+    keys = {normalize_query(q) for q in ["what is c++", "what is c#", "what is c", "Что такое Python?", "什么是Python"]}
+    assert len(keys) == 5
+
+
+def test_degenerate_queries_are_never_cached():
+    cache = AnswerCache()
+    cache.put("???", "some answer")
+    assert cache.get("???") is None
+    assert cache.get("!!!") is None
+
+
+def test_memory_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = AnswerCache(ttl=60, clock=clock)
+    cache.put("what is python", "A language.")
+    assert cache.get("What is Python?") == "A language."
+    clock.now += 61
+    assert cache.get("what is python") is None
+
+
+def test_lru_evicts_least_recently_used():
+    cache = AnswerCache(max_entries=2)
+    cache.put("one", "1")
+    cache.put("two", "2")
+    assert cache.get("one") == "1"  # "two" is now least recently used
+    cache.put("three", "3")
+    assert cache.get("two") is None
+    assert cache.get("one") == "1"
+    assert cache.get("three") == "3"
+
+
+def test_negative_entries_use_the_shorter_ttl():
+    clock = FakeClock()
+    cache = AnswerCache(ttl=3600, negative_ttl=60, clock=clock)
+    cache.put("unknown thing", "nothing found", negative=True)
+    assert cache.get("unknown thing") == "nothing found"
+    assert cache.stats['negative_hits'] == 1
+    clock.now += 61
+    assert cache.get("unknown thing") is None
+
+
+def test_sqlite_entries_survive_restarts_until_they_expire(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    clock = FakeClock()
+    AnswerCache(path, ttl=60, clock=clock).put("what is python", "A language.")
+
+    restarted = AnswerCache(path, ttl=60, clock=clock)
+    assert restarted.get("what is python") == "A language."
+    assert restarted.stats['disk_hits'] == 1
+
+    clock.now += 61
+    assert AnswerCache(path, ttl=60, clock=clock).get("what is python") is None
+
+
+def test_sqlite_keys_from_an_older_normalization_are_dropped(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE answers (key TEXT PRIMARY KEY, answer TEXT NOT NULL, '
+               'negative INTEGER NOT NULL, expires_at REAL NOT NULL)')
+    # The old normalization turned "what is c++" into "what is c"
+    db.execute("INSERT INTO answers VALUES ('what is c', 'C++ answer', 0, 1e12)")
+    db.commit()
+    db.close()
+
+    cache = AnswerCache(path)
+    assert cache.get("what is c") is None
+    assert sqlite3.connect(path).execute('PRAGMA user_version').fetchone()[0] == KEY_VERSION
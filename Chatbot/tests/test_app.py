@@ -0,0 +1,42 @@
+import pytest
+
+import app as chat_app
+
+
+class FakeGenerator:
+    def process_input(self, user_input, session_id=None):
+        return f"echo: {user_input}"
+
+    def process_batch(self, messages, session_ids=None):
+        return [f"echo: {message}" for message in messages]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(chat_app, 'response_generator', FakeGenerator())
+    return chat_app.app.test_client()
+
+
+def test_chat_keeps_a_valid_session_id(client):
+    response = client.post('/chat', json={'message': 'hello', 'session_id': 'user-1'})
+    assert response.get_json() == {'response': 'echo: hello', 'session_id': 'user-1'}
+    assert 'chatbot_session=user-1;' in response.headers['Set-Cookie']
+
+
+@pytest.mark.parametrize('session_id', ['x; Domain=evil.example', 'a\r\nb', 'café'])
+def test_chat_replaces_malformed_session_ids(client, session_id):
+    response = client.post('/chat', json={'message': 'hello', 'session_id': session_id})
+    assert response.status_code == 200
+    new_id = response.get_json()['session_id']
+    assert new_id != session_id and len(new_id) == 32
+    assert 'evil' not in response.headers['Set-Cookie']
+
+
+@pytest.mark.parametrize('payload', [{'message': 42}, {'message': 'hi', 'session_id': ['x']}])
+def test_chat_rejects_bad_types(client, payload):
+    assert client.post('/chat', json=payload).status_code == 400
+
+
+def test_batch_rejects_malformed_session_ids(client):
+    response = client.post('/chat/batch', json={'messages': ['a', 'b'], 'session_ids': ['ok', 'bad;id']})
+    assert response.status_code == 400
@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import pytest
+
+from asgi import ChatASGIApp
+from app import app as flask_app
+
+
+class FakeGenerator:
+    """Echoes messages; fails on the message 'boom'"""
+    def process_batch(self, messages, session_ids=None):
+        for message in messages:
+            if message == 'boom':
+                raise ValueError("bad message")
+        return [f"echo: {message}" for message in messages]
+
+
+def post_chat(app, payload, headers=()):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'path': '/chat', 'method': 'POST', 'headers': list(headers)}
+    asyncio.run(app(scope, receive, send))
+    start, response = sent
+    return start['status'], dict(start['headers']), json.loads(response['body'])
+
+
+@pytest.fixture
+def chat_app():
+    app = ChatASGIApp(flask_app, FakeGenerator(), window_ms=50)
+    app.batcher.start()
+    yield app
+    app.batcher.stop()
+
+
+def test_chat_echoes_and_sets_session(chat_app):
+    status, headers, body = post_chat(chat_app, {'message': 'hi there', 'session_id': 'abc'})
+    assert status == 200
+    assert body == {'response': 'echo: hi there', 'session_id': 'abc'}
+    assert headers[b'set-cookie'].startswith(b'chatbot_session=abc;')
+
+
+@pytest.mark.parametrize('payload', [
+    {'message': 123},
+    {'message': ['a']},
+    {'message': 'x' * 5000},
+    {'message': 'hello', 'session_id': {}},
+    {'message': 'hello', 'session_id': 'x' * 500},
+])
+def test_chat_rejects_bad_input(chat_app, payload):
+    status, _, _ = post_chat(chat_app, payload)
+    assert status == 400
+
+
+def test_bad_item_only_fails_its_own_request(chat_app):
+    async def concurrent():
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(*(loop.run_in_executor(None, post_chat, chat_app, {'message': message})
+                                      for message in ['one', 'boom', 'two']))
+
+    results = asyncio.run(concurrent())
+    responses = [body['response'] for _, _, body in results]
+    assert responses[0] == 'echo: one'
+    assert responses[1].startswith('Sorry')
+    assert responses[2] == 'echo: two'
+
+
+@pytest.mark.parametrize('session_id', ['abc; Domain=evil.example', 'a,b', 'abc\r\nSet-Cookie: x=1', 'sessiön', ''])
+def test_malformed_session_id_gets_a_new_one(chat_app, session_id):
+    status, headers, body = post_chat(chat_app, {'message': 'hi there', 'session_id': session_id})
+    assert status == 200
+    assert body['session_id'] != session_id
+    assert len(body['session_id']) == 32
+    assert headers[b'set-cookie'] == f"chatbot_session={body['session_id']}; HttpOnly; SameSite=Lax; Path=/".encode()
+
+
+def test_session_id_read_from_cookie(chat_app):
+    _, _, body = post_chat(chat_app, {'message': 'hi there'}, headers=[(b'cookie', b'chatbot_session=from-cookie_1')])
+    assert body['session_id'] == 'from-cookie_1'
@@ -0,0 +1,123 @@
+import json
+import os
+import re
+
+import numpy as np
+import pytest
+
+from utils import model_trainer, preprocessor
+from utils.feature_cache import intents_hash
+from utils.model_trainer import ModelTrainer
+
+INTENTS = {"intents": [
+    {"tag": "greeting", "patterns": ["Hello there", "Hi", "Good morning"], "responses": ["Hello!"]},
+    {"tag": "weather", "patterns": ["What's the weather like?", "Is it raining today?"], "responses": ["Sunny."]},
+    {"tag": "goodbye", "patterns": ["Bye", "See you later", "Hello and goodbye"], "responses": ["Bye!"]},
+]}
+
+
+@pytest.fixture(autouse=True)
+def plain_tokenizer(monkeypatch):
+    # Plain whitespace tokens, so the tests do not depend on NLTK
+    monkeypatch.setattr(model_trainer, 'word_tokenize', str.split)
+    monkeypatch.setattr(preprocessor, 'word_tokenize', str.split)
+
+
+def write_intents(path, intents):
+    with open(path, 'w') as file:
+        json.dump(intents, file)
+    return str(path)
+
+
+def make_trainer(cache_dir):
+    """A ModelTrainer whose clean_text records the patterns it cleans"""
+    trainer = ModelTrainer(feature_cache_dir=cache_dir)
+    trainer.cleaned = []
+
+    def clean_text(text):
+        trainer.cleaned.append(text)
+        return ' '.join(re.findall(r'[a-z]+', text.lower()))
+
+    trainer.preprocessor.clean_text = clean_text
+    return trainer
+
+
+@pytest.fixture
+def intents_path(tmp_path):
+    return write_intents(tmp_path / 'intents.json', INTENTS)
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / 'feature_cache')
+
+
+def test_intents_hash_follows_the_content(tmp_path, intents_path):
+    copy = write_intents(tmp_path / 'copy.json', INTENTS)
+    assert intents_hash(copy) == intents_hash(intents_path)
+
+    edited = json.loads(json.dumps(INTENTS))
+    edited['intents'][0]['patterns'][1] = "Hi!"
+    assert intents_hash(write_intents(tmp_path / 'edited.json', edited)) != intents_hash(intents_path)
+
+
+def test_unchanged_file_loads_from_the_cache(intents_path, cache_dir):
+    first = make_trainer(cache_dir)
+    X, y, words = first.load_features(intents_path)
+    assert first.report['features'] == 'cache miss'
+    assert sorted(first.cleaned) == sorted(p for intent in INTENTS['intents'] for p in intent['patterns'])
+
+    second = make_trainer(cache_dir)
+    X_cached, y_cached, words_cached = second.load_features(intents_path)
+    assert (second.report['features'], second.report['patterns_cleaned']) == ('cache hit', 0)
+    assert second.cleaned == []
+    np.testing.assert_array_equal(X_cached, X)
+    np.testing.assert_array_equal(y_cached, y)
+    assert words_cached == words
+    assert list(second.le.classes_) == list(first.le.classes_)
+
+
+def test_only_the_edited_pattern_is_cleaned_again(tmp_path, intents_path, cache_dir):
+    make_trainer(cache_dir).load_features(intents_path)
+
+    edited = json.loads(json.dumps(INTENTS))
+    edited['intents'][1]['patterns'][1] = "Will it snow tomorrow?"
+    write_intents(intents_path, edited)
+
+    trainer = make_trainer(cache_dir)
+    X, y, words = trainer.load_features(intents_path)
+    assert trainer.cleaned == ["Will it snow tomorrow?"]
+    assert (trainer.report['features'], trainer.report['patterns_cleaned']) == ('cache miss', 1)
+    assert {'snow', 'tomorrow'} <= set(words) and 'raining' not in words
+    # Only the latest featurization is kept
+    assert [name for name in os.listdir(cache_dir) if name.startswith('features-')] == \
+        [f'features-{intents_hash(intents_path)}.npz']
+
+
+def test_cached_matrix_equals_uncached_featurization(tmp_path, intents_path, cache_dir):
+    make_trainer(cache_dir).load_features(intents_path)
+    edited = json.loads(json.dumps(INTENTS))
+    edited['intents'][2]['patterns'].append("Farewell, see you soon")
+    write_intents(intents_path, edited)
+
+    # Partly from cleaned texts of the first run, then straight from the cache
+    for _ in range(2):
+        X, y, words = make_trainer(cache_dir).load_features(intents_path)
+        X_fresh, y_fresh, words_fresh = make_trainer(None).load_features(intents_path)
+        assert words == words_fresh
+        np.testing.assert_array_equal(X, X_fresh)
+        np.testing.assert_array_equal(y, y_fresh)
+        assert X.dtype == X_fresh.dtype
+
+
+def test_corrupt_cache_is_rebuilt(intents_path, cache_dir):
+    make_trainer(cache_dir).load_features(intents_path)
+    with open(os.path.join(cache_dir, f'features-{intents_hash(intents_path)}.npz'), 'wb') as file:
+        file.write(b'not an npz file')
+    with open(os.path.join(cache_dir, 'cleaned.json'), 'w') as file:
+        file.write('{truncated')
+
+    trainer = make_trainer(cache_dir)
+    X, _, _ = trainer.load_features(intents_path)
+    assert trainer.report['features'] == 'cache miss'
+    assert trainer.report['patterns_cleaned'] == len(X)
@@ -0,0 +1,134 @@
+import logging
+import random
+
+import pytest
+
+from utils import response_generator
+from utils.instrumentation import Histogram, Metrics, SampledLogger
+
+
+def test_histogram_bucket_counts():
+    histogram = Histogram(buckets_ms=(1, 5, 10))
+    # Bucket bounds are inclusive upper bounds, as Prometheus's "le"
+    for ms in (0.5, 1, 3, 5, 7, 20):
+        histogram.observe(ms)
+    assert histogram.counts == [2, 2, 1, 1]
+    assert histogram.count == 6
+    assert histogram.sum_ms == pytest.approx(36.5)
+
+
+def test_histogram_percentiles_are_bucket_upper_bounds():
+    histogram = Histogram(buckets_ms=(1, 5, 10))
+    assert histogram.percentile(50) is None
+    for ms in (0.5, 0.7, 3, 7, 20):
+        histogram.observe(ms)
+    assert histogram.percentile(40) == 1
+    assert histogram.percentile(50) == 5
+    assert histogram.percentile(80) == 10
+    assert histogram.percentile(99) == float('inf')
+
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 5
+    assert snapshot['mean_ms'] == pytest.approx(31.2 / 5)
+    assert (snapshot['p50_ms'], snapshot['p95_ms'], snapshot['p99_ms']) == (5, float('inf'), float('inf'))
+
+
+def test_metrics_observe_timer_and_counters():
+    metrics = Metrics(buckets_ms=(1, 5, 10))
+    metrics.observe('classify', 0.002)
+    with metrics.timer('classify'):
+        pass
+    metrics.increment('answer_cache_hits')
+    metrics.increment('answer_cache_hits', 2)
+
+    snapshot = metrics.snapshot()
+    assert snapshot['stages']['classify']['count'] == 2
+    assert snapshot['counters'] == {'answer_cache_hits': 3}
+
+    metrics.reset()
+    assert metrics.snapshot() == {'stages': {}, 'counters': {}}
+
+
+def test_prometheus_rendering():
+    metrics = Metrics(buckets_ms=(1, 5))
+    metrics.observe('route', 0.0005)
+    metrics.observe('route', 0.003)
+    metrics.observe('route', 0.008)
+    metrics.increment('heuristic_responses', 4)
+    assert metrics.render_prometheus() == (
+        '# TYPE chatbot_stage_latency_ms histogram\n'
+        'chatbot_stage_latency_ms_bucket{stage="route",le="1"} 1\n'
+        'chatbot_stage_latency_ms_bucket{stage="route",le="5"} 2\n'
+        'chatbot_stage_latency_ms_bucket{stage="route",le="+Inf"} 3\n'
+        'chatbot_stage_latency_ms_sum{stage="route"} 11.5\n'
+        'chatbot_stage_latency_ms_count{stage="route"} 3\n'
+        '# TYPE chatbot_heuristic_responses_total counter\n'
+        'chatbot_heuristic_responses_total 4\n'
+    )
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def logger():
+    logger = logging.getLogger('chatbot.tests.sampled')
+    handler = ListHandler()
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    yield logger, handler.records
+    logger.removeHandler(handler)
+
+
+def test_sampled_logger_logs_about_the_sample_rate(logger, monkeypatch):
+    base, records = logger
+    sampled = SampledLogger(base, sample_rate=0.1)
+    monkeypatch.setattr(random, 'random', random.Random(0).random)
+    for i in range(10000):
+        sampled.info("request %d", i)
+    assert 800 < len(records) < 1200
+
+    # Below the logger's level nothing is sampled at all
+    records.clear()
+    for i in range(1000):
+        sampled.debug("request %d", i)
+    assert records == []
+
+
+def test_sampled_logger_always_logs_warnings_and_errors(logger):
+    base, records = logger
+    sampled = SampledLogger(base, sample_rate=0.0)
+    sampled.info("dropped")
+    sampled.warning("slow backend: %s", "wikipedia")
+    sampled.error("failed")
+    assert [record.getMessage() for record in records] == ["slow backend: wikipedia", "failed"]
+
+
+class NoModel:
+    def load(self):
+        pass
+
+    def get(self):
+        return None
+
+
+def test_process_batch_observes_one_request_per_message(monkeypatch):
+    metrics = Metrics()
+    monkeypatch.setattr(response_generator, 'metrics', metrics)
+    generator = response_generator.ResponseGenerator('data/intents.json', 'models/intent_classifier.h5',
+                                                     registry=NoModel())
+    # Greetings and thanks are answered by the heuristics, without the model
+    generator.process_batch(["hello", "thanks a lot", "hey"])
+    generator.process_input("hello")
+
+    stages = metrics.snapshot()['stages']
+    assert stages['request']['count'] == 4
+    assert stages['batch']['count'] == 1
+    assert stages['heuristics']['count'] == 4
@@ -0,0 +1,88 @@
+import json
+import random
+
+import pytest
+
+from utils.keyword_matcher import KeywordMatcher
+
+with open('data/keywords.json') as file:
+    TABLES = json.load(file)
+
+
+def reference(tables, text):
+    """The per-category scans the heuristics used before the matcher"""
+    text_lower = text.lower()
+    return frozenset(category for category, words in tables.items()
+                     if any(word in text_lower for word in words))
+
+
+@pytest.fixture(scope='module')
+def matcher():
+    return KeywordMatcher(TABLES)
+
+
+@pytest.mark.parametrize('text', [
+    "Hello there!",
+    "what's up",
+    "Can you tell me about Paris?",
+    "thanks, see you later",
+    "This is the history of chips",       # "hi" and "yo" inside other words
+    "Whichever way you go",                # "which" and "hi"
+    "shower thoughts",                     # "how" inside a word
+    "good afternoon, how to cook rice",
+    "",
+    "xyz",
+])
+def test_matches_the_per_category_scan(matcher, text):
+    assert matcher.match(text) == reference(TABLES, text)
+
+
+def test_random_texts_match_the_per_category_scan(matcher):
+    # Texts glued together from keywords and their fragments, so keywords
+    # overlap, share prefixes and appear inside other words
+    keywords = [word for words in TABLES.values() for word in words]
+    pieces = keywords + [word[:len(word) // 2 + 1] for word in keywords] + [' ', 's', 'e', 'x']
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = ''.join(rng.choice(pieces) for _ in range(rng.randint(1, 6)))
+        if rng.random() < 0.3:
+            text = text.upper()
+        assert matcher.match(text) == reference(TABLES, text), text
+
+
+@pytest.mark.parametrize('text, expected', [
+    # The longer keyword is found at a position; the shorter ones it contains still count
+    ("hi there", {'greeting'}),
+    ("so long", {'goodbye'}),
+    # Overlapping keywords from different categories
+    ("whathanks", {'question', 'thanks'}),
+    ("goodbye", {'goodbye'}),
+    # A keyword containing another category's keyword
+    ("what is", {'question', 'search'}),
+    ("what's up", {'question', 'greeting'}),
+])
+def test_overlapping_and_nested_keywords(matcher, text, expected):
+    assert matcher.match(text) == frozenset(expected) == reference(TABLES, text)
+
+
+def test_shared_prefixes():
+    tables = {'short': ['ab'], 'long': ['abcd'], 'other': ['abx', 'bc']}
+    matcher = KeywordMatcher(tables)
+    for text in ["ab", "abc", "abcd", "abxbc", "zabcdz", "a b"]:
+        assert matcher.match(text) == reference(tables, text), text
+    assert matcher.match("abcd") == {'short', 'long', 'other'}
+
+
+def test_regex_characters_are_literal():
+    tables = {'question': ['?'], 'dots': ['a.b']}
+    matcher = KeywordMatcher(tables)
+    assert matcher.match("why?") == {'question'}
+    assert matcher.match("axb") == frozenset()
+    assert matcher.match("a.b") == {'dots'}
+
+
+def test_results_are_cached(matcher):
+    matcher.match.cache_clear()
+    matcher.match("hello")
+    matcher.match("hello")
+    assert matcher.match.cache_info().hits == 1
@@ -0,0 +1,122 @@
+import json
+import os
+import re
+
+import pytest
+
+from utils.answer_cache import AnswerCache
+from utils.knowledge_index import KnowledgeIndex
+from utils.search_backends import SearchBackend, SearchResult, LocalBackend
+from utils.web_search import WebSearch
+
+CORPUS = [
+    {"question": "What is the capital of France?", "answer": "The capital of France is Paris."},
+    {"question": "What is the capital of Italy?", "answer": "The capital of Italy is Rome."},
+    {"question": "How tall is Mount Everest?", "answer": "Mount Everest is 8,849 metres tall."},
+    {"question": "Who wrote Hamlet?", "answer": "Hamlet was written by William Shakespeare."},
+    {"title": "Python", "answer": "Python is a programming language created by Guido van Rossum."},
+]
+
+
+def tokenize(text):
+    # Plain words, so the tests do not depend on NLTK
+    return re.findall(r'[a-z0-9]+', text.lower())
+
+
+def write_corpus(path, records):
+    with open(path, 'w', encoding='utf-8') as file:
+        for record in records:
+            file.write(json.dumps(record) + '\n')
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = str(tmp_path / 'knowledge.jsonl')
+    write_corpus(path, CORPUS)
+    return path
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    return str(tmp_path / 'index')
+
+
+def test_build_and_load_give_the_same_results(corpus, index_dir):
+    built = KnowledgeIndex.build([corpus], index_dir, tokenize=tokenize)
+    loaded = KnowledgeIndex.load(index_dir, tokenize=tokenize)
+    assert loaded.num_docs == built.num_docs == len(CORPUS)
+    assert list(loaded.terms) == list(built.terms)
+    for query in ("capital of italy", "who wrote hamlet", "python language"):
+        assert loaded.search(query) == built.search(query)
+    assert loaded.answer(2) == "Mount Everest is 8,849 metres tall."
+
+
+def test_bm25_ranks_the_matching_document_first(corpus, index_dir):
+    index = KnowledgeIndex.build([corpus], index_dir, tokenize=tokenize)
+    results = index.search("what is the capital of italy", top_k=3)
+    assert results[0][0] == "The capital of Italy is Rome."
+    # France shares "capital" but not "italy"
+    assert results[1][0] == "The capital of France is Paris."
+    assert results[0][1] > results[1][1]
+    assert all(0.0 <= score <= 1.0 for _, score in results)
+
+
+def test_unknown_words_give_no_or_weak_results(corpus, index_dir):
+    index = KnowledgeIndex.build([corpus], index_dir, tokenize=tokenize)
+    assert index.search("zorblax quux") == []
+    assert index.search("") == []
+    # Shares only "capital": scored down by the query word the corpus lacks
+    _, score = index.search("capital of peru")[0]
+    assert score < 0.6
+
+
+class StandInBackend(SearchBackend):
+    name = 'stand_in'
+
+    def __init__(self):
+        self.calls = 0
+
+    def search(self, query):
+        self.calls += 1
+        return SearchResult("remote answer", 0.9, self.name)
+
+
+def test_good_score_cutoff_decides_between_index_and_fanout(corpus, index_dir):
+    index = KnowledgeIndex.build([corpus], index_dir, tokenize=tokenize)
+    backend = StandInBackend()
+    search = WebSearch(backends=[backend], cache=AnswerCache(), local=LocalBackend(index=index))
+
+    assert index.search("who wrote hamlet")[0][1] >= search.fanout.good_score
+    assert search.get_answer("who wrote hamlet") == "Hamlet was written by William Shakespeare."
+    assert backend.calls == 0
+
+    assert search.get_answer("capital of peru") == "remote answer"
+    assert backend.calls == 1
+
+
+def test_load_or_build_rebuilds_a_stale_index(corpus, index_dir):
+    KnowledgeIndex.load_or_build(index_dir, [corpus], tokenize=tokenize)
+    assert KnowledgeIndex.load_or_build(index_dir, [corpus], tokenize=tokenize).search("hamlet")
+
+    write_corpus(corpus, CORPUS + [{"question": "What is the capital of Peru?", "answer": "Lima."}])
+    stat = os.stat(corpus)
+    os.utime(corpus, (stat.st_atime + 10, stat.st_mtime + 10))
+
+    # The corpus path comes from the index's own metadata
+    index = KnowledgeIndex.load_or_build(index_dir, [], tokenize=tokenize)
+    assert index.num_docs == len(CORPUS) + 1
+    assert index.search("capital of peru")[0][0] == "Lima."
+
+
+def test_rebuild_leaves_a_loaded_index_readable(corpus, index_dir, tmp_path):
+    KnowledgeIndex.build([corpus], index_dir, tokenize=tokenize)
+    old = KnowledgeIndex.load(index_dir, tokenize=tokenize)
+
+    other = str(tmp_path / 'other.jsonl')
+    write_corpus(other, [{"question": "Who painted the Mona Lisa?", "answer": "Leonardo da Vinci."}])
+    KnowledgeIndex.build([other], index_dir, tokenize=tokenize)
+
+    # The memory-mapped files of the old build were replaced, not rewritten
+    assert old.search("who wrote hamlet")[0][0] == "Hamlet was written by William Shakespeare."
+    assert KnowledgeIndex.load(index_dir, tokenize=tokenize).search("mona lisa")[0][0] == "Leonardo da Vinci."
+    assert sorted(os.listdir(tmp_path)) == ['index', 'knowledge.jsonl', 'other.jsonl']
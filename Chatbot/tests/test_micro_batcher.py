@@ -0,0 +1,27 @@
+import pytest
+
+from utils.micro_batcher import MicroBatcher
+
+
+def test_failing_item_does_not_fail_the_batch():
+    batches = []
+
+    def process(items):
+        batches.append(list(items))
+        if 'bad' in items:
+            raise ValueError("bad item")
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher(process, window_ms=100, max_batch_size=8)
+    batcher.start()
+    try:
+        futures = [batcher.submit(item) for item in ['a', 'bad', 'c']]
+        assert futures[0].result(timeout=5) == 'A'
+        assert futures[2].result(timeout=5) == 'C'
+        with pytest.raises(ValueError):
+            futures[1].result(timeout=5)
+    finally:
+        batcher.stop()
+    # One failed batch, then each item on its own
+    assert batches[0] == ['a', 'bad', 'c']
+    assert batches[1:] == [['a'], ['bad'], ['c']]
@@ -0,0 +1,82 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from utils.model_registry import ModelRegistry
+from utils.numpy_inference import NumpyMLP, LabelDecoder
+from utils.routing import RoutingPolicy
+
+
+def write_model(model_dir, words, classes, hidden=4, store_classes=True):
+    rng = np.random.default_rng(len(words))
+    model = NumpyMLP([rng.normal(size=(len(words), hidden)), rng.normal(size=(hidden, len(classes)))],
+                     [np.zeros(hidden), np.zeros(len(classes))], ['relu', 'softmax'],
+                     classes if store_classes else None)
+    model.save(os.path.join(model_dir, 'intent_classifier.npz'))
+
+
+def write_words(model_dir, words):
+    with open(os.path.join(model_dir, 'tokenizer.pickle'), 'wb') as handle:
+        pickle.dump(words, handle)
+
+
+def bump_mtime(path, seconds=10):
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime + seconds, stat.st_mtime + seconds))
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    write_words(tmp_path, ['hello', 'joke', 'weather'])
+    write_model(tmp_path, ['hello', 'joke', 'weather'], ['greeting', 'joke'])
+    return tmp_path
+
+
+def make_registry(model_dir):
+    return ModelRegistry(os.path.join(model_dir, 'intent_classifier.h5'), check_interval=None)
+
+
+def test_load_numpy_artifacts(model_dir):
+    artifacts = make_registry(model_dir).load()
+    assert artifacts.words == ['hello', 'joke', 'weather']
+    assert list(artifacts.label_encoder.classes_) == ['greeting', 'joke']
+    assert artifacts.model.predict(np.ones((1, 3))).shape == (1, 2)
+    assert artifacts.routing.to_dict() == RoutingPolicy().to_dict()
+
+
+def test_mismatched_vocabulary_keeps_the_current_snapshot(model_dir):
+    registry = make_registry(model_dir)
+    before = registry.load()
+
+    # Training wrote the new vocabulary but not yet the model
+    write_words(model_dir, ['hello', 'joke', 'rain', 'weather'])
+    bump_mtime(os.path.join(model_dir, 'tokenizer.pickle'))
+    assert not registry.reload_if_changed()
+    assert registry.get() is before
+
+    # Once the model matches, the next check swaps both in
+    write_model(model_dir, ['hello', 'joke', 'rain', 'weather'], ['greeting', 'joke'])
+    bump_mtime(os.path.join(model_dir, 'intent_classifier.npz'), 20)
+    assert registry.reload_if_changed()
+    assert registry.get().words == ['hello', 'joke', 'rain', 'weather']
+    assert registry.get().version == before.version + 1
+
+
+def test_mismatched_classes_fail_the_first_load(model_dir):
+    # Weights without class names fall back to the pickled label encoder
+    write_model(model_dir, ['hello', 'joke', 'weather'], ['greeting', 'joke'], store_classes=False)
+    with open(os.path.join(model_dir, 'label_encoder.pickle'), 'wb') as handle:
+        pickle.dump(LabelDecoder(['greeting', 'joke', 'weather']), handle)
+    with pytest.raises(ValueError, match='do not match'):
+        make_registry(model_dir).load()
+
+
+def test_saves_replace_files_whole(tmp_path):
+    path = str(tmp_path / 'routing.json')
+    RoutingPolicy(temperature=2.0).save(path)
+    RoutingPolicy(temperature=3.0).save(path)
+    assert RoutingPolicy.load(path).temperature == 3.0
+    write_model(tmp_path, ['a', 'b'], ['x', 'y'])
+    assert sorted(os.listdir(tmp_path)) == ['intent_classifier.npz', 'routing.json']
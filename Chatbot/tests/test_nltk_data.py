@@ -0,0 +1,61 @@
+import pytest
+
+from utils import nltk_data
+
+
+@pytest.fixture
+def fresh_state(monkeypatch):
+    """load_nltk() as if nothing had been loaded in this process yet"""
+    monkeypatch.setattr(nltk_data, '_nltk', None)
+    monkeypatch.setattr(nltk_data, '_load_error', None)
+
+
+@pytest.fixture
+def offline(monkeypatch, fresh_state):
+    """ensure_nltk_data failing as it does without the data or the network; records its calls"""
+    calls = []
+
+    def ensure_nltk_data(download=True):
+        calls.append(download)
+        raise LookupError("NLTK data not installed: punkt")
+
+    monkeypatch.setattr(nltk_data, 'ensure_nltk_data', ensure_nltk_data)
+    return calls
+
+
+def test_failed_download_is_not_retried_per_message(offline):
+    for _ in range(3):
+        with pytest.raises(LookupError, match='punkt.*warmup.py --download'):
+            nltk_data.word_tokenize("hello there")
+    assert offline == [True]
+
+
+def test_warmup_download_clears_the_failure(offline, monkeypatch):
+    with pytest.raises(LookupError):
+        nltk_data.load_nltk()
+
+    # Still failing until the data is fetched...
+    monkeypatch.setattr(nltk_data, 'ensure_nltk_data', lambda download=True: None)
+    with pytest.raises(LookupError):
+        nltk_data.load_nltk()
+
+    # ...by warmup(download=True)
+    import nltk
+    monkeypatch.setattr(nltk, 'word_tokenize', str.split)
+    monkeypatch.setattr(nltk_data, 'stop_words', lambda: frozenset())
+    nltk_data.warmup(download=True)
+    assert nltk_data.load_nltk() is nltk
+
+
+def test_offline_warmup_does_not_download(offline):
+    with pytest.raises(LookupError):
+        nltk_data.warmup()
+    assert offline == [False]
+
+
+def test_loaded_once(monkeypatch, fresh_state):
+    calls = []
+    monkeypatch.setattr(nltk_data, 'ensure_nltk_data', lambda download=True: calls.append(download))
+    first = nltk_data.load_nltk()
+    assert nltk_data.load_nltk() is first
+    assert calls == [True]
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+import scipy.sparse
+
+from utils.numpy_inference import NumpyMLP
+
+
+def reference_forward(x, kernels, biases):
+    """Dense(relu) -> Dense(relu) -> Dense(softmax), written out in float64"""
+    hidden = np.maximum(x @ kernels[0] + biases[0], 0.0)
+    hidden = np.maximum(hidden @ kernels[1] + biases[1], 0.0)
+    logits = hidden @ kernels[2] + biases[2]
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+@pytest.fixture
+def weights():
+    rng = np.random.default_rng(0)
+    sizes = [12, 8, 6, 4]
+    kernels = [rng.normal(scale=0.5, size=(sizes[i], sizes[i + 1])) for i in range(3)]
+    biases = [rng.normal(scale=0.1, size=sizes[i + 1]) for i in range(3)]
+    return kernels, biases
+
+
+@pytest.fixture
+def inputs():
+    rng = np.random.default_rng(1)
+    x = (rng.random((32, 12)) < 0.3).astype(np.float64)
+    x[0] = 0  # out-of-vocabulary messages featurize to all zeros
+    return x
+
+
+def make_model(weights, classes=None):
+    kernels, biases = weights
+    return NumpyMLP(kernels, biases, ['relu', 'relu', 'softmax'], classes)
+
+
+def test_predict_matches_reference_forward_pass(weights, inputs):
+    model = make_model(weights)
+    expected = reference_forward(inputs, *weights)
+    actual = model.predict(inputs)
+    np.testing.assert_allclose(actual, expected, atol=1e-5)
+    np.testing.assert_allclose(actual.sum(axis=1), 1.0, atol=1e-5)
+    assert (model.input_dim, model.output_dim) == (12, 4)
+
+
+def test_predict_accepts_sparse_rows(weights, inputs):
+    model = make_model(weights)
+    np.testing.assert_allclose(model.predict(scipy.sparse.csr_matrix(inputs)), model.predict(inputs), atol=1e-6)
+
+
+def test_known_weights():
+    # Identity hidden layer: softmax([1, 0]) and softmax([0, 0])
+    model = NumpyMLP([np.eye(2), np.eye(2)], [np.zeros(2), np.zeros(2)], ['relu', 'softmax'])
+    probabilities = model.predict([[1.0, 0.0], [-1.0, 0.0]])
+    np.testing.assert_allclose(probabilities, [[np.e / (np.e + 1), 1 / (np.e + 1)], [0.5, 0.5]], atol=1e-6)
+
+
+def test_save_load_round_trip(tmp_path, weights, inputs):
+    model = make_model(weights, classes=['a', 'b', 'c', 'd'])
+    path = str(tmp_path / 'model.npz')
+    model.save(path)
+    loaded = NumpyMLP.load(path)
+    np.testing.assert_array_equal(loaded.predict(inputs), model.predict(inputs))
+    assert loaded.activations == ['relu', 'relu', 'softmax']
+    assert list(loaded.label_decoder().inverse_transform([3, 0])) == ['d', 'a']
+
+
+def test_unsupported_activation():
+    with pytest.raises(ValueError, match='Unsupported activation'):
+        NumpyMLP([np.eye(2)], [np.zeros(2)], ['tanh'])
+
+
+def bag_of_words_batch(input_dim, rows=64, seed=2):
+    rng = np.random.default_rng(seed)
+    x = (rng.random((rows, input_dim)) < 0.05).astype(np.float32)
+    x[0] = 0
+    return x
+
+
+def test_shipped_numpy_weights_match_keras():
+    pytest.importorskip('tensorflow')
+    from tensorflow.keras.models import load_model
+
+    keras_model = load_model('models/intent_classifier.h5')
+    numpy_model = NumpyMLP.load('models/intent_classifier.npz')
+    x = bag_of_words_batch(numpy_model.input_dim)
+    assert np.allclose(numpy_model.predict(x), keras_model.predict(x, verbose=0), atol=1e-5)
+
+
+def test_export_keras_model_matches_keras(tmp_path):
+    pytest.importorskip('tensorflow')
+    from utils.model_trainer import ModelTrainer
+    from utils.numpy_inference import export_keras_model
+
+    keras_model = ModelTrainer(feature_cache_dir=None).build_model(20, 5)
+    # Fresh layers have zero biases; random ones also check the bias mapping
+    rng = np.random.default_rng(3)
+    for layer in keras_model.layers:
+        if type(layer).__name__ == 'Dense':
+            layer.set_weights([rng.normal(scale=0.5, size=w.shape).astype(np.float32) for w in layer.get_weights()])
+    path = str(tmp_path / 'model.npz')
+    export_keras_model(keras_model, path, classes=['a', 'b', 'c', 'd', 'e'])
+    numpy_model = NumpyMLP.load(path)
+    # Dropout layers are skipped: the Dense layers, in order, with their activations
+    assert numpy_model.activations == ['relu', 'relu', 'relu', 'softmax']
+    x = bag_of_words_batch(20)
+    assert np.allclose(numpy_model.predict(x), keras_model.predict(x, verbose=0), atol=1e-5)
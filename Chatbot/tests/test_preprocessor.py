@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+import scipy.sparse
+
+from utils import preprocessor
+from utils.preprocessor import TextPreprocessor, BagOfWordsVectorizer
+
+TEXTS = [
+    "What's the weather like in London?",
+    "Tell me a JOKE",
+    "tell me a joke",
+    "Running runners ran 3 races",
+    "",
+    "the is",
+    "What's the weather like in London?",
+]
+
+
+@pytest.fixture(autouse=True)
+def plain_tokenizer(monkeypatch):
+    # Whitespace tokens and a fixed stop list, so the tests do not depend on NLTK data
+    monkeypatch.setattr(preprocessor, 'word_tokenize', str.split)
+    monkeypatch.setattr(preprocessor, 'stop_words', lambda: frozenset({'the', 'is', 'a', 'me', 'in'}))
+
+
+def test_cached_clean_text_equals_uncached():
+    cached = TextPreprocessor()
+    uncached = TextPreprocessor(stem_cache_size=0, text_cache_size=0)
+    for _ in range(2):
+        assert [cached.clean_text(text) for text in TEXTS] == [uncached.clean_text(text) for text in TEXTS]
+    assert cached.clean_text("Running runners ran 3 races") == "run runner ran race"
+    # Case variants share one entry
+    info = cached.cache_info()['text']
+    assert info['currsize'] == 5
+    assert info['hits'] == 2 * len(TEXTS) - 5 + 1
+
+
+def test_cache_clear_empties_both_caches():
+    processor = TextPreprocessor()
+    before = [processor.clean_text(text) for text in TEXTS]
+    processor.cache_clear()
+    info = processor.cache_info()
+    for name in ('stem', 'text'):
+        assert (info[name]['currsize'], info[name]['hits'], info[name]['misses']) == (0, 0, 0)
+    assert [processor.clean_text(text) for text in TEXTS] == before
+
+
+def test_cache_sizes_are_bounded():
+    processor = TextPreprocessor(stem_cache_size=3, text_cache_size=2)
+    for text in TEXTS:
+        processor.clean_text(text)
+    info = processor.cache_info()
+    assert info['stem']['maxsize'] == 3 and info['stem']['currsize'] <= 3
+    assert info['text']['maxsize'] == 2 and info['text']['currsize'] <= 2
+
+
+def random_texts(words, rows=50, seed=0):
+    rng = np.random.default_rng(seed)
+    texts = [' '.join(rng.choice(words, size=rng.integers(1, 12))) for _ in range(rows)]
+    # Out-of-vocabulary and repeated tokens
+    return texts + ["unknown words only", f"{words[0]} {words[0]} {words[-1]}", ""]
+
+
+def test_sparse_output_equals_dense_for_large_vocabularies():
+    words = sorted(f"w{i}" for i in range(6000))
+    vectorizer = BagOfWordsVectorizer(words)
+    texts = random_texts(words)
+
+    sparse = vectorizer.transform(texts)
+    dense = vectorizer.transform(texts, sparse=False)
+    assert scipy.sparse.isspmatrix_csr(sparse)
+    assert sparse.shape == dense.shape == (len(texts), 6000)
+    assert sparse.dtype == dense.dtype == np.float32
+    np.testing.assert_array_equal(sparse.toarray(), dense)
+    # Present words are 1, however often they occur
+    assert set(np.unique(sparse.data)) == {1.0}
+
+
+def test_small_vocabularies_stay_dense():
+    words = sorted(f"w{i}" for i in range(100))
+    vectorizer = BagOfWordsVectorizer(words)
+    texts = random_texts(words)
+    dense = vectorizer.transform(texts)
+    assert isinstance(dense, np.ndarray)
+    np.testing.assert_array_equal(vectorizer.transform(texts, sparse=True).toarray(), dense)
+
+
+def test_bag_of_words_matches_the_per_word_scan():
+    words = sorted({"weather", "london", "joke", "tell", "run"})
+    text = "tell weather weather paris"
+    # The original loop: 1 for each vocabulary word present in the sentence
+    expected = [1 if word in text.split() else 0 for word in words]
+    np.testing.assert_array_equal(TextPreprocessor().create_bag_of_words(text, words), expected)
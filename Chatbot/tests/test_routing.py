@@ -0,0 +1,216 @@
+import json
+
+import numpy as np
+import pytest
+
+from utils.routing import (RoutingPolicy, LegacyPolicy, calibrate, fit_temperature, precision_threshold,
+                           fit_routing_policy)
+
+
+def test_calibrate_keeps_rows_normalized_and_argmax():
+    probabilities = np.array([[0.7, 0.2, 0.1], [0.1, 0.3, 0.6]])
+    np.testing.assert_allclose(calibrate(probabilities, 1.0), probabilities)
+    for temperature in (0.5, 2.0):
+        scaled = calibrate(probabilities, temperature)
+        np.testing.assert_allclose(scaled.sum(axis=1), 1.0)
+        assert list(scaled.argmax(axis=1)) == [0, 2]
+    # T > 1 softens, T < 1 sharpens
+    assert calibrate(probabilities, 2.0)[0, 0] < 0.7 < calibrate(probabilities, 0.5)[0, 0]
+
+
+def test_fit_temperature_softens_overconfident_predictions():
+    # 0.99 confident but right only 3 times in 4: the NLL is lowest above T=1
+    probabilities = np.array([[0.99, 0.01]] * 4)
+    labels = [0, 0, 0, 1]
+    assert fit_temperature(probabilities, labels) > 1.0
+
+
+def test_fit_temperature_sharpens_underconfident_predictions():
+    probabilities = np.array([[0.6, 0.4], [0.4, 0.6]] * 4)
+    labels = [0, 1] * 4
+    assert fit_temperature(probabilities, labels) < 1.0
+
+
+def test_fit_temperature_picks_from_the_grid():
+    probabilities = np.array([[0.6, 0.4], [0.4, 0.6]])
+    assert fit_temperature(probabilities, [0, 1], temperatures=[1.0, 3.0]) == 1.0
+
+
+def test_precision_threshold_is_the_lowest_cutoff_reaching_the_target():
+    confidences = [0.3, 0.5, 0.6, 0.8, 0.9]
+    correct = [False, False, True, True, True]
+    assert precision_threshold(confidences, correct, 1.0) == 0.6
+    # 3 of 4 correct at 0.5 is not 0.8 precise, 3 of 3 at 0.6 is
+    assert precision_threshold(confidences, correct, 0.8) == 0.6
+    assert precision_threshold(confidences, correct, 0.6) == 0.3
+
+
+def test_precision_threshold_none_when_unreachable():
+    assert precision_threshold([0.5, 0.9], [True, False], 0.9) is None
+
+
+def test_needs_search_thresholds_depend_on_categories():
+    policy = RoutingPolicy(thresholds={'weather': 0.7}, default_threshold=0.8, search_threshold=0.9,
+                           min_confidence=0.4)
+    # Statements only need min_confidence
+    assert not policy.needs_search('weather', 0.5)
+    assert policy.needs_search('weather', 0.3)
+    # Questions need the intent's threshold, or the default
+    assert not policy.needs_search('weather', 0.75, {'question'})
+    assert policy.needs_search('weather', 0.65, {'question'})
+    assert policy.needs_search('joke', 0.75, {'question'})
+    assert not policy.needs_search('joke', 0.85, {'question'})
+    # Lookups also need search_threshold
+    assert policy.needs_search('weather', 0.85, {'question', 'search'})
+    assert not policy.needs_search('weather', 0.95, {'search'})
+
+
+def test_needs_search_for_search_intents_and_unknown_tags():
+    policy = RoutingPolicy()
+    assert policy.needs_search('general_knowledge', 1.0)
+    assert policy.needs_search(None, 1.0)
+
+
+def test_threshold_never_below_min_confidence():
+    policy = RoutingPolicy(thresholds={'weather': 0.1}, min_confidence=0.4)
+    assert policy.threshold('weather', {'question'}) == 0.4
+
+
+def test_legacy_policy_searches_every_question():
+    policy = LegacyPolicy()
+    assert policy.needs_search('weather', 0.99, {'question'})
+    assert not policy.needs_search('weather', 0.99)
+    assert policy.needs_search('weather', 0.3)
+
+
+def test_policy_round_trips_through_json(tmp_path):
+    path = tmp_path / 'routing.json'
+    RoutingPolicy(temperature=1.5, thresholds={'joke': 0.6}, search_threshold=0.95).save(path)
+    loaded = RoutingPolicy.load(path)
+    assert loaded.to_dict() == RoutingPolicy(temperature=1.5, thresholds={'joke': 0.6},
+                                             search_threshold=0.95).to_dict()
+
+
+def test_load_or_default_falls_back_on_a_missing_or_bad_file(tmp_path):
+    assert RoutingPolicy.load_or_default(str(tmp_path / 'missing.json')).to_dict() == RoutingPolicy().to_dict()
+    bad = tmp_path / 'bad.json'
+    bad.write_text(json.dumps({'no_such_field': 1}))
+    assert RoutingPolicy.load_or_default(str(bad)).to_dict() == RoutingPolicy().to_dict()
+
+
+def test_fit_routing_policy_thresholds_per_intent():
+    classes = np.array(['general_knowledge', 'joke', 'weather'])
+    # weather is always right, joke is wrong below 0.7
+    probabilities = np.array([
+        [0.05, 0.05, 0.9], [0.1, 0.1, 0.8], [0.1, 0.2, 0.7],
+        [0.1, 0.8, 0.1], [0.1, 0.75, 0.15], [0.2, 0.6, 0.2], [0.3, 0.55, 0.15],
+    ])
+    labels = [2, 2, 2, 1, 1, 2, 2]
+    policy = fit_routing_policy(probabilities, labels, classes, target_precision=1.0, min_support=3)
+    assert policy.thresholds['weather'] <= calibrate(probabilities, policy.temperature)[2, 2] + 1e-12
+    joke_cutoff = policy.thresholds['joke']
+    calibrated = calibrate(probabilities, policy.temperature)
+    assert calibrated[5, 1] < joke_cutoff <= calibrated[4, 1]
+    assert 'general_knowledge' not in policy.thresholds
+
+
+def test_fit_routing_policy_shares_the_default_for_rare_intents():
+    classes = np.array(['joke', 'weather'])
+    probabilities = np.array([[0.9, 0.1], [0.2, 0.8], [0.3, 0.7], [0.4, 0.6]])
+    policy = fit_routing_policy(probabilities, [0, 1, 1, 1], classes, min_support=2)
+    assert 'joke' not in policy.thresholds
+    assert 'weather' in policy.thresholds
+
+
+class CentroidModel:
+    """Stands in for the Keras model: predicts the class whose training rows
+    are nearest on average, and records the rows it was trained on"""
+    def __init__(self, num_classes, trained):
+        self.num_classes = num_classes
+        self.trained = trained
+
+    def fit(self, dataset, epochs, verbose=0):
+        X, y = dataset
+        self.trained.append(set(map(tuple, X)))
+        self.centroids = np.array([X[y == label].mean(axis=0) for label in range(self.num_classes)])
+
+    def predict(self, X, verbose=0):
+        distances = ((X[:, None, :] - self.centroids[None]) ** 2).sum(axis=2)
+        scores = np.exp(-distances)
+        return scores / scores.sum(axis=1, keepdims=True)
+
+
+@pytest.fixture
+def centroid_trainer(monkeypatch):
+    from utils.model_trainer import ModelTrainer
+
+    trainer = ModelTrainer(feature_cache_dir=None)
+    trainer.trained = []
+    monkeypatch.setattr(trainer, 'build_model', lambda input_dim, num_classes, learning_rate:
+                        CentroidModel(num_classes, trainer.trained))
+    monkeypatch.setattr(trainer, 'make_dataset', lambda X, y, batch_size, shuffle=False: (X, y))
+    return trainer
+
+
+def test_out_of_fold_probabilities_never_predict_a_row_seen_in_training(centroid_trainer):
+    rng = np.random.default_rng(0)
+    y = np.repeat(np.arange(3), [6, 5, 8])
+    # Unique rows, clustered by class
+    X = np.eye(3)[y] * 4 + rng.normal(size=(len(y), 3))
+
+    probabilities = centroid_trainer.out_of_fold_probabilities(X, y, epochs=1, batch_size=8, learning_rate=0.1)
+    assert probabilities.shape == (len(y), 3)
+    np.testing.assert_allclose(probabilities.sum(axis=1), 1.0, atol=1e-6)
+    # Five folds (the smallest intent has 5 rows), together covering every row
+    # once, and each fold model trained without its held-out rows
+    assert len(centroid_trainer.trained) == 5
+    rows = [tuple(row) for row in X]
+    for row in rows:
+        assert sum(row not in trained for trained in centroid_trainer.trained) == 1
+    assert (probabilities.argmax(axis=1) == y).mean() > 0.8
+
+
+def test_out_of_fold_probabilities_need_two_rows_per_intent(centroid_trainer):
+    y = np.array([0, 0, 0, 1])
+    assert centroid_trainer.out_of_fold_probabilities(np.eye(4), y, 1, 8, 0.1) is None
+    assert centroid_trainer.trained == []
+
+
+def test_fit_routing_reports_with_keyword_categories(tmp_path):
+    from utils.model_trainer import ModelTrainer
+
+    trainer = ModelTrainer(feature_cache_dir=None)
+    trainer.le.fit(['joke', 'weather'])
+    patterns = ['tell me a joke', 'what is the weather like?', 'is it raining', 'make me laugh']
+    # The last message is misclassified, which pushes the fitted thresholds up
+    probabilities = np.array([[0.55, 0.45], [0.1, 0.9], [0.05, 0.95], [0.4, 0.6]])
+    trainer.calibration = (probabilities, np.array([0, 1, 1, 0]), patterns)
+
+    policy = trainer.fit_routing(str(tmp_path / 'routing.json'), target_precision=1.0, min_size=4)
+    assert RoutingPolicy.load(str(tmp_path / 'routing.json')).to_dict() == policy.to_dict()
+    # The unsure question goes to search; without its categories it would
+    # only need min_confidence and every message would count as answered
+    assert trainer.report['routing_intent_rate'] == pytest.approx(0.75)
+    assert trainer.report['routing_precision'] == pytest.approx(2 / 3)
+    assert trainer.report['routing'] == 'calibrated'
+
+
+@pytest.mark.parametrize('calibration', [
+    None,
+    (np.array([[0.9, 0.1], [0.2, 0.8]]), np.array([0, 1]), ['tell me a joke', 'is it raining']),
+])
+def test_fit_routing_saves_defaults_on_small_corpora(tmp_path, calibration):
+    from utils.model_trainer import ModelTrainer
+
+    trainer = ModelTrainer(feature_cache_dir=None)
+    trainer.le.fit(['joke', 'weather'])
+    trainer.calibration = calibration
+    path = str(tmp_path / 'routing.json')
+    # A policy fitted on an earlier, larger corpus must not be kept
+    RoutingPolicy(temperature=3.0, thresholds={'joke': 0.99}).save(path)
+
+    with pytest.warns(UserWarning, match='default routing policy'):
+        policy = trainer.fit_routing(path)
+    assert policy.to_dict() == RoutingPolicy().to_dict()
+    assert RoutingPolicy.load(path).to_dict() == RoutingPolicy().to_dict()
+    assert 'default policy' in trainer.timing_report()
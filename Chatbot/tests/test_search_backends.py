@@ -0,0 +1,103 @@
+import threading
+import time
+
+from utils.search_backends import SearchBackend, SearchResult, SearchFanout, WikipediaBackend
+
+
+class FakePage:
+    def __init__(self, title, summary):
+        self.title = title
+        self.summary = summary
+
+    def exists(self):
+        return bool(self.summary)
+
+
+class FakeWikipedia:
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def page(self, title):
+        self.requested.append(title)
+        return self.pages.get(title, FakePage(title, ''))
+
+
+def test_wikipedia_answers_from_the_topic_article():
+    wikipedia = FakeWikipedia({'Albert einstein': FakePage(
+        'Albert Einstein', 'Albert Einstein was a theoretical physicist. He developed relativity. He was born in Ulm.')})
+    result = WikipediaBackend(wikipedia=wikipedia).search("Who was Albert Einstein?")
+    assert wikipedia.requested == ['Albert einstein']
+    assert result.answer == ("According to Wikipedia: Albert Einstein was a theoretical physicist. "
+                             "He developed relativity.")
+    assert result.score == 0.75
+
+
+def test_wikipedia_rejects_disambiguation_pages():
+    wikipedia = FakeWikipedia({'Mercury': FakePage('Mercury', 'Mercury may refer to:')})
+    assert WikipediaBackend(wikipedia=wikipedia).search("what is mercury") is None
+
+
+def test_wikipedia_scores_by_topic_coverage():
+    # A redirect to an article that only covers a third of the question
+    wikipedia = FakeWikipedia({'Python snake venom': FakePage(
+        'Python (programming language)', 'Python is a high-level programming language.')})
+    result = WikipediaBackend(wikipedia=wikipedia, score=0.75).search("what is python snake venom")
+    assert result.score == 0.25
+
+    wikipedia = FakeWikipedia({'Python snake venom': FakePage(
+        'Pythonidae', 'The Pythonidae are a family of nonvenomous snakes.')})
+    assert WikipediaBackend(wikipedia=wikipedia).search("what is python snake venom") is None
+
+
+def test_wikipedia_missing_page():
+    assert WikipediaBackend(wikipedia=FakeWikipedia({})).search("what is a zorblax") is None
+
+
+class HangingBackend(SearchBackend):
+    name = 'hanging'
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def search(self, query):
+        self.release.wait(5)
+        return None
+
+
+class FastBackend(SearchBackend):
+    name = 'fast'
+
+    def search(self, query):
+        return SearchResult(f"answer to {query}", 0.9, self.name)
+
+
+def test_hung_backend_does_not_starve_the_others():
+    hanging = HangingBackend()
+    fanout = SearchFanout([hanging, FastBackend()], deadline=0.5, workers_per_backend=2)
+    try:
+        # Fill the hanging backend's pool with stragglers from earlier searches
+        for i in range(4):
+            fanout.search(f"query {i}")
+
+        start = time.monotonic()
+        results = []
+        threads = [threading.Thread(target=lambda i=i: results.append(fanout.search(f"new {i}")))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert time.monotonic() - start < 0.5
+        assert sorted(result.answer for result, _ in results) == sorted(f"answer to new {i}" for i in range(8))
+    finally:
+        hanging.release.set()
+
+
+def test_incomplete_when_a_backend_misses_the_deadline():
+    hanging = HangingBackend()
+    fanout = SearchFanout([hanging], deadline=0.1)
+    try:
+        assert fanout.search("anything") == (None, False)
+    finally:
+        hanging.release.set()
@@ -0,0 +1,156 @@
+import threading
+import time
+
+import pytest
+
+from utils.response_generator import ResponseGenerator
+from utils.session_store import SessionStore, SessionState, locked
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_idle_sessions_expire_after_the_ttl(clock):
+    store = SessionStore(ttl=60, clock=clock)
+    first = store.get('a')
+    first.last_intent = 'weather'
+
+    clock.now = 59
+    assert store.get('a') is first
+
+    # Idle time counts from the last get, not from creation
+    clock.now = 118
+    assert store.get('a') is first
+
+    clock.now = 178
+    fresh = store.get('a')
+    assert fresh is not first and fresh.last_intent is None
+
+
+def test_expiry_drops_only_idle_sessions(clock):
+    store = SessionStore(ttl=60, clock=clock)
+    store.get('a')
+    clock.now = 30
+    store.get('b')
+    clock.now = 70
+    store.get('c')
+    assert len(store) == 2
+    assert list(store._sessions) == ['b', 'c']
+
+
+def test_least_recently_seen_session_is_evicted_first(clock):
+    store = SessionStore(max_sessions=3, clock=clock)
+    states = {session_id: store.get(session_id) for session_id in 'abc'}
+    # Seeing 'a' again makes 'b' the oldest
+    clock.now = 1
+    store.get('a')
+    clock.now = 2
+    store.get('d')
+    assert len(store) == 3
+    assert list(store._sessions) == ['c', 'a', 'd']
+    assert store.get('a') is states['a']
+    assert store.get('b') is not states['b']
+
+
+def test_history_keeps_the_latest_turns():
+    state = SessionState(max_history=3)
+    for i in range(5):
+        state.record(f"message {i}", f"response {i}")
+    assert list(state.history) == [(f"message {i}", f"response {i}") for i in (2, 3, 4)]
+    assert SessionStore(max_history=2).get('a').history.maxlen == 2
+
+
+def test_drop(clock):
+    store = SessionStore(clock=clock)
+    state = store.get('a')
+    store.drop('a')
+    store.drop('missing')
+    assert len(store) == 0 and store.get('a') is not state
+
+
+def test_locked_takes_shared_sessions_in_one_order():
+    a, b = SessionState(), SessionState()
+    done = []
+
+    def hold(states):
+        for _ in range(200):
+            with locked(states):
+                pass
+        done.append(True)
+
+    # Opposite orders, and a session repeated within one batch
+    threads = [threading.Thread(target=hold, args=([a, b, a],), daemon=True),
+               threading.Thread(target=hold, args=([b, a],), daemon=True)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert done == [True, True], "locked() deadlocked"
+    assert not a.lock.locked() and not b.lock.locked()
+
+
+class NoModel:
+    def load(self):
+        pass
+
+    def get(self):
+        return None
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    """A ResponseGenerator answering every message from the heuristics, slowly,
+    recording which sessions are being answered at the same time"""
+    generator = ResponseGenerator('data/intents.json', 'models/intent_classifier.h5', registry=NoModel())
+    active = {}
+    overlaps = []
+    guard = threading.Lock()
+
+    def respond_without_model(user_input):
+        session_id = user_input.split()[0]
+        with guard:
+            if active.get(session_id):
+                overlaps.append(session_id)
+            active[session_id] = active.get(session_id, 0) + 1
+        time.sleep(0.005)
+        with guard:
+            active[session_id] -= 1
+        return f"answer to {user_input}"
+
+    monkeypatch.setattr(generator, 'respond_without_model', respond_without_model)
+    generator.overlaps = overlaps
+    return generator
+
+
+def test_concurrent_batches_of_one_session_do_not_interleave(generator):
+    errors = []
+
+    def run(batch):
+        try:
+            messages = [f"{session_id} message" for session_id in batch]
+            assert generator.process_batch(messages, session_ids=batch) == [f"answer to {m}" for m in messages]
+            generator.process_input(f"{batch[0]} single", session_id=batch[0])
+        except Exception as e:
+            errors.append(e)
+
+    batches = [['a', 'b', 'a'], ['b', 'a'], ['a', 'c'], ['c', 'b']]
+    threads = [threading.Thread(target=run, args=(batch,), daemon=True) for batch in batches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+        assert not thread.is_alive(), "process_batch deadlocked"
+    assert errors == []
+    assert generator.overlaps == []
+    # Every turn of 'a' was recorded: four batch messages and two single ones
+    assert len(generator.sessions.get('a').history) == 6
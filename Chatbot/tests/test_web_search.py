@@ -0,0 +1,59 @@
+from utils.answer_cache import AnswerCache
+from utils.google_searcher import NO_RESULTS_MESSAGE, SEARCH_ERROR_MESSAGE
+from utils.search_backends import SearchBackend, SearchResult, LocalBackend
+from utils.web_search import WebSearch
+
+
+class FakeIndex:
+    """Stand-in knowledge index answering every query with one scored document"""
+    def __init__(self, answer, score):
+        self.answer = answer
+        self.score = score
+
+    def search(self, query, top_k=1):
+        return [(self.answer, self.score)]
+
+
+class StandInBackend(SearchBackend):
+    name = 'stand_in'
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+
+    def search(self, query):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def make_search(local_score, backend):
+    local = LocalBackend(index=FakeIndex("The capital of France is Paris.", local_score))
+    return WebSearch(backends=[backend], cache=AnswerCache(), local=local)
+
+
+def test_strong_local_match_is_answered_without_the_network():
+    backend = StandInBackend(SearchResult("remote", 0.9, 'stand_in'))
+    search = make_search(0.8, backend)
+    assert search.get_answer("what is the capital of France") == "The capital of France is Paris."
+    assert backend.calls == 0
+
+
+def test_weak_local_match_is_not_served_when_backends_fail():
+    search = make_search(0.41, StandInBackend(error=RuntimeError("offline")))
+    assert search.get_answer("what is the capital of Peru") == SEARCH_ERROR_MESSAGE
+    # Failures are transient and never cached
+    assert search.cache.get("what is the capital of Peru") is None
+
+
+def test_weak_local_match_is_not_served_when_nothing_is_found():
+    search = make_search(0.55, StandInBackend(result=None))
+    assert search.get_answer("who invented the radio") == NO_RESULTS_MESSAGE
+    assert search.cache.get("who invented the radio") == NO_RESULTS_MESSAGE
+
+
+def test_weak_local_match_loses_to_any_remote_answer():
+    search = make_search(0.55, StandInBackend(SearchResult("Marconi.", 0.4, 'stand_in')))
+    assert search.get_answer("who invented the radio") == "Marconi."
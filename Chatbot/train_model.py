@@ -1,5 +1,6 @@
 import sys
 import os
+import argparse
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -7,13 +8,26 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from utils.model_trainer import ModelTrainer
 
 def main():
+    parser = argparse.ArgumentParser(description="Train the intent classifier")
+    parser.add_argument('--compare-baseline', action='store_true',
+                        help="also train the original batch_size=4 setup (not saved) and compare timings")
+    parser.add_argument('--no-feature-cache', action='store_true', help="featurize intents.json from scratch")
+    args = parser.parse_args()
+    
     print("Training chatbot model...")
     
     # Create models directory if it doesn't exist
     if not os.path.exists('models'):
         os.makedirs('models')
     
-    trainer = ModelTrainer()
+    trainer = ModelTrainer(feature_cache_dir=None if args.no_feature_cache else 'models/feature_cache')
+    
+    if args.compare_baseline:
+        print("Training baseline (batch_size=4, learning_rate=0.0005)...")
+        trainer.train('data/intents.json', None, batch_size=4, learning_rate=0.0005, save=False,
+                      calibration_folds=0)
+        baseline_report = trainer.timing_report()
+    
     model, history = trainer.train(
         data_path='data/intents.json',
         model_save_path='models/intent_classifier.h5'
@@ -22,6 +36,18 @@ def main():
     print("Model training completed!")
     print(f"Final training accuracy: {history.history['accuracy'][-1]:.4f}")
     print(f"Final validation accuracy: {history.history['val_accuracy'][-1]:.4f}")
+    
+    # Export weights for the NumPy inference engine used at serve time
+    _, max_diff = trainer.export_numpy_model(model, 'models/intent_classifier.npz')
+    print(f"Exported models/intent_classifier.npz (max difference vs Keras: {max_diff:.2e})")
+    
+    # Calibrate when to answer from an intent vs. search, on out-of-fold predictions
+    trainer.fit_routing('models/routing.json')
+    print("Saved models/routing.json")
+    
+    print(trainer.timing_report())
+    if args.compare_baseline:
+        print(f"Baseline:\n{baseline_report}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,134 @@
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from .instrumentation import get_logger
+
+log = get_logger('answer_cache')
+
+# Letters and digits of any script are kept, and so are '+' and '#', which
+# tell apart queries like "c++" and "c#"; other punctuation separates words
+_PUNCTUATION_RE = re.compile(r'[^\w\s+#]|_')
+_SPACES_RE = re.compile(r'\s+')
+
+# Bump when normalize_query changes, so keys written by an older version
+# are dropped instead of matching different queries
+KEY_VERSION = 2
+
+
+def normalize_query(query):
+    """Cache key for a query: NFKC, case-folded, punctuation collapsed to single spaces"""
+    query = unicodedata.normalize('NFKC', query).casefold()
+    query = _PUNCTUATION_RE.sub(' ', query)
+    return _SPACES_RE.sub(' ', query).strip()
+
+
+def cacheable_key(key):
+    """Keys without a letter or digit (e.g. "???") would lump unrelated queries together"""
+    return any(char.isalnum() for char in key)
+
+
+class AnswerCache:
+    def __init__(self, db_path=None, max_entries=2048, ttl=24 * 3600, negative_ttl=15 * 60, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'negative_hits': 0, 'misses': 0}
+
+        # key -> (answer, negative, expires_at), least recently used first
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db = None
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS answers ('
+                    'key TEXT PRIMARY KEY, answer TEXT NOT NULL, '
+                    'negative INTEGER NOT NULL, expires_at REAL NOT NULL)'
+                )
+                if self._db.execute('PRAGMA user_version').fetchone()[0] != KEY_VERSION:
+                    self._db.execute('DELETE FROM answers')
+                    self._db.execute(f'PRAGMA user_version = {KEY_VERSION}')
+                self._db.execute('DELETE FROM answers WHERE expires_at <= ?', (self.clock(),))
+                self._db.commit()
+            except sqlite3.Error as e:
+                log.warning("Answer cache database unavailable, using memory only: %s", e)
+                self._db = None
+
+    def get(self, query):
+        """Return the cached answer for `query`, or None if there is no live entry"""
+        key = normalize_query(query)
+        if not cacheable_key(key):
+            return None
+        now = self.clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[2] > now:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+            else:
+                if entry is not None:
+                    del self._memory[key]
+                entry = self._get_from_disk(key, now)
+                if entry is None:
+                    self.stats['misses'] += 1
+                    return None
+                self.stats['disk_hits'] += 1
+                self._remember(key, entry)
+
+            if entry[1]:
+                self.stats['negative_hits'] += 1
+            return entry[0]
+
+    def put(self, query, answer, negative=False):
+        """Cache `answer`; negative entries (nothing found) expire sooner"""
+        key = normalize_query(query)
+        if not cacheable_key(key):
+            return
+        ttl = self.negative_ttl if negative else self.ttl
+        entry = (answer, negative, self.clock() + ttl)
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO answers (key, answer, negative, expires_at) VALUES (?, ?, ?, ?)',
+                        (key, answer, int(negative), entry[2]),
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    log.warning("Error writing answer cache: %s", e)
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM answers')
+                self._db.commit()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _get_from_disk(self, key, now):
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                'SELECT answer, negative, expires_at FROM answers WHERE key = ? AND expires_at > ?',
+                (key, now),
+            ).fetchone()
+        except sqlite3.Error as e:
+            log.warning("Error reading answer cache: %s", e)
+            return None
+        if row is None:
+            return None
+        return (row[0], bool(row[1]), row[2])
@@ -0,0 +1,21 @@
+"""Write files so that readers never see them half-written."""
+import contextlib
+import os
+
+
+@contextlib.contextmanager
+def replacing(path):
+    """Yield a temporary path next to `path` and move it over `path` once
+    the block succeeds; on error `path` is left untouched.
+
+    The temporary name keeps the extension, for writers (like Keras) that
+    pick the file format from it.
+    """
+    root, ext = os.path.splitext(path)
+    temp_path = f'{root}.{os.getpid()}.tmp{ext}'
+    try:
+        yield temp_path
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -0,0 +1,59 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Bump when cleaning or featurization changes, so old caches are not reused
+FEATURE_VERSION = 1
+
+
+def intents_hash(path):
+    """Content hash of an intents file (plus the feature version)"""
+    digest = hashlib.sha256(f'features-v{FEATURE_VERSION}\n'.encode())
+    with open(path, 'rb') as file:
+        digest.update(file.read())
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """Featurized training matrices keyed by a content hash of the intents file.
+
+    `cleaned.json` keeps every pattern's cleaned text across versions of the
+    file, so after an edit only new or changed patterns are re-tokenized and
+    re-stemmed; `features-<hash>.npz` holds X, the labels and the vocabulary
+    for the latest version.
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.cleaned_path = os.path.join(cache_dir, 'cleaned.json')
+
+    def _features_path(self, key):
+        return os.path.join(self.cache_dir, f'features-{key}.npz')
+
+    def load(self, key):
+        """(X, tags, words) cached for `key`, or None"""
+        try:
+            with np.load(self._features_path(key), allow_pickle=False) as data:
+                return data['X'], data['tags'].tolist(), data['words'].tolist()
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, key, X, tags, words, cleaned):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Only the latest featurization is kept; cleaned texts carry over
+        for name in os.listdir(self.cache_dir):
+            if name.startswith('features-') and name.endswith('.npz'):
+                os.remove(os.path.join(self.cache_dir, name))
+        np.savez(self._features_path(key), X=X, tags=np.array(tags, dtype=str),
+                 words=np.array(words, dtype=str))
+        with open(self.cleaned_path, 'w') as file:
+            json.dump(cleaned, file)
+
+    def cleaned_texts(self):
+        """pattern -> cleaned text from previous runs"""
+        try:
+            with open(self.cleaned_path, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
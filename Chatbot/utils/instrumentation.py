@@ -0,0 +1,174 @@
+"""Per-stage latency histograms, counters and sampled logging for the request path.
+
+Stages are timed with `metrics.timer('classify')` (or `metrics.observe`)
+and counted with `metrics.increment('answer_cache_hits')`; app.py serves
+everything on /metrics. Per-request log lines go through SampledLogger so
+a busy server logs a fraction of them instead of writing to stdout on
+every request:
+
+    CHATBOT_LOG_LEVEL          logging level name (default INFO)
+    CHATBOT_LOG_SAMPLE_RATE    fraction of per-request lines logged (default 0.01)
+"""
+import bisect
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in milliseconds
+DEFAULT_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms):
+        bucket = bisect.bisect_left(self.buckets_ms, ms)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.sum_ms += ms
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (ms), or None"""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return None
+        rank = q / 100 * count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets_ms + (float('inf'),), counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        with self._lock:
+            count, sum_ms = self.count, self.sum_ms
+        return {
+            'count': count,
+            'mean_ms': sum_ms / count if count else None,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+        }
+
+
+class Metrics:
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, Histogram(self.buckets_ms))
+        return histogram
+
+    def observe(self, stage, seconds):
+        self.histogram(stage).observe(seconds * 1000)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def increment(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+
+    def snapshot(self):
+        """JSON-friendly view: per-stage count/mean/percentiles and the counters"""
+        with self._lock:
+            histograms, counters = dict(self.histograms), dict(self.counters)
+        return {
+            'stages': {stage: histogram.snapshot() for stage, histogram in sorted(histograms.items())},
+            'counters': dict(sorted(counters.items())),
+        }
+
+    def render_prometheus(self):
+        """Prometheus text exposition format"""
+        with self._lock:
+            histograms, counters = dict(self.histograms), dict(self.counters)
+        lines = ['# TYPE chatbot_stage_latency_ms histogram']
+        for stage, histogram in sorted(histograms.items()):
+            with histogram._lock:
+                counts, count, sum_ms = list(histogram.counts), histogram.count, histogram.sum_ms
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets_ms + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'chatbot_stage_latency_ms_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'chatbot_stage_latency_ms_sum{{stage="{stage}"}} {sum_ms}')
+            lines.append(f'chatbot_stage_latency_ms_count{{stage="{stage}"}} {count}')
+        for counter, value in sorted(counters.items()):
+            lines.append(f'# TYPE chatbot_{counter}_total counter')
+            lines.append(f'chatbot_{counter}_total {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# Shared by every module on the request path
+metrics = Metrics()
+
+
+class SampledLogger:
+    """Logs debug/info lines for a random `sample_rate` fraction of calls;
+    warnings and errors are always logged"""
+    def __init__(self, logger, sample_rate):
+        self.logger = logger
+        self.sample_rate = sample_rate
+
+    def _sampled(self, level):
+        return self.logger.isEnabledFor(level) and random.random() < self.sample_rate
+
+    def debug(self, msg, *args):
+        if self._sampled(logging.DEBUG):
+            self.logger.debug(msg, *args)
+
+    def info(self, msg, *args):
+        if self._sampled(logging.INFO):
+            self.logger.info(msg, *args)
+
+    def warning(self, msg, *args):
+        self.logger.warning(msg, *args)
+
+    def error(self, msg, *args, exc_info=False):
+        self.logger.error(msg, *args, exc_info=exc_info)
+
+
+def _configure_root_logger():
+    logger = logging.getLogger('chatbot')
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(os.environ.get('CHATBOT_LOG_LEVEL', 'INFO').upper())
+        logger.propagate = False
+    return logger
+
+
+def get_logger(name, sample_rate=None):
+    """Sampled logger under the 'chatbot' hierarchy"""
+    _configure_root_logger()
+    if sample_rate is None:
+        sample_rate = float(os.environ.get('CHATBOT_LOG_SAMPLE_RATE', '0.01'))
+    return SampledLogger(logging.getLogger(f'chatbot.{name}'), sample_rate)
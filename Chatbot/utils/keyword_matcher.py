@@ -0,0 +1,54 @@
+import functools
+import json
+import re
+
+
+def _trie_pattern(keywords):
+    """Regex for a set of literals with shared prefixes factored out, trie-style"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Optional and greedy, so the longest keyword at each position wins
+        return f'(?:{pattern})?' if '' in node else pattern
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    def __init__(self, tables, cache_size=4096):
+        self.tables = {category: list(keywords) for category, keywords in tables.items()}
+        keywords = {keyword.lower() for words in self.tables.values() for keyword in words}
+
+        # A match reports the longest keyword starting at each position, so a
+        # keyword stands for every category whose keywords it contains: a
+        # "what's up" match also means "what" (a question) is in the text.
+        self._categories = {
+            keyword: frozenset(category for category, words in self.tables.items()
+                               if any(word.lower() in keyword for word in words))
+            for keyword in keywords
+        }
+        # Zero-width lookahead so overlapping keywords are all found in one scan
+        self._pattern = re.compile('(?=(' + _trie_pattern(keywords) + '))')
+        self.match = functools.lru_cache(maxsize=cache_size)(self._match)
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Load keyword tables from a JSON object of category -> keywords"""
+        with open(path, 'r') as file:
+            return cls(json.load(file), **kwargs)
+
+    def _match(self, text):
+        """Every category with a keyword occurring (as a substring) in text"""
+        categories = frozenset()
+        for found in self._pattern.finditer(text.lower()):
+            categories |= self._categories[found.group(1)]
+        return categories
@@ -0,0 +1,252 @@
+import json
+import math
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import Counter
+
+import numpy as np
+
+CHATBOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CORPUS_PATHS = [os.path.join(CHATBOT_DIR, 'data', 'knowledge.jsonl')]
+DEFAULT_INDEX_DIR = os.path.join(CHATBOT_DIR, 'data', 'knowledge_index')
+
+# Arrays are stored as individual .npy files so they can be memory-mapped
+_ARRAY_FILES = ['terms', 'term_offsets', 'postings_docs', 'postings_tf', 'doc_lengths', 'doc_offsets', 'docs']
+
+
+def default_tokenizer():
+    """Tokenize the same way as the intent classifier: cleaned, stemmed words"""
+    from .preprocessor import TextPreprocessor
+    preprocessor = TextPreprocessor()
+    return lambda text: preprocessor.clean_text(text).split()
+
+
+def read_corpus(path):
+    """Yield (index_text, answer) pairs from a JSONL or plain-text corpus file.
+
+    JSONL lines need an "answer" or "text" field and may add "question" and
+    "title", which are indexed but not returned. Plain-text files are split
+    into one document per blank-line separated paragraph.
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        if path.endswith('.jsonl'):
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                answer = record.get('answer') or record.get('text')
+                if not answer:
+                    continue
+                index_text = ' '.join(record.get(key, '') for key in ('title', 'question'))
+                yield f"{index_text} {answer}", answer
+        else:
+            for paragraph in file.read().split('\n\n'):
+                paragraph = ' '.join(paragraph.split())
+                if paragraph:
+                    yield paragraph, paragraph
+
+
+def _source_mtimes(corpus_paths):
+    return {os.path.abspath(path): os.path.getmtime(path) for path in corpus_paths}
+
+
+class KnowledgeIndex:
+    def __init__(self, arrays, meta, tokenize=None):
+        self.terms = arrays['terms']
+        self.term_offsets = arrays['term_offsets']
+        self.postings_docs = arrays['postings_docs']
+        self.postings_tf = arrays['postings_tf']
+        self.doc_lengths = arrays['doc_lengths']
+        self.doc_offsets = arrays['doc_offsets']
+        self.docs = arrays['docs']
+        self.meta = meta
+        self.k1 = meta['k1']
+        self.b = meta['b']
+        self.tokenize = tokenize or default_tokenizer()
+
+    @property
+    def num_docs(self):
+        return len(self.doc_lengths)
+
+    @classmethod
+    def build(cls, corpus_paths, index_dir, tokenize=None, k1=1.2, b=0.75):
+        """Build a BM25 inverted index from corpus files and write it to `index_dir`"""
+        tokenize = tokenize or default_tokenizer()
+        postings = {}
+        doc_lengths = []
+        answers = []
+
+        for path in corpus_paths:
+            for index_text, answer in read_corpus(path):
+                doc_id = len(answers)
+                tokens = tokenize(index_text)
+                for term, tf in Counter(tokens).items():
+                    postings.setdefault(term, []).append((doc_id, tf))
+                doc_lengths.append(len(tokens))
+                answers.append(answer)
+
+        terms = sorted(postings)
+        term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        term_offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+        pairs = [pair for term in terms for pair in postings[term]]
+        encoded = [answer.encode('utf-8') for answer in answers]
+        doc_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        doc_offsets[1:] = np.cumsum([len(data) for data in encoded])
+
+        arrays = {
+            'terms': np.array(terms, dtype=str) if terms else np.array([], dtype='<U1'),
+            'term_offsets': term_offsets,
+            'postings_docs': np.array([doc for doc, _ in pairs], dtype=np.int32),
+            'postings_tf': np.array([tf for _, tf in pairs], dtype=np.float32),
+            'doc_lengths': np.array(doc_lengths, dtype=np.float32),
+            'doc_offsets': doc_offsets,
+            'docs': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+        }
+        meta = {
+            'k1': k1,
+            'b': b,
+            'avg_doc_length': float(np.mean(doc_lengths)) if doc_lengths else 0.0,
+            'sources': _source_mtimes(corpus_paths),
+            # Tells load() when the directory was swapped while it was reading
+            'build_id': uuid.uuid4().hex,
+        }
+
+        # A running server may have the current files memory-mapped, so they
+        # are never rewritten in place: the new index is written to a sibling
+        # directory and renamed over the old one. Mapped files stay valid
+        # until the server lets go of them.
+        index_dir = os.path.abspath(index_dir)
+        build_dir = f'{index_dir}.{os.getpid()}.tmp'
+        old_dir = f'{index_dir}.{os.getpid()}.old'
+        shutil.rmtree(build_dir, ignore_errors=True)
+        os.makedirs(build_dir)
+        try:
+            for name in _ARRAY_FILES:
+                np.save(os.path.join(build_dir, f'{name}.npy'), arrays[name])
+            with open(os.path.join(build_dir, 'meta.json'), 'w') as file:
+                json.dump(meta, file)
+            # A directory can only be renamed over an empty one
+            if os.path.exists(index_dir):
+                os.replace(index_dir, old_dir)
+            os.replace(build_dir, index_dir)
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+        return cls(arrays, meta, tokenize)
+
+    @classmethod
+    def load(cls, index_dir, tokenize=None, attempts=3):
+        """Memory-map an index written by build(); only meta.json is parsed.
+
+        If a rebuild swaps the directory while the files are being opened,
+        they are opened again so all of them come from the same build.
+        """
+        meta_path = os.path.join(index_dir, 'meta.json')
+        for attempt in range(attempts):
+            try:
+                with open(meta_path, 'r') as file:
+                    meta = json.load(file)
+                arrays = {name: np.load(os.path.join(index_dir, f'{name}.npy'), mmap_mode='r')
+                          for name in _ARRAY_FILES}
+                with open(meta_path, 'r') as file:
+                    if json.load(file).get('build_id') == meta.get('build_id'):
+                        return cls(arrays, meta, tokenize)
+            except FileNotFoundError:
+                # Between the two renames of a swap
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(0.01)
+        raise OSError(f"Knowledge index {index_dir} kept changing while it was loaded")
+
+    @classmethod
+    def load_or_build(cls, index_dir, corpus_paths, tokenize=None):
+        """Load the index, (re)building it if it is missing or its corpus changed.
+
+        An existing index is checked against the corpus files it was built
+        from; `corpus_paths` is only used when there is nothing to go on.
+        """
+        meta_path = os.path.join(index_dir, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as file:
+                sources = json.load(file).get('sources', {})
+            try:
+                if _source_mtimes(sources) == sources:
+                    return cls.load(index_dir, tokenize)
+                corpus_paths = list(sources)
+            except OSError:
+                pass
+        print(f"Building knowledge index in {index_dir}")
+        return cls.build(corpus_paths, index_dir, tokenize)
+
+    def answer(self, doc_id):
+        """Stored answer text of a document"""
+        start, end = self.doc_offsets[doc_id], self.doc_offsets[doc_id + 1]
+        return bytes(self.docs[start:end]).decode('utf-8')
+
+    def _term_id(self, term):
+        i = int(np.searchsorted(self.terms, term))
+        if i < len(self.terms) and self.terms[i] == term:
+            return i
+        return None
+
+    def search(self, query, top_k=3):
+        """BM25 search returning [(answer, score)] with the best match first.
+
+        Scores are normalized by the score of a document that contains every
+        query term once at average length, and clipped to [0, 1]. Query terms
+        missing from the corpus count against the score, so questions about
+        topics the corpus doesn't cover score low.
+        """
+        num_docs = self.num_docs
+        terms = set(self.tokenize(query))
+        if not terms or num_docs == 0:
+            return []
+
+        avg_doc_length = self.meta['avg_doc_length'] or 1.0
+        doc_ids, weights = [], []
+        max_score = 0.0
+        for term in terms:
+            term_id = self._term_id(term)
+            df = 0
+            if term_id is not None:
+                start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+                df = end - start
+            idf = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+            max_score += idf
+            if not df:
+                continue
+
+            docs = np.asarray(self.postings_docs[start:end])
+            tf = np.asarray(self.postings_tf[start:end])
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / avg_doc_length)
+            doc_ids.append(docs)
+            weights.append(idf * tf * (self.k1 + 1) / (tf + norm))
+
+        if not doc_ids:
+            return []
+
+        unique_docs, inverse = np.unique(np.concatenate(doc_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(weights))
+        best = np.argsort(-scores)[:top_k]
+        return [(self.answer(int(unique_docs[i])), min(1.0, float(scores[i] / max_score)))
+                for i in best]
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_default_index():
+    """Shared index over data/knowledge.jsonl, built on first use if missing or stale"""
+    global _default_index
+    if _default_index is None:
+        with _default_index_lock:
+            if _default_index is None:
+                corpus_paths = [path for path in DEFAULT_CORPUS_PATHS if os.path.exists(path)]
+                _default_index = KnowledgeIndex.load_or_build(DEFAULT_INDEX_DIR, corpus_paths)
+    return _default_index
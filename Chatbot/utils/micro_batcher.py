@@ -0,0 +1,90 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class MicroBatcher:
+    def __init__(self, process_batch, window_ms=5, max_batch_size=64, max_inflight_batches=4):
+        self.process_batch = process_batch
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.max_inflight_batches = max_inflight_batches
+
+        self._queue = queue.Queue()
+        self._collector = None
+        self._executor = None
+
+    def start(self):
+        """Start collecting queued messages into batches"""
+        if self._collector is not None:
+            return
+        # Batches run on a small pool so one batch stuck on a slow web search
+        # doesn't hold back the batches queued behind it
+        self._executor = ThreadPoolExecutor(max_workers=self.max_inflight_batches,
+                                            thread_name_prefix='micro-batch')
+        self._collector = threading.Thread(target=self._collect, name='micro-batcher', daemon=True)
+        self._collector.start()
+
+    def stop(self):
+        """Finish the queued work and shut the batcher down"""
+        if self._collector is None:
+            return
+        self._queue.put(None)
+        self._collector.join()
+        self._executor.shutdown(wait=True)
+        self._collector = None
+        self._executor = None
+
+    def submit(self, item):
+        """Queue one item; the returned Future resolves to its result"""
+        if self._collector is None:
+            raise RuntimeError("MicroBatcher is not running; call start() first")
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            # Wait at most one window after the first item for more to arrive
+            batch = [first]
+            deadline = time.monotonic() + self.window
+            stopping = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+
+            self._executor.submit(self._run_batch, batch)
+            if stopping:
+                return
+
+    def _run_batch(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = self.process_batch(items)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # Retry one at a time, so a single bad item only fails its own request
+            for item, future in batch:
+                try:
+                    future.set_result(self.process_batch([item])[0])
+                except Exception as item_error:
+                    future.set_exception(item_error)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
@@ -0,0 +1,128 @@
+import os
+import pickle
+import threading
+import time
+from collections import namedtuple
+from .numpy_inference import NumpyMLP
+from .preprocessor import BagOfWordsVectorizer
+from .routing import RoutingPolicy
+
+# Immutable snapshot of everything needed to classify a message. Readers grab
+# one reference and use it for the whole request, so a reload swapping in a
+# new snapshot never leaves them with a mismatched model/vocabulary pair
+# (or a routing policy calibrated for another model).
+ModelArtifacts = namedtuple('ModelArtifacts', ['model', 'words', 'vectorizer', 'label_encoder', 'routing', 'version'])
+
+
+def model_dims(model):
+    """(input size, number of classes) of a NumpyMLP or Keras model"""
+    if isinstance(model, NumpyMLP):
+        return model.input_dim, model.output_dim
+    return model.input_shape[-1], model.output_shape[-1]
+
+
+class ModelRegistry:
+    def __init__(self, model_path, tokenizer_path=None, label_encoder_path=None,
+                 numpy_model_path=None, routing_path=None, check_interval=2.0):
+        model_dir = os.path.dirname(model_path)
+        self.model_path = model_path
+        self.numpy_model_path = numpy_model_path or os.path.splitext(model_path)[0] + '.npz'
+        self.tokenizer_path = tokenizer_path or os.path.join(model_dir, 'tokenizer.pickle')
+        self.label_encoder_path = label_encoder_path or os.path.join(model_dir, 'label_encoder.pickle')
+        self.routing_path = routing_path or os.path.join(model_dir, 'routing.json')
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._artifacts = None
+        self._mtimes = None
+        self._last_check = 0.0
+        self._version = 0
+
+    def artifact_paths(self):
+        """Files whose modification triggers a reload"""
+        return (self.model_path, self.numpy_model_path, self.tokenizer_path, self.label_encoder_path,
+                self.routing_path)
+
+    def _read_mtimes(self):
+        return tuple(os.path.getmtime(path) if os.path.exists(path) else None
+                     for path in self.artifact_paths())
+
+    def _load_artifacts(self):
+        with open(self.tokenizer_path, 'rb') as handle:
+            words = pickle.load(handle)
+
+        # Prefer the exported NumPy weights: serving them needs neither
+        # TensorFlow nor sklearn, which keeps cold start well under a second
+        label_encoder = None
+        if os.path.exists(self.numpy_model_path):
+            model = NumpyMLP.load(self.numpy_model_path)
+            label_encoder = model.label_decoder()
+        else:
+            from tensorflow.keras.models import load_model
+            model = load_model(self.model_path)
+
+        if label_encoder is None:
+            with open(self.label_encoder_path, 'rb') as handle:
+                label_encoder = pickle.load(handle)
+
+        # Training writes these files one after another: a server checking
+        # in between would pair the new model with the old vocabulary or
+        # classes. Refuse such a mix so the current snapshot stays
+        input_dim, output_dim = model_dims(model)
+        if len(words) != input_dim or len(label_encoder.classes_) != output_dim:
+            raise ValueError(f"Model artifacts do not match: {len(words)} words and "
+                             f"{len(label_encoder.classes_)} classes for a {input_dim} -> {output_dim} model")
+
+        # Fitted by train_model.py; the uncalibrated defaults until then
+        routing = RoutingPolicy.load_or_default(self.routing_path)
+
+        self._version += 1
+        return ModelArtifacts(model, words, BagOfWordsVectorizer(words), label_encoder, routing, self._version)
+
+    def load(self):
+        """Load every artifact from disk and swap them in atomically"""
+        with self._lock:
+            self._reload_locked(self._read_mtimes())
+        return self._artifacts
+
+    def _reload_locked(self, mtimes):
+        self._last_check = time.monotonic()
+        artifacts = self._load_artifacts()
+        self._artifacts = artifacts
+        self._mtimes = mtimes
+        print(f"Loaded model artifacts (version {artifacts.version}, {type(artifacts.model).__name__})")
+
+    def reload_if_changed(self, blocking=True):
+        """Reload the artifacts if any of the files changed on disk.
+
+        Returns True when a new snapshot was swapped in. If the new files
+        cannot be read or do not match each other (e.g. training is still
+        writing them) the current snapshot stays in place and the reload is
+        retried on the next check.
+        """
+        if not self._lock.acquire(blocking=blocking):
+            # Another thread is already checking or reloading
+            return False
+        try:
+            self._last_check = time.monotonic()
+            mtimes = self._read_mtimes()
+            if self._artifacts is not None and mtimes == self._mtimes:
+                return False
+            try:
+                self._reload_locked(mtimes)
+            except Exception as e:
+                print(f"Error reloading model artifacts: {e}")
+                return False
+            return True
+        finally:
+            self._lock.release()
+
+    def get(self):
+        """Return the current artifacts, picking up changed files first"""
+        if self._artifacts is None:
+            self.reload_if_changed(blocking=True)
+        elif self.check_interval is not None and time.monotonic() - self._last_check >= self.check_interval:
+            # Requests never wait on a reload in progress; they keep using
+            # the snapshot they already have.
+            self.reload_if_changed(blocking=False)
+        return self._artifacts
@@ -0,0 +1,104 @@
+"""NLTK loading and data checks, kept out of import time.
+
+Importing NLTK takes around a second, so the preprocessor only loads it
+when the first message is cleaned. `load_nltk()` does that once per
+process, checking the data packages below and downloading any that are
+missing (as the modules used to do at import time). If that fails, e.g.
+offline, the error is kept and raised again for every later message
+without retrying the download. `warmup()` loads and verifies everything
+up front without touching the network; run `python warmup.py` to check an
+install, or `--download` to fetch the data.
+"""
+import functools
+import threading
+
+# (package name, resource path) that the preprocessor needs
+NLTK_RESOURCES = (
+    ('punkt', 'tokenizers/punkt'),
+    ('punkt_tab', 'tokenizers/punkt_tab'),  # used by word_tokenize on NLTK >= 3.8.2
+    ('stopwords', 'corpora/stopwords'),
+)
+
+
+def missing_nltk_data():
+    """Names of the NLTK data packages that are not installed"""
+    import nltk
+    missing = []
+    for name, resource in NLTK_RESOURCES:
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            missing.append(name)
+    return missing
+
+
+def ensure_nltk_data(download=True):
+    """Check the NLTK data, downloading missing packages when `download` is set.
+
+    Raises LookupError naming the packages that are still missing.
+    """
+    import nltk
+    missing = missing_nltk_data()
+    if missing and download:
+        for name in missing:
+            nltk.download(name, quiet=True)
+        missing = missing_nltk_data()
+    if missing:
+        raise LookupError(f"NLTK data not installed: {', '.join(missing)} "
+                          f"(run: python -m nltk.downloader {' '.join(missing)})")
+
+
+_lock = threading.Lock()
+_nltk = None
+# Message of the LookupError from the one download attempt, if it failed
+_load_error = None
+
+
+def load_nltk():
+    """The nltk module, with its data checked (and fetched if missing) on first use.
+
+    Only the first call tries to download; after a failure every call
+    raises the same LookupError straight away.
+    """
+    global _nltk, _load_error
+    if _nltk is not None:
+        return _nltk
+    with _lock:
+        if _nltk is None:
+            if _load_error is not None:
+                raise LookupError(_load_error)
+            import nltk
+            try:
+                ensure_nltk_data(download=True)
+            except LookupError as e:
+                _load_error = f"{e}; or run: python warmup.py --download"
+                raise LookupError(_load_error) from None
+            _nltk = nltk
+    return _nltk
+
+
+@functools.lru_cache(maxsize=None)
+def stop_words():
+    load_nltk()
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('english'))
+
+
+def word_tokenize(text):
+    return load_nltk().word_tokenize(text)
+
+
+def warmup(download=False):
+    """Import NLTK and load the tokenizer, stopwords and stemmer, without network
+    access unless `download` is set. Raises LookupError if data is missing."""
+    global _load_error
+    ensure_nltk_data(download=download)
+    with _lock:
+        # The data is there now, whatever an earlier load_nltk() found
+        _load_error = None
+    nltk = load_nltk()
+    from nltk.stem import PorterStemmer
+    # Loading is lazy inside NLTK too: tokenize and stem once to really load the models
+    nltk.word_tokenize("Warming up the tokenizer, isn't it?")
+    PorterStemmer().stem('warming')
+    return stop_words()
@@ -0,0 +1,133 @@
+import numpy as np
+
+from .atomic_files import replacing
+
+
+def _relu(x):
+    return np.maximum(x, 0)
+
+
+def _softmax(x):
+    # Subtract the row max for numerical stability, like Keras does
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def _linear(x):
+    return x
+
+
+ACTIVATIONS = {
+    'relu': _relu,
+    'softmax': _softmax,
+    'linear': _linear,
+}
+
+
+class LabelDecoder:
+    """Minimal stand-in for sklearn's LabelEncoder at serve time"""
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+
+    def inverse_transform(self, indices):
+        return self.classes_[np.asarray(indices)]
+
+
+class NumpyMLP:
+    """Pure NumPy forward pass for the Dense/Dropout intent classifier"""
+    def __init__(self, kernels, biases, activations, classes=None):
+        for activation in activations:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {activation}")
+        self.kernels = [np.ascontiguousarray(k, dtype=np.float32) for k in kernels]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activations = list(activations)
+        self.classes = None if classes is None else np.asarray(classes)
+
+    @property
+    def input_dim(self):
+        return self.kernels[0].shape[0]
+
+    @property
+    def output_dim(self):
+        return self.kernels[-1].shape[1]
+
+    @classmethod
+    def load(cls, path):
+        """Load weights written by export_keras_model"""
+        with np.load(path) as data:
+            num_layers = len(data['activations'])
+            kernels = [data[f'kernel_{i}'] for i in range(num_layers)]
+            biases = [data[f'bias_{i}'] for i in range(num_layers)]
+            activations = [str(a) for a in data['activations']]
+            classes = data['classes'] if 'classes' in data.files else None
+        return cls(kernels, biases, activations, classes)
+
+    def save(self, path):
+        """Write the weights to a compressed .npz file, replacing `path` atomically"""
+        arrays = {'activations': np.array(self.activations)}
+        for i, (kernel, bias) in enumerate(zip(self.kernels, self.biases)):
+            arrays[f'kernel_{i}'] = kernel
+            arrays[f'bias_{i}'] = bias
+        if self.classes is not None:
+            arrays['classes'] = np.asarray(self.classes).astype(str)
+        with replacing(path) as temp_path, open(temp_path, 'wb') as file:
+            np.savez_compressed(file, **arrays)
+
+    def label_decoder(self):
+        """LabelDecoder for the class names stored with the weights, if any"""
+        if self.classes is None:
+            return None
+        return LabelDecoder(self.classes)
+
+    def predict(self, x, verbose=0):
+        """Class probabilities for a batch of feature vectors.
+
+        Dropout is the identity at inference time, so only the Dense layers
+        are evaluated. Accepts dense arrays or scipy sparse matrices; the
+        latter only matter for the first layer, whose output is dense.
+        `verbose` is accepted for keras.Model.predict parity.
+        """
+        if not hasattr(x, 'tocsr'):
+            x = np.asarray(x, dtype=np.float32)
+        for kernel, bias, activation in zip(self.kernels, self.biases, self.activations):
+            x = ACTIVATIONS[activation](np.asarray(x @ kernel) + bias)
+        return x
+
+
+def export_keras_model(model, path, classes=None):
+    """Export the Dense layers of a trained Keras model to a NumpyMLP .npz"""
+    kernels, biases, activations = [], [], []
+    for layer in model.layers:
+        layer_type = type(layer).__name__
+        if layer_type == 'Dropout':
+            continue
+        if layer_type != 'Dense':
+            raise ValueError(f"Cannot export layer of type {layer_type}")
+        kernel, bias = layer.get_weights()
+        kernels.append(kernel)
+        biases.append(bias)
+        activations.append(layer.activation.__name__)
+
+    numpy_model = NumpyMLP(kernels, biases, activations, classes)
+    numpy_model.save(path)
+    return numpy_model
+
+
+def verify_against_keras(keras_model, numpy_model, num_samples=256, atol=1e-5, seed=0):
+    """Check that the NumPy forward pass matches Keras on random bag-of-words inputs.
+
+    Returns the largest absolute difference and raises ValueError if it
+    exceeds `atol`.
+    """
+    rng = np.random.default_rng(seed)
+    x = (rng.random((num_samples, numpy_model.input_dim)) < 0.05).astype(np.float32)
+    # Include the all-zero vector, which is what out-of-vocabulary messages produce
+    x[0] = 0
+
+    expected = keras_model.predict(x, verbose=0)
+    actual = numpy_model.predict(x)
+    max_diff = float(np.max(np.abs(expected - actual)))
+    if max_diff > atol:
+        raise ValueError(f"NumPy predictions differ from Keras by {max_diff:.2e} (tolerance {atol:.0e})")
+    return max_diff
@@ -1,43 +1,113 @@
 import re
-import nltk  # Make sure nltk is imported here too
-from nltk.corpus import stopwords
-from nltk.stem import PorterStemmer
+import functools
 import numpy as np
+from .nltk_data import word_tokenize, stop_words
 
-# Download NLTK data (only once)
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
+# Compiled once and shared by every TextPreprocessor
+NON_ALPHA_RE = re.compile(r'[^a-zA-Z\s]')
 
 class TextPreprocessor:
-    def __init__(self):
-        self.stemmer = PorterStemmer()
-        self.stop_words = set(stopwords.words('english'))
+    def __init__(self, stem_cache_size=20000, text_cache_size=4096):
+        # NLTK (tokenizer, stopwords, stemmer) is loaded by the first clean_text call
+        self._stemmer = None
+        
+        # Chat traffic repeats tokens and whole phrases heavily, so memoize
+        # both the per-token stems and the fully cleaned utterances
+        self._stem = functools.lru_cache(maxsize=stem_cache_size)(self._stem_word)
+        self._clean = functools.lru_cache(maxsize=text_cache_size)(self._clean_text)
+    
+    @property
+    def stemmer(self):
+        if self._stemmer is None:
+            from nltk.stem import PorterStemmer
+            self._stemmer = PorterStemmer()
+        return self._stemmer
+    
+    @property
+    def stop_words(self):
+        return stop_words()
+    
+    def _stem_word(self, word):
+        return self.stemmer.stem(word)
     
     def clean_text(self, text):
         """Clean and preprocess text"""
-        # Convert to lowercase
-        text = text.lower()
-        
+        # Convert to lowercase before the cache lookup so case variants share an entry
+        return self._clean(text.lower())
+    
+    def _clean_text(self, text):
         # Remove special characters and digits
-        text = re.sub(r'[^a-zA-Z\s]', '', text)
+        text = NON_ALPHA_RE.sub('', text)
         
         # Tokenize
-        tokens = nltk.word_tokenize(text)
+        tokens = word_tokenize(text)
         
         # Remove stopwords and stem
-        tokens = [self.stemmer.stem(word) for word in tokens if word not in self.stop_words]
+        stem = self._stem
+        excluded = stop_words()
+        tokens = [stem(word) for word in tokens if word not in excluded]
         
         return ' '.join(tokens)
     
+    def cache_info(self):
+        """Hit/miss counters and sizes of the stem and cleaned-text caches"""
+        return {
+            'stem': self._stem.cache_info()._asdict(),
+            'text': self._clean.cache_info()._asdict(),
+        }
+    
+    def cache_clear(self):
+        """Empty both caches and reset their counters"""
+        self._stem.cache_clear()
+        self._clean.cache_clear()
+    
+    def get_vectorizer(self, words):
+        """Return a BagOfWordsVectorizer for `words`, reusing the last one built"""
+        vectorizer = getattr(self, '_vectorizer', None)
+        if vectorizer is None or vectorizer.words is not words:
+            vectorizer = BagOfWordsVectorizer(words)
+            self._vectorizer = vectorizer
+        return vectorizer
+    
     def create_bag_of_words(self, text, words):
         """Create bag of words representation"""
-        sentence_words = nltk.word_tokenize(text)
-        bag = [1 if word in sentence_words else 0 for word in words]
-        return np.array(bag)
+        return self.get_vectorizer(words).transform([text], sparse=False)[0]
+
+class BagOfWordsVectorizer:
+    def __init__(self, words, sparse_threshold=5000, dtype=np.float32):
+        self.words = words
+        # Precomputed word -> column lookup, so featurizing costs O(tokens)
+        # instead of scanning the whole vocabulary for every sentence
+        self.index = {word: i for i, word in enumerate(words)}
+        self.sparse_threshold = sparse_threshold
+        self.dtype = dtype
+    
+    @property
+    def vocab_size(self):
+        return len(self.index)
+    
+    def transform(self, texts, sparse=None):
+        """Featurize a batch of cleaned texts into an (n_texts, vocab_size) matrix.
+        
+        Returns a scipy CSR matrix when `sparse` is True, or when it is None and
+        the vocabulary has at least `sparse_threshold` words; otherwise a dense
+        NumPy array.
+        """
+        index = self.index
+        rows, cols = [], []
+        for row, text in enumerate(texts):
+            columns = {index[token] for token in word_tokenize(text) if token in index}
+            rows.extend([row] * len(columns))
+            cols.extend(columns)
+        
+        shape = (len(texts), self.vocab_size)
+        if sparse is None:
+            sparse = self.vocab_size >= self.sparse_threshold
+        if sparse:
+            from scipy.sparse import csr_matrix
+            data = np.ones(len(rows), dtype=self.dtype)
+            return csr_matrix((data, (rows, cols)), shape=shape)
+        
+        bags = np.zeros(shape, dtype=self.dtype)
+        bags[rows, cols] = 1
+        return bags
@@ -1,138 +1,151 @@
 import random
 import json
+import os
+import time
 import numpy as np
-import nltk
 from .preprocessor import TextPreprocessor
+from . import nltk_data
 from .web_search import web_searcher
-import pickle
+from .model_registry import ModelRegistry
+from .keyword_matcher import KeywordMatcher
+from .instrumentation import metrics, get_logger
+from .session_store import SessionStore, SessionState, locked
+from .routing import RoutingPolicy, SEARCH_INTENTS
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
-# Ensure NLTK data is available
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords', quiet=True)
+log = get_logger('response_generator')
 
 class ResponseGenerator:
-    def __init__(self, intents_path, model_path):
+    def __init__(self, intents_path, model_path, registry=None, keywords_path=None, sessions=None):
         self.preprocessor = TextPreprocessor()
         self.intents_path = intents_path
         self.model_path = model_path
-        self.context = {}
-        self.last_intent = None
+        
+        # Per-user conversation state lives in the session store, so one
+        # instance can serve many users concurrently
+        self.sessions = sessions or SessionStore()
         
         # Load intents
         with open(intents_path, 'r') as file:
             self.intents_data = json.load(file)
         
-        # Load model artifacts
+        # Keyword tables for the greeting/thanks/goodbye/question heuristics,
+        # compiled into a single matcher that finds every category in one pass
+        keywords_path = keywords_path or os.path.join(os.path.dirname(intents_path), 'keywords.json')
+        self.keywords = KeywordMatcher.from_file(keywords_path)
+        
+        # Load model artifacts once; the registry shares them across threads
+        # and hot-reloads them when the files change on disk
+        self.registry = registry or ModelRegistry(model_path)
         try:
-            with open('models/tokenizer.pickle', 'rb') as handle:
-                self.words = pickle.load(handle)
-            with open('models/label_encoder.pickle', 'rb') as handle:
-                self.le = pickle.load(handle)
+            self.registry.load()
         except Exception as e:
             print(f"Error loading model artifacts: {e}")
-            self.words = []
-            self.le = None
+    
+    def warmup(self, download=False):
+        """Load everything the first request would otherwise wait for: NLTK
+        (verified offline unless `download`), the model and the knowledge index"""
+        timings = {}
+        start = time.perf_counter()
+        nltk_data.warmup(download=download)
+        timings['nltk'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        if self.registry.get() is None:
+            raise RuntimeError("Model artifacts could not be loaded")
+        self.predict_intent("warming up the classifier")
+        timings['model'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        local = getattr(web_searcher, 'local', None)
+        if local is not None:
+            local.search("warming up the knowledge index")
+        timings['knowledge_index'] = time.perf_counter() - start
+        return timings
     
     def is_question(self, text):
         """Check if the input is a question"""
-        question_words = ['what', 'who', 'when', 'where', 'why', 'how', 'which', '?',
-                         'explain', 'tell me', 'can you', 'could you', 'would you']
-        text_lower = text.lower()
-        return any(word in text_lower for word in question_words)
+        return 'question' in self.keywords.match(text)
     
     def is_greeting(self, text):
         """Check if the input is a greeting"""
-        greetings = ['hello', 'hi', 'hey', 'hola', 'greetings', 'good morning', 
-                    'good afternoon', 'good evening', 'howdy', 'sup', 'yo',
-                    'what\'s up', 'good day', 'hello there', 'hi there']
-        text_lower = text.lower()
-        return any(greeting in text_lower for greeting in greetings)
+        return 'greeting' in self.keywords.match(text)
     
     def is_thanks(self, text):
         """Check if the input is a thank you"""
-        thanks_words = ['thank', 'thanks', 'appreciate', 'grateful', 'cheers']
-        text_lower = text.lower()
-        return any(word in text_lower for word in thanks_words)
+        return 'thanks' in self.keywords.match(text)
     
     def is_goodbye(self, text):
         """Check if the input is a goodbye"""
-        goodbye_words = ['bye', 'goodbye', 'see you', 'farewell', 'later', 
-                        'take care', 'adios', 'ciao', 'so long']
-        text_lower = text.lower()
-        return any(word in text_lower for word in goodbye_words)
-    
-    def should_search_web(self, tag, confidence, user_input):
-        """Determine if we should search the web"""
-        # Always search for general_knowledge questions
-        if tag == "general_knowledge":
-            return True
-        
-        # Search for questions that don't match known intents well
-        if self.is_question(user_input) and confidence < 0.8:
-            return True
-        
-        # Specific patterns that should trigger web search
-        search_patterns = [
-            'how to', 'what is', 'who is', 'when did', 'where is',
-            'why does', 'explain', 'tell me about', 'can you tell me'
-        ]
-        
-        user_input_lower = user_input.lower()
-        if any(pattern in user_input_lower for pattern in search_patterns):
-            return True
-        
-        return False
+        return 'goodbye' in self.keywords.match(text)
     
     def predict_intent(self, text):
         """Predict the intent of user input"""
-        if not self.words or not self.le:
-            print("Model artifacts not loaded properly")
-            return None, 0
+        return self.predict_intents([text])[0]
+    
+    def predict_intents(self, texts):
+        """Predict the intents of many inputs with a single model call.
         
-        cleaned_text = self.preprocessor.clean_text(text)
-        print(f"Cleaned text: {cleaned_text}")
+        Returns (tag, confidence) pairs, where confidence is the probability
+        calibrated by the routing policy.
+        """
+        predictions, artifacts = self.predict_probabilities(texts)
+        if predictions is None:
+            return [(None, 0)] * len(texts)
         
-        bag = self.preprocessor.create_bag_of_words(cleaned_text, self.words)
-        print(f"Bag of words shape: {bag.shape}")
+        with metrics.timer('calibrate'):
+            calibrated = artifacts.routing.calibrate(predictions)
+            predicted_indices = np.argmax(calibrated, axis=1)
+            confidences = calibrated[np.arange(len(texts)), predicted_indices]
+            tags = artifacts.label_encoder.inverse_transform(predicted_indices)
         
-        # Load model and predict
-        from tensorflow.keras.models import load_model
-        try:
-            model = load_model(self.model_path)
-        except:
-            print("Error loading model")
-            return None, 0
+        log.debug("Classified %d texts, first: %r -> %s (%.4f)", len(texts), texts[0], tags[0], confidences[0])
         
-        prediction = model.predict(np.array([bag]), verbose=0)[0]
-        predicted_index = np.argmax(prediction)
-        confidence = prediction[predicted_index]
+        return list(zip(tags, confidences))
+    
+    def predict_probabilities(self, texts):
+        """Raw (n_texts, n_intents) classifier outputs and the artifacts that produced
+        them, or (None, None) when no model is loaded"""
+        artifacts = self.registry.get()
+        if artifacts is None or not artifacts.words or not artifacts.label_encoder:
+            log.warning("Model artifacts not loaded properly")
+            return None, None
         
-        tag = self.le.inverse_transform([predicted_index])[0]
+        with metrics.timer('preprocess'):
+            cleaned_texts = [self.preprocessor.clean_text(text) for text in texts]
         
-        print(f"Predicted tag: {tag}, Confidence: {confidence:.4f}")
+        with metrics.timer('featurize'):
+            bags = artifacts.vectorizer.transform(cleaned_texts)
         
-        return tag, confidence
+        with metrics.timer('classify'):
+            predictions = artifacts.model.predict(bags, verbose=0)
+        
+        return predictions, artifacts
+    
+    def session(self, session_id):
+        """Conversation state for `session_id`; without an id, a throwaway state"""
+        if session_id is None:
+            return SessionState(max_history=0)
+        return self.sessions.get(session_id)
     
-    def generate_response(self, tag, user_input=""):
+    def generate_response(self, tag, user_input="", state=None):
         """Generate response based on predicted intent"""
-        # Check if we should use web search
-        if self.should_search_web(tag, 0.7, user_input):
-            print(f"🔍 Web search triggered for: {user_input}")
-            return web_searcher.get_answer(user_input)
+        if state is None:
+            state = SessionState(max_history=0)
+        
+        # Intents that only promise a lookup are answered by web search;
+        # everything else was already routed by needs_web_search
+        if tag in SEARCH_INTENTS:
+            log.info("Web search triggered for: %s", user_input)
+            with metrics.timer('search'):
+                return web_searcher.get_answer(user_input)
         
         # Handle context-based responses
-        if self.last_intent == "weather" and any(word in user_input.lower() for word in ['bologna', 'london', 'new york', 'paris', 'tokyo']):
+        if state.last_intent == "weather" and any(word in user_input.lower() for word in ['bologna', 'london', 'new york', 'paris', 'tokyo']):
             city = next((word for word in ['bologna', 'london', 'new york', 'paris', 'tokyo'] if word in user_input.lower()), 'there')
             response = f"The weather in {city.title()} is pleasant with mild temperatures. Perfect for outdoor activities!"
-            self.last_intent = None
+            state.last_intent = None
             return response
         
         for intent in self.intents_data['intents']:
@@ -146,7 +159,7 @@ class ResponseGenerator:
                 
                 # Store context for follow-up questions
                 if tag == "weather":
-                    self.last_intent = "weather"
+                    state.last_intent = "weather"
                 
                 return response
         
@@ -155,15 +168,14 @@ class ResponseGenerator:
     
     def handle_unknown_query(self, query):
         """Handle queries that don't match any known intent"""
-        print(f"❓ Unknown query, searching web: {query}")
-        return web_searcher.get_answer(query)
+        log.info("Unknown query, searching web: %s", query)
+        with metrics.timer('search'):
+            return web_searcher.get_answer(query)
     
     def handle_short_message(self, user_input):
         """Handle short messages like greetings, thanks, etc."""
-        user_input_lower = user_input.lower()
-        
         # Handle greetings
-        if self.is_greeting(user_input_lower):
+        if self.is_greeting(user_input):
             greetings = [
                 "Hello! How can I help you today?",
                 "Hi there! What can I do for you?",
@@ -174,7 +186,7 @@ class ResponseGenerator:
             return random.choice(greetings)
         
         # Handle thanks
-        if self.is_thanks(user_input_lower):
+        if self.is_thanks(user_input):
             thanks_responses = [
                 "You're welcome!",
                 "Happy to help!",
@@ -185,7 +197,7 @@ class ResponseGenerator:
             return random.choice(thanks_responses)
         
         # Handle goodbye
-        if self.is_goodbye(user_input_lower):
+        if self.is_goodbye(user_input):
             goodbye_responses = [
                 "Goodbye! Have a great day!",
                 "See you later!",
@@ -201,8 +213,8 @@ class ResponseGenerator:
         
         return None
     
-    def process_input(self, user_input):
-        """Process user input and generate response"""
+    def respond_without_model(self, user_input):
+        """Answer inputs that don't need the classifier, or return None"""
         # Check for exit commands first
         if user_input.lower() in ['quit', 'exit', 'bye', 'goodbye']:
             return "Goodbye! Have a great day!"
@@ -220,11 +232,102 @@ class ResponseGenerator:
         if len(user_input.split()) < 2 and not self.is_question(user_input):
             return "I'd love to help! Could you please provide more details or ask a complete question?"
         
+        return None
+    
+    def routing_policy(self):
+        """The routing policy fitted for the loaded model"""
+        artifacts = self.registry.get()
+        return artifacts.routing if artifacts is not None else RoutingPolicy()
+    
+    def needs_web_search(self, user_input, tag, confidence):
+        """Decide whether a classified input is answered by web search.
+        
+        The routing policy weighs the calibrated confidence against a
+        per-intent threshold, raised when the input reads like a lookup
+        ("what is", "tell me about", ...); a question word alone no longer
+        sends it to search.
+        """
+        return self.routing_policy().needs_search(tag, confidence, self.keywords.match(user_input))
+    
+    def process_input(self, user_input, session_id=None):
+        """Process user input and generate response"""
+        state = self.session(session_id)
+        with state.lock:
+            with metrics.timer('request'):
+                response = self._process_input(user_input, state)
+            state.record(user_input, response)
+        return response
+    
+    def _process_input(self, user_input, state):
+        with metrics.timer('heuristics'):
+            response = self.respond_without_model(user_input)
+        if response is not None:
+            metrics.increment('heuristic_responses')
+            return response
+        
         tag, confidence = self.predict_intent(user_input)
         
-        # Use web search for questions or low confidence
-        if self.is_question(user_input) or confidence < 0.4 or self.should_search_web(tag, confidence, user_input):
+        with metrics.timer('route'):
+            search = self.needs_web_search(user_input, tag, confidence)
+        if search:
             return self.handle_unknown_query(user_input)
         else:
-            response = self.generate_response(tag, user_input)
+            response = self.generate_response(tag, user_input, state)
             return response
+    
+    def process_batch(self, messages, max_search_workers=8, session_ids=None):
+        """Process many inputs at once, returning responses in input order.
+        
+        All messages that need the classifier are featurized and classified
+        in one model call, and web-search fallbacks run concurrently.
+        `session_ids` (one per message, None for stateless) may mix users.
+        The batch holds the locks of its sessions, so concurrent batches
+        (or process_input calls) for the same session run one at a time.
+        """
+        states = [self.session(session_id) for session_id in (session_ids or [None] * len(messages))]
+        with locked(states):
+            return self._process_batch(messages, states, max_search_workers)
+    
+    def _process_batch(self, messages, states, max_search_workers):
+        start = time.perf_counter()
+        responses = [None] * len(messages)
+        
+        to_classify = []
+        for i, user_input in enumerate(messages):
+            # Timed per message, as in process_input
+            with metrics.timer('heuristics'):
+                response = self.respond_without_model(user_input)
+            if response is not None:
+                responses[i] = response
+            else:
+                to_classify.append(i)
+        metrics.increment('heuristic_responses', len(messages) - len(to_classify))
+        
+        to_search = []
+        predictions = self.predict_intents([messages[i] for i in to_classify]) if to_classify else []
+        for i, (tag, confidence) in zip(to_classify, predictions):
+            with metrics.timer('route'):
+                search = self.needs_web_search(messages[i], tag, confidence)
+            if search:
+                to_search.append(i)
+            else:
+                # Sequential and in order: follow-ups depend on the session's last intent
+                responses[i] = self.generate_response(tag, messages[i], states[i])
+        
+        if to_search:
+            with ThreadPoolExecutor(max_workers=min(max_search_workers, len(to_search))) as pool:
+                answers = pool.map(self.handle_unknown_query, [messages[i] for i in to_search])
+                for i, answer in zip(to_search, answers):
+                    responses[i] = answer
+        
+        for state, user_input, response in zip(states, messages, responses):
+            state.record(user_input, response)
+        
+        # Every message is answered when the batch returns, so each one's
+        # request latency is the whole batch's; 'batch' counts batches
+        elapsed = time.perf_counter() - start
+        for _ in messages:
+            metrics.observe('request', elapsed)
+        metrics.observe('batch', elapsed)
+        metrics.increment('batched_messages', len(messages))
+        return responses
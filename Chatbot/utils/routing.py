@@ -0,0 +1,167 @@
+"""Decide whether a classified message is answered by its intent or by web search.
+
+RoutingPolicy combines the classifier's probability, calibrated with a
+single temperature, with the keyword heuristics. A question is answered
+from its intent when the calibrated probability reaches that intent's
+threshold, and a lookup ("what is", "tell me about", ...) also needs
+`search_threshold`; a question word alone no longer forces a search.
+Other messages only need `min_confidence`, as before. The temperature and
+per-intent thresholds are fitted on out-of-fold predictions at training time
+(fit_routing_policy) and saved to models/routing.json.
+
+LegacyPolicy is the original rule, where any question went to search; it
+is kept for comparing the two on replayed traffic.
+"""
+import json
+import os
+
+import numpy as np
+
+from .atomic_files import replacing
+
+# Intents whose canned replies only promise to look something up
+SEARCH_INTENTS = ('general_knowledge',)
+
+
+def calibrate(probabilities, temperature):
+    """Temperature-scale softmax outputs: softmax(log(p) / T), row-wise"""
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    if temperature == 1.0:
+        return probabilities
+    logits = np.log(np.clip(probabilities, 1e-12, 1.0)) / temperature
+    logits -= logits.max(axis=-1, keepdims=True)
+    scaled = np.exp(logits)
+    return scaled / scaled.sum(axis=-1, keepdims=True)
+
+
+class RoutingPolicy:
+    name = 'calibrated'
+
+    def __init__(self, temperature=1.0, thresholds=None, default_threshold=0.8, search_threshold=0.9,
+                 min_confidence=0.4, search_intents=SEARCH_INTENTS):
+        self.temperature = temperature
+        self.thresholds = dict(thresholds or {})
+        self.default_threshold = default_threshold
+        self.search_threshold = search_threshold
+        self.min_confidence = min_confidence
+        self.search_intents = frozenset(search_intents)
+
+    def calibrate(self, probabilities):
+        return calibrate(probabilities, self.temperature)
+
+    def threshold(self, tag, categories=frozenset()):
+        """Calibrated probability `tag` needs to be answered without search"""
+        if 'question' not in categories and 'search' not in categories:
+            return self.min_confidence
+        threshold = max(self.thresholds.get(tag, self.default_threshold), self.min_confidence)
+        if 'search' in categories:
+            threshold = max(threshold, self.search_threshold)
+        return threshold
+
+    def needs_search(self, tag, confidence, categories=frozenset()):
+        """`confidence` is the calibrated probability of `tag`; `categories`
+        are the keyword categories matched in the message"""
+        if tag is None or tag in self.search_intents:
+            return True
+        return confidence < self.threshold(tag, categories)
+
+    def to_dict(self):
+        return {
+            'temperature': self.temperature,
+            'thresholds': self.thresholds,
+            'default_threshold': self.default_threshold,
+            'search_threshold': self.search_threshold,
+            'min_confidence': self.min_confidence,
+            'search_intents': sorted(self.search_intents),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def save(self, path):
+        with replacing(path) as temp_path, open(temp_path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as file:
+            return cls.from_dict(json.load(file))
+
+    @classmethod
+    def load_or_default(cls, path):
+        """The fitted policy at `path`, or the defaults when it is missing or unreadable"""
+        if path and os.path.exists(path):
+            try:
+                return cls.load(path)
+            except (OSError, ValueError, TypeError) as e:
+                print(f"Error loading routing policy {path}, using defaults: {e}")
+        return cls()
+
+
+class LegacyPolicy:
+    """The original routing: every question, every lookup phrase, general_knowledge
+    and anything under 0.4 (uncalibrated) confidence goes to web search"""
+    name = 'legacy'
+
+    def calibrate(self, probabilities):
+        return np.asarray(probabilities, dtype=np.float64)
+
+    def needs_search(self, tag, confidence, categories=frozenset()):
+        return ('question' in categories or 'search' in categories or confidence < 0.4
+                or tag is None or tag == 'general_knowledge')
+
+
+def fit_temperature(probabilities, labels, temperatures=None):
+    """Temperature minimizing the negative log-likelihood of `labels`"""
+    if temperatures is None:
+        temperatures = np.geomspace(0.25, 8.0, 61)
+    labels = np.asarray(labels)
+    rows = np.arange(len(labels))
+
+    def nll(temperature):
+        return -np.log(np.clip(calibrate(probabilities, temperature)[rows, labels], 1e-12, 1.0)).mean()
+
+    return float(min(temperatures, key=nll))
+
+
+def precision_threshold(confidences, correct, target_precision):
+    """Lowest confidence cut-off whose accepted predictions are at least
+    `target_precision` correct, or None when no cut-off gets there"""
+    confidences = np.asarray(confidences)
+    correct = np.asarray(correct, dtype=bool)
+    for cutoff in np.unique(confidences):
+        if correct[confidences >= cutoff].mean() >= target_precision:
+            return float(cutoff)
+    return None
+
+
+def fit_routing_policy(probabilities, labels, classes, target_precision=0.9, min_support=3, **kwargs):
+    """Fit the temperature and per-intent thresholds on held-out predictions.
+
+    `probabilities` are the classifier's (n, n_classes) outputs and `labels`
+    the true class indices. Each intent gets the lowest threshold at which
+    held-out messages predicted as it are `target_precision` correct;
+    intents predicted fewer than `min_support` times share the threshold
+    fitted over all predictions. Other keyword arguments go to RoutingPolicy.
+    """
+    labels = np.asarray(labels)
+    temperature = fit_temperature(probabilities, labels)
+    calibrated = calibrate(probabilities, temperature)
+    predicted = calibrated.argmax(axis=1)
+    confidences = calibrated.max(axis=1)
+    correct = predicted == labels
+
+    policy = RoutingPolicy(temperature=temperature, **kwargs)
+    fitted = precision_threshold(confidences, correct, target_precision)
+    if fitted is not None:
+        policy.default_threshold = fitted
+
+    for index, tag in enumerate(classes):
+        tag = str(tag)
+        mask = predicted == index
+        if tag in policy.search_intents or mask.sum() < min_support:
+            continue
+        threshold = precision_threshold(confidences[mask], correct[mask], target_precision)
+        policy.thresholds[tag] = threshold if threshold is not None else 1.0
+    return policy
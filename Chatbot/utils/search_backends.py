@@ -0,0 +1,194 @@
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .instrumentation import metrics, get_logger
+
+log = get_logger('search_backends')
+
+# `score` is in [0, 1]; higher means the answer is more likely to be right
+SearchResult = namedtuple('SearchResult', ['answer', 'score', 'source'])
+
+_QUESTION_PREFIX_RE = re.compile(
+    r'^(?:(?:can|could|would) you )?(?:please )?'
+    r'(?:what|who|where|when|which) (?:is|are|was|were)(?: an?| the)? |'
+    r'^(?:(?:can|could|would) you )?(?:please )?(?:tell me about|explain|define|describe) (?:an?|the)?\s*'
+)
+
+# "Mercury may refer to:" - a list of other articles, not an answer
+_DISAMBIGUATION_RE = re.compile(r'\b(?:may|can|might) (?:also )?refer to\b', re.IGNORECASE)
+
+
+def query_words(query):
+    """Lowercase words of a query, without punctuation"""
+    return re.findall(r'[a-z0-9]+', query.lower())
+
+
+class SearchBackend:
+    """Interface for the answer sources queried by SearchFanout"""
+    name = 'backend'
+
+    def search(self, query):
+        """Return a SearchResult, or None when this source has no answer"""
+        raise NotImplementedError
+
+
+class LocalBackend(SearchBackend):
+    name = 'local'
+
+    def __init__(self, index=None, min_score=0.3):
+        self._index = index
+        self.min_score = min_score
+
+    @property
+    def index(self):
+        if self._index is None:
+            from .knowledge_index import get_default_index
+            self._index = get_default_index()
+        return self._index
+
+    def search(self, query):
+        results = self.index.search(query, top_k=1)
+        if not results or results[0][1] < self.min_score:
+            return None
+        answer, score = results[0]
+        return SearchResult(answer, score, self.name)
+
+
+class GoogleBackend(SearchBackend):
+    name = 'google'
+
+    def __init__(self, searcher=None, num_results=3, timeout=5):
+        if searcher is None:
+            from .google_searcher import google_searcher as searcher
+        self.searcher = searcher
+        self.num_results = num_results
+        self.timeout = timeout
+
+    def search(self, query):
+        log.debug("Googling: %s", query)
+        results = self.searcher.google_search(query, num_results=self.num_results, timeout=self.timeout)
+        if results is None:
+            raise RuntimeError("Google search failed")
+
+        snippets = [result['description'] for result in results if result['description']]
+        answer = self.searcher.extract_answer_from_snippet(query, snippets)
+        if not answer:
+            return None
+
+        # Score by how many of the query's words the snippet covers
+        words = set(query_words(query))
+        answer_words = set(query_words(answer))
+        score = len(words & answer_words) / len(words) if words else 0.0
+        return SearchResult(f"According to my search: {self.searcher.clean_answer(answer)}", score, self.name)
+
+
+class WikipediaBackend(SearchBackend):
+    """Summary of the article named after the question's topic.
+
+    Disambiguation pages are rejected. The score is `score` times the share
+    of the topic's words found in the article's title and summary, so a
+    redirect to a loosely related article no longer outranks a good snippet.
+    """
+    name = 'wikipedia'
+
+    def __init__(self, timeout=5, score=0.75, wikipedia=None):
+        self._wikipedia = wikipedia
+        self.timeout = timeout
+        self.score = score
+
+    @property
+    def wikipedia(self):
+        # wikipediaapi (and requests under it) is imported on the first search
+        if self._wikipedia is None:
+            import wikipediaapi
+            self._wikipedia = wikipediaapi.Wikipedia(
+                user_agent='ChatBot/1.0',
+                language='en',
+                extract_format=wikipediaapi.ExtractFormat.WIKI,
+                timeout=self.timeout
+            )
+        return self._wikipedia
+
+    def topic(self, query):
+        """Guess the article title a question is about"""
+        topic = _QUESTION_PREFIX_RE.sub('', query.lower().strip()).strip(' ?.!')
+        return topic[:1].upper() + topic[1:]
+
+    def search(self, query):
+        topic = self.topic(query)
+        if not topic:
+            return None
+        page = self.wikipedia.page(topic)
+        if not page.exists() or not page.summary or _DISAMBIGUATION_RE.search(page.summary):
+            return None
+        words = set(query_words(topic))
+        covered = words & set(query_words(f"{page.title} {page.summary}"))
+        if not covered:
+            return None
+        sentences = page.summary.split('. ')
+        summary = '. '.join(sentences[:2]).strip()
+        if not summary.endswith('.'):
+            summary += '.'
+        return SearchResult(f"According to Wikipedia: {summary}", self.score * len(covered) / len(words), self.name)
+
+
+class SearchFanout:
+    def __init__(self, backends, deadline=3.0, good_score=0.6, workers_per_backend=16):
+        self.backends = list(backends)
+        self.deadline = deadline
+        self.good_score = good_score
+        # One bounded pool per backend: a hung backend only ties up its own
+        # threads, and the others keep answering concurrent searches. The
+        # default covers process_batch's 8 concurrent searches plus as many
+        # stragglers still running past a previous deadline
+        self._executors = {
+            backend: ThreadPoolExecutor(max_workers=workers_per_backend, thread_name_prefix=f'search_{backend.name}')
+            for backend in self.backends
+        }
+
+    def _run(self, backend, query):
+        try:
+            with metrics.timer(f'backend_{backend.name}'):
+                return backend.search(query), None
+        except Exception as e:
+            log.warning("%s search error: %s", backend.name, e)
+            metrics.increment(f'{backend.name}_search_errors')
+            return None, e
+
+    def search(self, query):
+        """Query every backend concurrently under the global deadline.
+
+        Returns (result, complete): the first result scoring at least
+        `good_score`, otherwise the best result that arrived in time (or
+        None). `complete` is True when every backend finished without an
+        error, i.e. a None result really means nothing was found.
+        """
+        end = time.monotonic() + self.deadline
+        pending = {self._executors[backend].submit(self._run, backend, query) for backend in self.backends}
+        best = None
+        failed = False
+
+        while pending:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                result, error = future.result()
+                if error is not None:
+                    failed = True
+                if result is None:
+                    continue
+                if result.score >= self.good_score:
+                    for straggler in pending:
+                        straggler.cancel()
+                    return result, True
+                if best is None or result.score > best.score:
+                    best = result
+
+        # Slow backends keep running in their pools but no longer hold up the reply
+        for straggler in pending:
+            straggler.cancel()
+        return best, not pending and not failed
@@ -0,0 +1,93 @@
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import ExitStack, contextmanager
+
+# Ids are echoed into a Set-Cookie header, so only plain tokens are accepted
+_SESSION_ID_RE = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def valid_session_id(session_id):
+    return isinstance(session_id, str) and _SESSION_ID_RE.fullmatch(session_id) is not None
+
+
+class SessionState:
+    """Conversation state of one user: the pending follow-up intent and recent turns.
+
+    Hold `lock` while answering a message, so two requests of the same
+    session (e.g. in concurrent batches) are answered one after the other.
+    """
+    __slots__ = ('last_intent', 'history', 'last_seen', 'lock')
+
+    def __init__(self, max_history=20):
+        self.last_intent = None
+        # (user_input, response) pairs, oldest dropped first
+        self.history = deque(maxlen=max_history)
+        self.last_seen = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, user_input, response):
+        self.history.append((user_input, response))
+
+
+@contextmanager
+def locked(states):
+    """Hold the locks of all distinct `states`, always taken in the same order
+    so that batches sharing several sessions cannot deadlock"""
+    unique = {id(state): state for state in states}
+    with ExitStack() as stack:
+        for _, state in sorted(unique.items()):
+            stack.enter_context(state.lock)
+        yield
+
+
+class SessionStore:
+    """Sessions keyed by id, evicted after `ttl` seconds idle or when over `max_sessions`.
+
+    Sessions are kept in least-recently-seen order, so expiry only ever
+    looks at the front of the map.
+    """
+    def __init__(self, ttl=30 * 60, max_history=20, max_sessions=100000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_history = max_history
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id):
+        """The live session for `session_id`, created if missing or expired"""
+        now = self.clock()
+        with self._lock:
+            self._evict(now)
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = SessionState(self.max_history)
+                self._sessions[session_id] = state
+                if len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            state.last_seen = now
+            return state
+
+    def drop(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _evict(self, now):
+        sessions = self._sessions
+        while sessions:
+            session_id, state = next(iter(sessions.items()))
+            if now - state.last_seen < self.ttl:
+                break
+            del sessions[session_id]
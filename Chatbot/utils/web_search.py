@@ -1,27 +1,57 @@
-from .google_searcher import google_searcher
-import wikipediaapi
-import re
+from .google_searcher import NO_RESULTS_MESSAGE, SEARCH_ERROR_MESSAGE
+from .answer_cache import AnswerCache
+from .search_backends import SearchFanout, LocalBackend, GoogleBackend, WikipediaBackend
+from .instrumentation import metrics, get_logger
+import os
+
+log = get_logger('web_search')
+
+# On-disk answer cache shared across restarts
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'data', 'answer_cache.sqlite')
 
 class WebSearch:
-    def __init__(self):
-        self.wikipedia = wikipediaapi.Wikipedia(
-            user_agent='ChatBot/1.0',
-            language='en',
-            extract_format=wikipediaapi.ExtractFormat.HTML
-        )
+    def __init__(self, backends=None, cache=None, local=None, deadline=3.0):
+        # All of these can be replaced, e.g. with local stand-ins for the search backends
+        if backends is None:
+            backends = [GoogleBackend(), WikipediaBackend()]
+        self.local = local if local is not None else LocalBackend()
+        self.fanout = SearchFanout(backends, deadline=deadline)
+        self.cache = cache if cache is not None else AnswerCache(os.environ.get('CHATBOT_ANSWER_CACHE', DEFAULT_CACHE_PATH))
     
     def get_answer(self, query):
-        """Get answer using Google search as primary source"""
-        print(f"🌐 Searching for: {query}")
+        """Get the best answer any search backend returns before the deadline"""
+        log.debug("Searching for: %s", query)
+        
+        # Answers (and recent misses) for the same normalized query are reused
+        with metrics.timer('answer_cache'):
+            cached_answer = self.cache.get(query)
+        if cached_answer is not None:
+            metrics.increment('answer_cache_hits')
+            return cached_answer
+        metrics.increment('answer_cache_misses')
+        
+        # The offline knowledge index answers most general questions in
+        # milliseconds; only go to the network when it has no good match.
+        # A weaker local match is never served: it is usually a different
+        # question sharing a few words ("capital of Peru" -> France's capital).
+        with metrics.timer('local_index'):
+            local_result = self.local.search(query)
+        if local_result is not None and local_result.score >= self.fanout.good_score:
+            metrics.increment('local_index_answers')
+            return local_result.answer
         
-        # First try direct answers for common questions
-        direct_answer = google_searcher.get_direct_answer(query)
-        if direct_answer:
-            return direct_answer
+        with metrics.timer('search_fanout'):
+            result, complete = self.fanout.search(query)
+        if result is not None:
+            self.cache.put(query, result.answer)
+            return result.answer
         
-        # Then try Google search
-        google_answer = google_searcher.get_google_answer(query)
-        return google_answer
+        # Only cache "nothing found" when every backend actually answered
+        if complete:
+            self.cache.put(query, NO_RESULTS_MESSAGE, negative=True)
+            return NO_RESULTS_MESSAGE
+        return SEARCH_ERROR_MESSAGE
 
 # Singleton instance
 web_searcher = WebSearch()
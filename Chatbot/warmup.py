@@ -0,0 +1,35 @@
+import argparse
+import os
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Load and verify NLTK data, the model and the knowledge index without network access")
+    parser.add_argument('--download', action='store_true', help="download missing NLTK data instead of failing")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    from utils.response_generator import ResponseGenerator
+    imported = time.perf_counter() - start
+
+    response_generator = ResponseGenerator(
+        intents_path='data/intents.json',
+        model_path='models/intent_classifier.h5'
+    )
+    try:
+        timings = response_generator.warmup(download=args.download)
+    except LookupError as e:
+        print(f"Warmup failed: {e}")
+        print("Run python warmup.py --download once with network access")
+        sys.exit(1)
+
+    print(f"Imports: {imported:.2f}s")
+    for name, seconds in timings.items():
+        print(f"{name}: {seconds:.2f}s")
+    print(f"Ready in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
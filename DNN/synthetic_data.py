@@ -0,0 +1,140 @@
+"""Synthetic training data for the collab.ipynb pipeline.
+
+2D: gray images with 1-3 white rectangles, their binary masks and
+[x1, y1, x2, y2, class_id] boxes. 3D: point clouds sampled from a cube
+(label 0) or a sphere surface (label 1).
+
+Every generator draws the random parameters of a whole chunk in one
+vectorized pass and writes samples into preallocated arrays. Pass `seed`
+for reproducible data; the same seed and arguments (including
+`chunk_size`) always give the same samples. The iter_* variants yield
+chunks so datasets bigger than RAM can be streamed or written to disk
+with write_2d_dataset().
+"""
+import os
+
+import numpy as np
+
+BACKGROUND = 100
+FOREGROUND = 255
+MIN_RECT_SIZE, MAX_RECT_SIZE = 40, 100  # rectangle sides, upper bound exclusive
+MAX_RECTS = 3
+
+
+def _make_rng(seed=None, rng=None):
+    return rng if rng is not None else np.random.default_rng(seed)
+
+
+def _generate_2d_chunk(rng, num_images, img_size):
+    # Rectangle parameters for every image at once; unused slots are masked out
+    counts = rng.integers(1, MAX_RECTS + 1, size=num_images)
+    valid = np.arange(MAX_RECTS)[None, :] < counts[:, None]
+    sizes = rng.integers(MIN_RECT_SIZE, MAX_RECT_SIZE, size=(num_images, MAX_RECTS, 2))
+    corners = rng.integers(0, img_size - sizes)
+    rects = np.concatenate([corners, corners + sizes], axis=-1)[valid]  # x1, y1, x2, y2
+
+    # Filling is memset-speed slice writes into the preallocated arrays;
+    # a per-pixel vectorized fill moves far more memory and measured slower
+    images = np.full((num_images, img_size, img_size, 3), BACKGROUND, dtype=np.uint8)
+    masks = np.zeros((num_images, img_size, img_size), dtype=np.uint8)
+    for n, (x1, y1, x2, y2) in zip(np.nonzero(valid)[0].tolist(), rects.tolist()):
+        images[n, y1:y2, x1:x2] = FOREGROUND
+        masks[n, y1:y2, x1:x2] = 1
+
+    boxes = np.split(np.column_stack([rects, np.zeros(len(rects), dtype=rects.dtype)]),
+                     np.cumsum(counts)[:-1])
+    return images, masks, boxes
+
+
+def iter_2d_data(num_images=100, img_size=256, chunk_size=256, seed=None, rng=None):
+    """Yield (images, masks, boxes) chunks of up to `chunk_size` images.
+
+    images is (n, img_size, img_size, 3) uint8, masks is (n, img_size,
+    img_size) uint8 in {0, 1} and boxes is a list of (k, 5) int64 arrays.
+    """
+    rng = _make_rng(seed, rng)
+    for start in range(0, num_images, chunk_size):
+        yield _generate_2d_chunk(rng, min(chunk_size, num_images - start), img_size)
+
+
+def generate_2d_data(num_images=100, img_size=256, seed=None, rng=None, chunk_size=None):
+    """Generate synthetic 2D images with rectangles, as whole arrays"""
+    rng = _make_rng(seed, rng)
+    if chunk_size is None or chunk_size >= num_images:
+        return _generate_2d_chunk(rng, num_images, img_size)
+
+    images = np.empty((num_images, img_size, img_size, 3), dtype=np.uint8)
+    masks = np.empty((num_images, img_size, img_size), dtype=np.uint8)
+    boxes = []
+    start = 0
+    for chunk_images, chunk_masks, chunk_boxes in iter_2d_data(num_images, img_size, chunk_size, rng=rng):
+        end = start + len(chunk_images)
+        images[start:end] = chunk_images
+        masks[start:end] = chunk_masks
+        boxes += chunk_boxes
+        start = end
+    return images, masks, boxes
+
+
+def write_2d_dataset(directory, num_images, img_size=256, chunk_size=256, seed=None):
+    """Stream a 2D dataset to disk without holding it in memory.
+
+    Writes images.npy and masks.npy (open them with np.load(...,
+    mmap_mode='r')) and boxes.npy, an (n_boxes, 6) array whose first column
+    is the image index.
+    """
+    os.makedirs(directory, exist_ok=True)
+    images = np.lib.format.open_memmap(os.path.join(directory, 'images.npy'), mode='w+',
+                                       dtype=np.uint8, shape=(num_images, img_size, img_size, 3))
+    masks = np.lib.format.open_memmap(os.path.join(directory, 'masks.npy'), mode='w+',
+                                      dtype=np.uint8, shape=(num_images, img_size, img_size))
+    all_boxes = []
+    start = 0
+    for chunk_images, chunk_masks, chunk_boxes in iter_2d_data(num_images, img_size, chunk_size, seed):
+        end = start + len(chunk_images)
+        images[start:end] = chunk_images
+        masks[start:end] = chunk_masks
+        for index, boxes in enumerate(chunk_boxes, start):
+            all_boxes.append(np.column_stack([np.full(len(boxes), index), boxes]))
+        start = end
+    images.flush()
+    masks.flush()
+    np.save(os.path.join(directory, 'boxes.npy'), np.concatenate(all_boxes))
+    return directory
+
+
+def _generate_3d_chunk(rng, num_samples, num_points):
+    labels = (rng.random(num_samples) <= 0.5).astype(np.int64)  # 0: cube, 1: sphere
+    spheres = labels == 1
+    num_spheres = int(spheres.sum())
+
+    points = np.empty((num_samples, num_points, 3), dtype=np.float32)
+    points[~spheres] = rng.uniform(-1, 1, (num_samples - num_spheres, num_points, 3))
+
+    # Uniform on the unit sphere: uniform azimuth, arccos of uniform cos(polar)
+    theta = rng.uniform(0, 2 * np.pi, (num_spheres, num_points))
+    cos_phi = rng.uniform(-1, 1, (num_spheres, num_points))
+    sin_phi = np.sqrt(1 - cos_phi ** 2)
+    points[spheres] = np.stack([sin_phi * np.cos(theta), sin_phi * np.sin(theta), cos_phi], axis=-1)
+    return points, labels
+
+
+def iter_3d_data(num_samples=50, num_points=1024, chunk_size=1024, seed=None, rng=None):
+    """Yield (points, labels) chunks: (n, num_points, 3) float32 and (n,) int64"""
+    rng = _make_rng(seed, rng)
+    for start in range(0, num_samples, chunk_size):
+        yield _generate_3d_chunk(rng, min(chunk_size, num_samples - start), num_points)
+
+
+def generate_3d_data(num_samples=50, num_points=1024, seed=None, rng=None, as_tensors=True):
+    """Generate synthetic 3D point clouds.
+
+    Returns float32 points and int64 labels as torch tensors that share
+    memory with the generated arrays (no copy), or as NumPy arrays with
+    `as_tensors=False`.
+    """
+    points, labels = _generate_3d_chunk(_make_rng(seed, rng), num_samples, num_points)
+    if not as_tensors:
+        return points, labels
+    import torch
+    return torch.from_numpy(points), torch.from_numpy(labels)
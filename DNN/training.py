@@ -0,0 +1,124 @@
+"""Mini-batch training for the collab.ipynb models.
+
+Datasets convert one sample at a time, so memory stays proportional to the
+batch size rather than the dataset (the arrays may be np.memmap files from
+synthetic_data.write_2d_dataset). train() runs any model/optimizer/loss
+over a DataLoader with gradient accumulation and logs loss, throughput and
+peak memory per epoch.
+"""
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset, DataLoader
+
+
+class SegmentationDataset(Dataset):
+    """(N, H, W, 3) uint8 images and (N, H, W) masks -> (3, H, W) / (1, H, W) float tensors"""
+    def __init__(self, images, masks):
+        self.images = images
+        self.masks = masks
+
+    def __len__(self):
+        return len(self.images)
+
+    def __getitem__(self, index):
+        image = torch.from_numpy(np.ascontiguousarray(self.images[index])).permute(2, 0, 1).float().div_(255)
+        mask = torch.from_numpy(np.ascontiguousarray(self.masks[index])).float().unsqueeze(0)
+        return image, mask
+
+
+class PointCloudDataset(Dataset):
+    """(N, P, 3) point clouds and (N,) labels, as arrays or tensors"""
+    def __init__(self, points, labels):
+        self.points = points
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.points)
+
+    def __getitem__(self, index):
+        return (torch.as_tensor(self.points[index], dtype=torch.float32),
+                torch.as_tensor(self.labels[index], dtype=torch.long))
+
+
+def default_num_workers():
+    return min(4, max((os.cpu_count() or 1) - 1, 0))
+
+
+def make_loader(dataset, batch_size=32, shuffle=True, num_workers=None, pin_memory=None):
+    """DataLoader with worker processes, and pinned batches when training on a GPU"""
+    if num_workers is None:
+        num_workers = default_num_workers()
+    if pin_memory is None:
+        pin_memory = torch.cuda.is_available()
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, num_workers=num_workers,
+                      pin_memory=pin_memory, persistent_workers=num_workers > 0)
+
+
+def peak_memory_mb(device):
+    """Peak GPU memory allocated on CUDA, otherwise this process's peak RSS"""
+    if device.type == 'cuda':
+        return torch.cuda.max_memory_allocated(device) / 2 ** 20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def train(model, loader, optimizer, criterion, epochs=3, accumulation_steps=1, device=None, log_fn=None):
+    """Train with mini-batches, stepping the optimizer every `accumulation_steps` batches.
+
+    Returns one dict per epoch with the mean loss, samples/sec and peak
+    memory (MB); each dict is also passed to `log_fn` if given.
+    """
+    device = torch.device(device or ('cuda' if torch.cuda.is_available() else 'cpu'))
+    model.to(device)
+    non_blocking = loader.pin_memory and device.type == 'cuda'
+    history = []
+
+    for epoch in range(epochs):
+        model.train()
+        if device.type == 'cuda':
+            torch.cuda.reset_peak_memory_stats(device)
+        start = time.perf_counter()
+        total_loss, samples = 0.0, 0
+        optimizer.zero_grad()
+
+        for step, (inputs, targets) in enumerate(loader, 1):
+            inputs = inputs.to(device, non_blocking=non_blocking)
+            targets = targets.to(device, non_blocking=non_blocking)
+            loss = criterion(model(inputs), targets)
+            (loss / accumulation_steps).backward()
+            if step % accumulation_steps == 0 or step == len(loader):
+                optimizer.step()
+                optimizer.zero_grad()
+            total_loss += loss.item() * len(inputs)
+            samples += len(inputs)
+
+        elapsed = time.perf_counter() - start
+        metrics = {
+            'epoch': epoch + 1,
+            'loss': total_loss / max(samples, 1),
+            'samples_per_sec': samples / elapsed,
+            'peak_memory_mb': peak_memory_mb(device),
+        }
+        history.append(metrics)
+        print(f"Epoch {epoch+1}, Loss: {metrics['loss']:.4f}, "
+              f"{metrics['samples_per_sec']:.0f} samples/s, peak memory {metrics['peak_memory_mb']:.0f} MB")
+        if log_fn is not None:
+            log_fn(metrics)
+    return history
+
+
+def predict(model, loader, device=None):
+    """Model outputs for every batch of `loader`, concatenated on the CPU"""
+    device = torch.device(device or next(model.parameters()).device)
+    model.eval()
+    outputs = []
+    with torch.no_grad():
+        for inputs, _ in loader:
+            outputs.append(model(inputs.to(device)).cpu())
+    return torch.cat(outputs)
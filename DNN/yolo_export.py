@@ -0,0 +1,118 @@
+"""Export (image, boxes) samples as a YOLO detection dataset.
+
+Layout written under `output_dir` (what Ultralytics expects):
+
+    images/train/*.jpg  labels/train/*.txt
+    images/val/*.jpg    labels/val/*.txt
+    data.yaml
+
+Boxes are [x1, y1, x2, y2, class_id] in pixels, as produced by
+synthetic_data.generate_2d_data. Samples are consumed as a stream and
+encoded/written in a process pool with a bounded number in flight, so the
+whole dataset never has to be in memory.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import cv2
+import numpy as np
+
+SPLITS = ('train', 'val')
+
+
+def yolo_labels(boxes, width, height):
+    """[x1, y1, x2, y2, class_id] pixel boxes -> [class_id, cx, cy, w, h] normalized to the image size"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 5)
+    scale = np.array([width, height, width, height], dtype=np.float64)
+    x1y1, x2y2 = boxes[:, 0:2], boxes[:, 2:4]
+    centers_sizes = np.concatenate([(x1y1 + x2y2) / 2, x2y2 - x1y1], axis=1) / scale
+    return np.column_stack([boxes[:, 4], centers_sizes])
+
+
+def format_labels(labels):
+    return ''.join(f"{int(row[0])} {row[1]:.6f} {row[2]:.6f} {row[3]:.6f} {row[4]:.6f}\n"
+                   for row in labels.tolist())
+
+
+def write_sample(image, boxes, image_path, label_path, jpeg_quality=95):
+    """Encode one image and its label file; returns the number of boxes written"""
+    height, width = image.shape[:2]
+    labels = yolo_labels(boxes, width, height)
+    if not cv2.imwrite(image_path, image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]):
+        raise IOError(f"Could not write {image_path}")
+    with open(label_path, 'w') as file:
+        file.write(format_labels(labels))
+    return len(labels)
+
+
+def write_samples(jobs, jpeg_quality=95):
+    """write_sample() over a list of (image, boxes, image_path, label_path)"""
+    return sum(write_sample(*job, jpeg_quality=jpeg_quality) for job in jobs)
+
+
+def write_data_yaml(output_dir, class_names):
+    path = os.path.join(output_dir, 'data.yaml')
+    with open(path, 'w') as file:
+        file.write(f"path: {os.path.abspath(output_dir)}\n")
+        file.write("train: images/train\n")
+        file.write("val: images/val\n")
+        file.write("names:\n")
+        for class_id, name in enumerate(class_names):
+            file.write(f"  {class_id}: {name}\n")
+    return path
+
+
+def export_yolo_dataset(samples, output_dir, class_names=('rectangle',), val_fraction=0.2, seed=0,
+                        processes=None, batch_size=64, jpeg_quality=95):
+    """Write a stream of (image, boxes) samples as a YOLO dataset; returns the data.yaml path.
+
+    Each sample goes to the val split with probability `val_fraction`
+    (seeded, so reruns split the same way). Images are BGR/gray arrays of
+    any size; labels are normalized against each image's own width/height.
+    Samples are handed to the workers `batch_size` at a time, with at most
+    two batches per worker in flight.
+    """
+    for split in SPLITS:
+        os.makedirs(os.path.join(output_dir, 'images', split), exist_ok=True)
+        os.makedirs(os.path.join(output_dir, 'labels', split), exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    processes = processes or os.cpu_count() or 1
+    counts = {split: 0 for split in SPLITS}
+
+    def batches():
+        batch = []
+        for index, (image, boxes) in enumerate(samples):
+            split = 'val' if rng.random() < val_fraction else 'train'
+            counts[split] += 1
+            batch.append((image, boxes,
+                          os.path.join(output_dir, 'images', split, f'{index}.jpg'),
+                          os.path.join(output_dir, 'labels', split, f'{index}.txt')))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    if processes == 1:
+        num_boxes = sum(write_samples(batch, jpeg_quality) for batch in batches())
+    else:
+        num_boxes = 0
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            pending = set()
+            for batch in batches():
+                pending.add(pool.submit(write_samples, batch, jpeg_quality))
+                if len(pending) >= 2 * processes:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    num_boxes += sum(future.result() for future in done)
+            num_boxes += sum(future.result() for future in pending)
+
+    print(f"Exported {counts['train']} train / {counts['val']} val images ({num_boxes} boxes) to {output_dir}")
+    return write_data_yaml(output_dir, class_names)
+
+
+def synthetic_samples(num_images, img_size=256, chunk_size=256, seed=None):
+    """Stream (image, boxes) samples from synthetic_data one chunk at a time"""
+    from synthetic_data import iter_2d_data
+    for images, _, boxes in iter_2d_data(num_images, img_size, chunk_size, seed):
+        yield from zip(images, boxes)
@@ -0,0 +1,74 @@
+"""Detector startup time and per-frame latency, measured without the network.
+
+    python benchmark.py --hub-dir ~/yolov5 --weights yolov5s.pt
+    python benchmark.py --hub-dir ~/yolov5 --weights yolov5s.onnx --quantize
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+import detector
+from main import detect_batch
+
+
+def read_frames(source, count):
+    """Up to `count` frames from a video file, or one image repeated"""
+    if source.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')):
+        return [cv2.imread(source)] * count
+    frames = []
+    cap = cv2.VideoCapture(source)
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--weights', help='.pt, .torchscript or .onnx file (default: yolov5s.pt if present)')
+    parser.add_argument('--hub-dir', help='local yolov5 checkout (default: the torch.hub cache)')
+    parser.add_argument('--quantize', action='store_true', help='dynamic int8 quantization (ONNX, CPU)')
+    parser.add_argument('--device', help="e.g. 'cpu' or '0'")
+    parser.add_argument('--download', action='store_true', help='fetch missing hub code/weights from GitHub')
+    parser.add_argument('--source', default='videoplayback.mp4', help='video or image to run on')
+    parser.add_argument('--frames', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--warmup', type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model = detector.load_detector(args.weights, args.hub_dir, args.quantize, args.device, args.download)
+    startup = time.perf_counter() - start
+    detector.set_detector(model)
+
+    frames = read_frames(args.source, args.frames)
+    if not frames:
+        raise SystemExit(f"Could not read frames from {args.source}")
+
+    start = time.perf_counter()
+    detect_batch(frames[:args.batch_size], args.batch_size)
+    first = time.perf_counter() - start
+    for _ in range(args.warmup):
+        detect_batch(frames[:args.batch_size], args.batch_size)
+
+    latencies = []
+    for i in range(0, len(frames), args.batch_size):
+        batch = frames[i:i + args.batch_size]
+        start = time.perf_counter()
+        detect_batch(batch, args.batch_size)
+        latencies.append((time.perf_counter() - start) / len(batch))
+
+    latencies = np.array(latencies) * 1000
+    print(f"Startup (model load): {startup:.2f}s, first inference: {first * 1000:.0f} ms")
+    print(f"Per-frame latency over {len(frames)} frames (batch {args.batch_size}): "
+          f"mean {latencies.mean():.1f} ms, p50 {np.percentile(latencies, 50):.1f} ms, "
+          f"p90 {np.percentile(latencies, 90):.1f} ms -> {1000 / latencies.mean():.1f} FPS")
+
+
+if __name__ == '__main__':
+    main()
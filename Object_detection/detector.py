@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+
+# torch is imported when the detector is built, so importing this module
+# (and main.py/offline.py) stays cheap
+
+HUB_REPO = 'ultralytics/yolov5'
+DEFAULT_MODEL = 'yolov5s'  # the small version
+# Where load_detector() looks for the stock weights when none are given
+DEFAULT_WEIGHTS = (f'{DEFAULT_MODEL}.pt',
+                   os.path.join(os.path.dirname(os.path.abspath(__file__)), f'{DEFAULT_MODEL}.pt'))
+
+# Formats the yolov5 'custom' hub entry point loads through its multi-backend wrapper
+WEIGHT_FORMATS = ('.pt', '.torchscript', '.onnx')
+
+
+def local_hub_dir():
+    """Where torch.hub keeps its clone of the yolov5 repo after the first online load"""
+    import torch
+    return os.path.join(torch.hub.get_dir(), 'ultralytics_yolov5_master')
+
+
+def default_weights():
+    """The first existing DEFAULT_WEIGHTS file, or None"""
+    return next((path for path in DEFAULT_WEIGHTS if os.path.exists(path)), None)
+
+
+def quantize_onnx(weights):
+    """Write a dynamically int8-quantized copy of an ONNX model (once) and return its path.
+
+    Dynamic quantization of the PyTorch model only covers Linear/RNN layers,
+    which YOLOv5 barely has; onnxruntime also quantizes the convolutions.
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    quantized = weights[:-len('.onnx')] + '.int8.onnx'
+    if not os.path.exists(quantized) or os.path.getmtime(quantized) < os.path.getmtime(weights):
+        print(f"Quantizing {weights} -> {quantized}")
+        quantize_dynamic(weights, quantized, weight_type=QuantType.QUInt8)
+    return quantized
+
+
+def load_detector(weights=None, hub_dir=None, quantize=False, device=None, download=False):
+    """Build the YOLOv5 detector from files on disk, without the network.
+
+    `weights` may be a .pt checkpoint or a pre-exported .torchscript/.onnx
+    file; without it yolov5s.pt is looked for in the working directory and
+    next to this module. The hub code comes from `hub_dir` (a yolov5
+    checkout), else from torch.hub's local cache. When either is missing a
+    FileNotFoundError says what to provide, unless `download=True` allows
+    fetching the code and the stock weights from GitHub.
+    `quantize=True` runs an ONNX model with dynamic int8 weights (CPU).
+    """
+    if weights is None:
+        weights = default_weights()
+        if weights is None and not download:
+            raise FileNotFoundError(
+                f"No YOLOv5 weights: pass a local .pt/.torchscript/.onnx file (YOLO_WEIGHTS), put "
+                f"{DEFAULT_MODEL}.pt in the working directory, or set YOLO_DOWNLOAD=1 to fetch it from GitHub")
+    if weights is not None and not weights.endswith(WEIGHT_FORMATS):
+        raise ValueError(f"Unsupported weights format: {weights} (expected one of {WEIGHT_FORMATS})")
+    if quantize:
+        if weights is None or not weights.endswith('.onnx'):
+            raise ValueError("Dynamic int8 quantization needs an exported .onnx model")
+        weights = quantize_onnx(weights)
+        device = 'cpu'
+
+    hub_dir = hub_dir or local_hub_dir()
+    if os.path.isdir(hub_dir):
+        repo, source = hub_dir, 'local'
+    elif download:
+        print(f"No local yolov5 checkout at {hub_dir}, loading {HUB_REPO} from GitHub")
+        repo, source = HUB_REPO, 'github'
+    else:
+        raise FileNotFoundError(
+            f"No local yolov5 checkout at {hub_dir}: clone https://github.com/{HUB_REPO} and pass it as "
+            f"YOLO_HUB_DIR, or set YOLO_DOWNLOAD=1 to fetch it from GitHub")
+
+    import torch
+
+    kwargs = {'source': source}
+    if device is not None:
+        kwargs['device'] = device
+    if weights is None:
+        return torch.hub.load(repo, DEFAULT_MODEL, pretrained=True, **kwargs)
+    return torch.hub.load(repo, 'custom', path=weights, **kwargs)
+
+
+def detector_options_from_env():
+    """load_detector() arguments from YOLO_WEIGHTS / YOLO_HUB_DIR / YOLO_QUANTIZE / YOLO_DEVICE / YOLO_DOWNLOAD"""
+    return {
+        'weights': os.environ.get('YOLO_WEIGHTS') or None,
+        'hub_dir': os.environ.get('YOLO_HUB_DIR') or None,
+        'quantize': os.environ.get('YOLO_QUANTIZE', '').lower() in ('1', 'true', 'yes'),
+        'device': os.environ.get('YOLO_DEVICE') or None,
+        'download': os.environ.get('YOLO_DOWNLOAD', '').lower() in ('1', 'true', 'yes'),
+    }
+
+
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def get_detector():
+    """Shared detector, built on first use from the YOLO_* environment variables"""
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                start = time.perf_counter()
+                _detector = load_detector(**detector_options_from_env())
+                print(f"Detector loaded in {time.perf_counter() - start:.2f}s")
+    return _detector
+
+
+def set_detector(detector):
+    """Use an already-built detector (e.g. one from load_detector) for detection"""
+    global _detector
+    with _detector_lock:
+        _detector = detector
@@ -1,26 +1,66 @@
-import torch
+import os
 import cv2
 import numpy as np
 from PIL import Image
+from contextlib import nullcontext
+from functools import partial
+from pipeline import VideoPipeline, StageTimings, draw_stats, BLOCK, DROP_OLDEST
+from detector import get_detector
+from tracker import KeyframeDetector
 
-# Load YOLOv5 model from PyTorch Hub
-model = torch.hub.load('ultralytics/yolov5', 'yolov5s', pretrained=True)  # 'yolov5s' is the small version
+# The YOLOv5 model is built on first use (see detector.py), so importing this
+# module needs neither the network nor the model weights
 
-def detect_objects(frame):
-    """Detect objects in a frame using YOLOv5 and return annotated frame"""
-    # Convert BGR (OpenCV) to RGB
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    
-    # Run inference
-    results = model(rgb_frame)
+# Detections are (N, 6) float32 arrays, one row per box:
+# xmin, ymin, xmax, ymax, confidence, class id
+XMIN, YMIN, XMAX, YMAX, CONFIDENCE, CLASS_ID = range(6)
+
+def filter_detections(detections, conf_threshold=None, classes=None):
+    """Keep rows above a confidence threshold and/or in a set of class ids"""
+    keep = np.ones(len(detections), dtype=bool)
+    if conf_threshold is not None:
+        keep &= detections[:, CONFIDENCE] >= conf_threshold
+    if classes is not None:
+        keep &= np.isin(detections[:, CLASS_ID].astype(int), list(classes))
+    return detections[keep]
+
+def _timed(timings, name):
+    return timings.stage(name) if timings is not None else nullcontext()
+
+def detect_batch(frames, batch_size=8, conf_threshold=None, classes=None, timings=None):
+    """Detect objects in many frames, `batch_size` frames per model call.
     
-    # Parse results
-    detections = results.pandas().xyxy[0]  # DataFrame with: xmin, ymin, xmax, ymax, confidence, class, name
+    Returns one detections array per frame, in the order given. Pass a
+    StageTimings as `timings` to collect a per-stage time breakdown.
+    """
+    detections = []
+    for start in range(0, len(frames), batch_size):
+        # Convert BGR (OpenCV) to RGB
+        with _timed(timings, 'preprocess'):
+            rgb_frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames[start:start + batch_size]]
+        
+        # Run inference on the whole batch at once
+        with _timed(timings, 'inference'):
+            results = get_detector()(rgb_frames)
+        
+        # Parse results straight from the output tensors
+        with _timed(timings, 'postprocess'):
+            for frame_detections in results.xyxy:
+                frame_detections = frame_detections.cpu().numpy()
+                if conf_threshold is not None or classes is not None:
+                    frame_detections = filter_detections(frame_detections, conf_threshold, classes)
+                detections.append(frame_detections)
+    return detections
+
+def draw_detections(frame, detections):
+    """Draw bounding boxes and labels on a frame"""
+    boxes = detections[:, :4].astype(int).tolist()
+    confidences = detections[:, CONFIDENCE].tolist()
+    class_ids = detections[:, CLASS_ID].astype(int).tolist()
+    names = get_detector().names
     
-    # Draw bounding boxes and labels
-    for _, detection in detections.iterrows():
-        label = f"{detection['name']} {detection['confidence']:.2f}"
-        xmin, ymin, xmax, ymax = detection[['xmin','ymin','xmax','ymax']].astype(int)
+    for (xmin, ymin, xmax, ymax), confidence, class_id in zip(boxes, confidences, class_ids):
+        label = f"{names[class_id]} {confidence:.2f}"
         
         # Draw rectangle
         cv2.rectangle(frame, (xmin, ymin), (xmax, ymax), (0, 255, 0), 2)
@@ -34,37 +74,95 @@ def detect_objects(frame):
     
     return frame
 
+def detect_objects_batch(frames, batch_size=8, conf_threshold=None, classes=None, timings=None):
+    """Detect objects in many frames and return the annotated frames"""
+    detections = detect_batch(frames, batch_size, conf_threshold, classes, timings)
+    with _timed(timings, 'draw'):
+        annotated = [draw_detections(frame, frame_detections)
+                     for frame, frame_detections in zip(frames, detections)]
+    if timings is not None:
+        timings.add_frames(len(frames))
+    return annotated
+
+def detect_objects(frame, conf_threshold=None, classes=None, timings=None):
+    """Detect objects in a frame using YOLOv5 and return annotated frame"""
+    return detect_objects_batch([frame], 1, conf_threshold, classes, timings)[0]
+
 # ======== IMAGE DETECTION ========
-def detect_image(image_path):
-    """Process single image"""
-    img = cv2.imread(image_path)
-    result_img = detect_objects(img)
-    cv2.imshow('YOLO Object Detection', result_img)
-    cv2.waitKey(0)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+def list_images(path):
+    """A single image path, or every image in a directory (sorted)"""
+    if os.path.isdir(path):
+        return [os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(IMAGE_EXTENSIONS)]
+    return [path]
+
+def detect_image(image_path, batch_size=8):
+    """Process a single image, or a directory of images in batches"""
+    paths = list_images(image_path)
+    for start in range(0, len(paths), batch_size):
+        chunk = paths[start:start + batch_size]
+        images = [cv2.imread(path) for path in chunk]
+        for path, result_img in zip(chunk, detect_objects_batch(images, batch_size)):
+            cv2.imshow('YOLO Object Detection', result_img)
+            key = cv2.waitKey(0)
+            if key & 0xFF == ord('q'):
+                cv2.destroyAllWindows()
+                return
     cv2.destroyAllWindows()
 
 # ======== VIDEO DETECTION ========
-def detect_video(video_path=0):
-    """Process video stream (0 for webcam)"""
-    cap = cv2.VideoCapture(video_path)
+def detect_video(video_path=0, workers=2, batch_size=4, queue_size=8, drop_policy=None, headless=False, max_frames=None,
+                 target_fps=None):
+    """Process video stream (0 for webcam).
     
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-            
-        # Detect objects
-        result_frame = detect_objects(frame)
-        
-        # Display
-        cv2.imshow('YOLO Real-time Detection', result_frame)
-        
+    Decoding, inference and display run as a pipeline: a decoder thread, a
+    pool of `workers` inference threads (each running up to `batch_size`
+    queued frames per model call) and an in-order renderer. Live
+    sources drop the oldest queued frame when inference falls behind; files
+    never drop frames. With `headless=True` nothing is displayed and the
+    FPS/latency readout is printed instead.
+    
+    With `target_fps`, full detection only runs on keyframes and boxes are
+    tracked in between; the keyframe interval adapts to the measured
+    inference time to hold that frame rate (one inference worker).
+    """
+    if drop_policy is None:
+        drop_policy = DROP_OLDEST if isinstance(video_path, int) else BLOCK
+    
+    def show(frame, index, stats):
+        cv2.imshow('YOLO Real-time Detection', draw_stats(frame, stats, pipeline.dropped))
         # Exit on 'q'
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+        return not (cv2.waitKey(1) & 0xFF == ord('q'))
     
-    cap.release()
-    cv2.destroyAllWindows()
+    def report(frame, index, stats):
+        if index % 30 == 0:
+            print(f"frame {index}: {stats.fps:.1f} FPS, {stats.latency_ms:.0f} ms latency, {pipeline.dropped} dropped")
+    
+    timings = StageTimings()
+    if target_fps:
+        detect_fn = KeyframeDetector(partial(detect_batch, batch_size=1, timings=timings), draw_detections, target_fps)
+        workers = 1
+    else:
+        detect_fn = partial(detect_objects_batch, batch_size=batch_size, timings=timings)
+    pipeline = VideoPipeline(video_path, detect_fn,
+                             sink=report if headless else show,
+                             workers=workers, batch_size=batch_size, queue_size=queue_size,
+                             drop_policy=drop_policy, max_frames=max_frames)
+    stats = pipeline.run()
+    print(f"Processed {stats.frames} frames ({pipeline.dropped} dropped)")
+    if target_fps:
+        print(f"Keyframes: {detect_fn.keyframes} of {detect_fn.frames} frames "
+              f"(interval now {detect_fn.scheduler.interval})")
+        timings.add_frames(detect_fn.keyframes)
+        print(f"Per-keyframe time: {timings.report()}")
+    else:
+        print(f"Per-frame time: {timings.report()}")
+    
+    if not headless:
+        cv2.destroyAllWindows()
+    return stats
 
 if __name__ == "__main__":
     # Choose detection mode:
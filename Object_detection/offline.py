@@ -0,0 +1,369 @@
+"""Headless batch processing: annotated video or images plus a detections file.
+
+    python offline.py videoplayback.mp4 -o annotated.mp4 -d detections.jsonl
+    python offline.py videoplayback.mp4 -o annotated.mp4 -d detections.parquet --stride 2 --processes 4
+    python offline.py photos/ -o annotated/ -d detections.jsonl --roi 0,0,640,360
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from contextlib import nullcontext
+from itertools import islice
+
+import cv2
+
+from detector import get_detector
+from main import detect_batch, draw_detections, list_images, IMAGE_EXTENSIONS, XMIN, YMIN, XMAX, YMAX, CONFIDENCE, CLASS_ID
+
+ROI_COLOR = (255, 0, 0)
+
+
+class DetectionWriter:
+    """Streams detections to JSONL (one record per frame) or Parquet (one row per box)"""
+    PARQUET_COLUMNS = ['source', 'frame', 'xmin', 'ymin', 'xmax', 'ymax', 'confidence', 'class_id', 'name']
+
+    def __init__(self, path, row_group_size=10000):
+        self.path = path
+        self.names = get_detector().names
+        self.parquet = path.endswith('.parquet')
+        self.row_group_size = row_group_size
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            self._pa = pa
+            self._schema = pa.schema([
+                ('source', pa.string()), ('frame', pa.int64()),
+                ('xmin', pa.float32()), ('ymin', pa.float32()), ('xmax', pa.float32()), ('ymax', pa.float32()),
+                ('confidence', pa.float32()), ('class_id', pa.int32()), ('name', pa.string()),
+            ])
+            self._writer = pq.ParquetWriter(path, self._schema)
+            self._columns = {name: [] for name in self.PARQUET_COLUMNS}
+        else:
+            self._file = open(path, 'w')
+
+    def write(self, source, frame_index, detections):
+        class_ids = detections[:, CLASS_ID].astype(int).tolist()
+        names = [self.names[class_id] for class_id in class_ids]
+        if not self.parquet:
+            record = {
+                'source': source,
+                'frame': frame_index,
+                'boxes': detections[:, :4].astype(float).round(1).tolist(),
+                'confidences': detections[:, CONFIDENCE].astype(float).round(4).tolist(),
+                'class_ids': class_ids,
+                'names': names,
+            }
+            self._file.write(json.dumps(record) + '\n')
+            return
+
+        count = len(detections)
+        columns = self._columns
+        columns['source'] += [source] * count
+        columns['frame'] += [frame_index] * count
+        for name, column in (('xmin', XMIN), ('ymin', YMIN), ('xmax', XMAX), ('ymax', YMAX),
+                             ('confidence', CONFIDENCE)):
+            columns[name] += detections[:, column].tolist()
+        columns['class_id'] += class_ids
+        columns['name'] += names
+        if len(columns['frame']) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if self._columns['frame']:
+            self._writer.write_table(self._pa.table(self._columns, schema=self._schema))
+            self._columns = {name: [] for name in self.PARQUET_COLUMNS}
+
+    def close(self):
+        if self.parquet:
+            self._flush()
+            self._writer.close()
+        else:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def parse_roi(text):
+    """'x,y,w,h' -> (x, y, w, h)"""
+    try:
+        x, y, w, h = (int(value) for value in text.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ROI must be x,y,w,h in pixels, got {text!r}")
+    if w <= 0 or h <= 0:
+        raise argparse.ArgumentTypeError(f"ROI width and height must be positive, got {text!r}")
+    return x, y, w, h
+
+
+def clip_roi(roi, frame_shape):
+    """`roi` cut to the frame; raises ValueError when none of it is inside"""
+    height, width = frame_shape[:2]
+    x, y, w, h = roi
+    left, top = max(x, 0), max(y, 0)
+    right, bottom = min(x + w, width), min(y + h, height)
+    if right <= left or bottom <= top:
+        raise ValueError(f"ROI {x},{y},{w},{h} is outside the {width}x{height} frame")
+    return left, top, right - left, bottom - top
+
+
+def detect_frames(frames, roi=None, batch_size=4, conf_threshold=None):
+    """Detections for each frame in full-frame coordinates, looking only inside `roi`
+    (clipped to each frame)"""
+    if roi is None:
+        return detect_batch(frames, batch_size, conf_threshold)
+    rois = [clip_roi(roi, frame.shape) for frame in frames]
+    detections = detect_batch([frame[y:y + h, x:x + w] for frame, (x, y, w, h) in zip(frames, rois)],
+                              batch_size, conf_threshold)
+    for frame_detections, (x, y, _, _) in zip(detections, rois):
+        frame_detections[:, [XMIN, XMAX]] += x
+        frame_detections[:, [YMIN, YMAX]] += y
+    return detections
+
+
+def annotate(frame, detections, roi=None):
+    frame = draw_detections(frame, detections)
+    if roi is not None:
+        x, y, w, h = clip_roi(roi, frame.shape)
+        cv2.rectangle(frame, (x, y), (x + w, y + h), ROI_COLOR, 1)
+    return frame
+
+
+def read_strided(cap, start, end, stride):
+    """Yield (index, frame) for every `stride`-th frame in [start, end).
+
+    Skipped frames are only grabbed, not decoded.
+    """
+    index = start
+    while end is None or index < end:
+        if (index - start) % stride:
+            if not cap.grab():
+                break
+        else:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield index, frame
+        index += 1
+
+
+def process_video_range(source, video_out=None, detections_out=None, start=0, end=None, stride=1,
+                        roi=None, batch_size=4, conf_threshold=None):
+    """Process frames [start, end) of a video file; returns the number of frames processed.
+
+    The annotated video gets every processed frame, at the source frame
+    rate divided by `stride`.
+    """
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {source}")
+    fps = (cap.get(cv2.CAP_PROP_FPS) or 30.0) / stride
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    writer = None
+    processed = 0
+    frames = read_strided(cap, start, end, stride)
+    try:
+        with DetectionWriter(detections_out) if detections_out else nullcontext() as detections_file:
+            while True:
+                batch = list(islice(frames, batch_size))
+                if not batch:
+                    break
+                detections = detect_frames([frame for _, frame in batch], roi, batch_size, conf_threshold)
+                for (index, frame), frame_detections in zip(batch, detections):
+                    if detections_file is not None:
+                        detections_file.write(source, index, frame_detections)
+                    if video_out is not None:
+                        if writer is None:
+                            height, width = frame.shape[:2]
+                            writer = cv2.VideoWriter(video_out, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+                        writer.write(annotate(frame, frame_detections, roi))
+                processed += len(batch)
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+    return processed
+
+
+def split_frame_range(total, parts, stride=1):
+    """Split [0, total) into up to `parts` ranges whose starts stay on the stride grid"""
+    chunk = -(-total // parts)
+    chunk = -(-chunk // stride) * stride
+    return [(start, min(start + chunk, total)) for start in range(0, total, chunk)]
+
+
+def part_path(path, index):
+    if path is None:
+        return None
+    root, ext = os.path.splitext(path)
+    return f"{root}.part{index}{ext}"
+
+
+def concat_videos(parts, output):
+    writer = None
+    for part in parts:
+        cap = cv2.VideoCapture(part)
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if writer is None:
+                height, width = frame.shape[:2]
+                writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*'mp4v'), cap.get(cv2.CAP_PROP_FPS),
+                                         (width, height))
+            writer.write(frame)
+        cap.release()
+    if writer is not None:
+        writer.release()
+
+
+def concat_detections(parts, output):
+    if output.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        writer = None
+        for part in parts:
+            table = pq.read_table(part)
+            writer = writer or pq.ParquetWriter(output, table.schema)
+            writer.write_table(table)
+        if writer is not None:
+            writer.close()
+    else:
+        with open(output, 'wb') as out:
+            for part in parts:
+                with open(part, 'rb') as file:
+                    shutil.copyfileobj(file, out)
+
+
+def _init_worker(threads):
+    import torch
+    torch.set_num_threads(threads)
+
+
+def process_video(source, video_out=None, detections_out=None, processes=1, stride=1, roi=None,
+                  batch_size=4, conf_threshold=None):
+    """Process a whole video file, optionally split by frame range across processes.
+
+    Each process seeks to its range, loads its own model and writes part
+    files, which are then joined in frame order. Seeking relies on the
+    container's frame index, so variable-frame-rate files may be split a
+    few frames off.
+    """
+    cap = cv2.VideoCapture(source)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    if roi is not None and width > 0 and height > 0:
+        # Fail before starting any worker
+        roi = clip_roi(roi, (height, width))
+    if processes <= 1 or total <= 0:
+        if processes > 1:
+            print(f"Frame count of {source} unknown, processing it in one process")
+        return process_video_range(source, video_out, detections_out, stride=stride, roi=roi,
+                                   batch_size=batch_size, conf_threshold=conf_threshold)
+
+    ranges = split_frame_range(total, processes, stride)
+    video_parts = [part_path(video_out, i) for i in range(len(ranges))]
+    detection_parts = [part_path(detections_out, i) for i in range(len(ranges))]
+    jobs = [(source, video_part, detection_part, start, end, stride, roi, batch_size, conf_threshold)
+            for (start, end), video_part, detection_part in zip(ranges, video_parts, detection_parts)]
+    threads = max(1, (os.cpu_count() or 1) // len(ranges))
+
+    # spawn, not fork: torch's thread pools don't survive a fork
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(len(ranges), initializer=_init_worker, initargs=(threads,)) as pool:
+        processed = sum(pool.starmap(process_video_range, jobs))
+
+    if video_out is not None:
+        concat_videos(video_parts, video_out)
+    if detections_out is not None:
+        concat_detections(detection_parts, detections_out)
+    for part in video_parts + detection_parts:
+        if part is not None and os.path.exists(part):
+            os.remove(part)
+    return processed
+
+
+def read_images(paths, roi=None):
+    """[(path, image)] for the images that can be read and overlap `roi`; the rest are reported and skipped"""
+    images = []
+    for image_path in paths:
+        image = cv2.imread(image_path)
+        if image is None:
+            print(f"Skipping {image_path}: not a readable image")
+            continue
+        if roi is not None:
+            try:
+                clip_roi(roi, image.shape)
+            except ValueError as e:
+                print(f"Skipping {image_path}: {e}")
+                continue
+        images.append((image_path, image))
+    return images
+
+
+def process_images(path, output_dir=None, detections_out=None, roi=None, batch_size=8, conf_threshold=None):
+    """Process an image or a directory of images; annotated copies go to `output_dir`.
+
+    Returns the number of images processed; unreadable ones are skipped.
+    """
+    paths = list_images(path)
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    processed = 0
+    with DetectionWriter(detections_out) if detections_out else nullcontext() as detections_file:
+        for start in range(0, len(paths), batch_size):
+            readable = read_images(paths[start:start + batch_size], roi)
+            if not readable:
+                continue
+            chunk = [image_path for image_path, _ in readable]
+            images = [image for _, image in readable]
+            detections = detect_frames(images, roi, batch_size, conf_threshold)
+            for image_path, image, image_detections in zip(chunk, images, detections):
+                if detections_file is not None:
+                    detections_file.write(image_path, 0, image_detections)
+                if output_dir is not None:
+                    cv2.imwrite(os.path.join(output_dir, os.path.basename(image_path)),
+                                annotate(image, image_detections, roi))
+            processed += len(readable)
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='video file, image, or directory of images')
+    parser.add_argument('-o', '--output', help='annotated video file (video input) or directory (images)')
+    parser.add_argument('-d', '--detections', help='detections file, .jsonl or .parquet')
+    parser.add_argument('--stride', type=int, default=1, help='process every Nth video frame')
+    parser.add_argument('--roi', type=parse_roi, help='only detect inside x,y,w,h')
+    parser.add_argument('--processes', type=int, default=1, help='split a video across N processes')
+    parser.add_argument('--batch-size', type=int, default=4)
+    parser.add_argument('--conf', type=float, help='minimum detection confidence')
+    args = parser.parse_args()
+
+    if not args.output and not args.detections:
+        parser.error('nothing to write: pass --output and/or --detections')
+    if args.stride < 1:
+        parser.error('--stride must be at least 1')
+
+    start = time.perf_counter()
+    try:
+        if os.path.isdir(args.input) or args.input.lower().endswith(IMAGE_EXTENSIONS):
+            processed = process_images(args.input, args.output, args.detections, args.roi, args.batch_size, args.conf)
+        else:
+            processed = process_video(args.input, args.output, args.detections, args.processes, args.stride,
+                                      args.roi, args.batch_size, args.conf)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+    print(f"Processed {processed} frames in {elapsed:.1f}s ({processed / elapsed:.1f} FPS)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import cv2
+
+# Frame-drop policies for the decoder -> inference queue
+BLOCK = 'block'              # never drop; the decoder waits (video files)
+DROP_OLDEST = 'drop_oldest'  # replace the stalest queued frame (live sources)
+DROP_NEWEST = 'drop_newest'  # discard the frame just captured
+DROP_POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST)
+
+_END = object()
+
+
+class FrameQueue:
+    """Bounded FIFO whose put() applies a frame-drop policy when full"""
+    def __init__(self, maxsize, drop_policy=BLOCK):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.maxsize = maxsize
+        self.drop_policy = drop_policy
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item, force=False):
+        """Queue an item; `force` bypasses the size limit (used for end markers)"""
+        with self._cond:
+            if not force and len(self._items) >= self.maxsize:
+                if self.drop_policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return
+                if self.drop_policy == DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self._items) >= self.maxsize:
+                        self._cond.wait()
+            self._items.append(item)
+            self._cond.notify_all()
+
+    def get(self):
+        with self._cond:
+            while not self._items:
+                self._cond.wait()
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def get_many(self, max_items, end_marker=None):
+        """Wait for one item, then take whatever else is queued, up to `max_items`.
+
+        An `end_marker` is only ever returned on its own, as the first item.
+        """
+        with self._cond:
+            while not self._items:
+                self._cond.wait()
+            items = [self._items.popleft()]
+            if items[0] is not end_marker:
+                while self._items and len(items) < max_items and self._items[0] is not end_marker:
+                    items.append(self._items.popleft())
+            self._cond.notify_all()
+            return items
+
+
+class PipelineStats:
+    """Output FPS and capture-to-render latency over a sliding window"""
+    def __init__(self, window=60):
+        self.frames = 0
+        self._times = deque(maxlen=window)
+        self._latencies = deque(maxlen=window)
+
+    def record(self, captured_at):
+        now = time.perf_counter()
+        self.frames += 1
+        self._times.append(now)
+        self._latencies.append(now - captured_at)
+
+    @property
+    def fps(self):
+        if len(self._times) < 2:
+            return 0.0
+        return (len(self._times) - 1) / (self._times[-1] - self._times[0])
+
+    @property
+    def latency_ms(self):
+        if not self._latencies:
+            return 0.0
+        return 1000 * sum(self._latencies) / len(self._latencies)
+
+
+class StageTimings:
+    """Seconds spent per processing stage, reported as a per-frame breakdown"""
+    def __init__(self):
+        self.totals = {}
+        self.frames = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.totals[name] = self.totals.get(name, 0.0) + elapsed
+
+    def add_frames(self, count):
+        with self._lock:
+            self.frames += count
+
+    def per_frame_ms(self):
+        frames = max(self.frames, 1)
+        return {name: 1000 * total / frames for name, total in self.totals.items()}
+
+    def report(self):
+        return ' | '.join(f"{name} {ms:.2f} ms" for name, ms in self.per_frame_ms().items())
+
+
+class VideoPipeline:
+    """Decoder thread -> inference worker pool -> in-order renderer.
+
+    `detect_batch_fn(frames)` returns the annotated frames; each worker hands
+    it up to `batch_size` frames that are already queued, so batches grow
+    when inference falls behind and stay at one frame when it keeps up.
+    `sink(frame, index, stats)` receives annotated frames in capture order
+    and returns False to stop; with no sink the pipeline runs headless and
+    just drains the results.
+    """
+    def __init__(self, source, detect_batch_fn, sink=None, workers=2, batch_size=1, queue_size=8,
+                 drop_policy=BLOCK, max_frames=None):
+        self.source = source
+        self.detect_batch_fn = detect_batch_fn
+        self.sink = sink
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_frames = max_frames
+        self.frames_in = FrameQueue(queue_size, drop_policy)
+        # Results are reordered by the renderer, so this queue only needs to
+        # hold what the workers produce ahead of it
+        self.frames_out = FrameQueue(queue_size + workers * batch_size)
+        self.stats = PipelineStats()
+
+        self._stop = threading.Event()
+        self._take_lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._error = None
+        self._error_lock = threading.Lock()
+
+    def stop(self):
+        self._stop.set()
+
+    def _fail(self, error):
+        """Stop the pipeline on a thread's error; run() re-raises the first one"""
+        with self._error_lock:
+            if self._error is None:
+                self._error = error
+        self.stop()
+
+    @property
+    def dropped(self):
+        return self.frames_in.dropped
+
+    def _decode(self):
+        cap = cv2.VideoCapture(self.source)
+        try:
+            read = 0
+            while cap.isOpened() and not self._stop.is_set():
+                if self.max_frames is not None and read >= self.max_frames:
+                    break
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                read += 1
+                self.frames_in.put((frame, time.perf_counter()))
+        except Exception as e:
+            self._fail(e)
+        finally:
+            cap.release()
+            for _ in range(self.workers):
+                self.frames_in.put(_END, force=True)
+
+    def _infer(self):
+        # Always sign off, or run() would wait on this worker forever
+        try:
+            self._infer_frames()
+        except Exception as e:
+            self._fail(e)
+            # Keep taking frames until our end marker, so a decoder blocked
+            # on a full queue gets to see the stop and finish
+            while self.frames_in.get() is not _END:
+                pass
+        finally:
+            self.frames_out.put(_END, force=True)
+
+    def _infer_frames(self):
+        while True:
+            # Sequence numbers are handed out as frames leave the queue, so
+            # dropped frames never leave gaps the renderer would wait on
+            with self._take_lock:
+                items = self.frames_in.get_many(self.batch_size, end_marker=_END)
+                if items[0] is _END:
+                    break
+                indices = [next(self._sequence) for _ in items]
+            frames = [frame for frame, _ in items]
+            if not self._stop.is_set():
+                frames = self.detect_batch_fn(frames)
+            for index, frame, (_, captured_at) in zip(indices, frames, items):
+                self.frames_out.put((index, frame, captured_at))
+
+    def run(self):
+        """Run until the source ends or the sink asks to stop; returns the stats.
+
+        An exception raised by `detect_batch_fn` (or while decoding) stops the
+        pipeline and is re-raised here once every thread has finished.
+        """
+        threads = [threading.Thread(target=self._decode, name='decoder', daemon=True)]
+        threads += [threading.Thread(target=self._infer, name=f'inference-{i}', daemon=True)
+                    for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        pending = {}
+        next_index = 0
+        finished_workers = 0
+        while finished_workers < self.workers:
+            item = self.frames_out.get()
+            if item is _END:
+                finished_workers += 1
+                continue
+            pending[item[0]] = item
+            while next_index in pending:
+                _, frame, captured_at = pending.pop(next_index)
+                next_index += 1
+                if self._stop.is_set():
+                    continue
+                self.stats.record(captured_at)
+                if self.sink is not None and self.sink(frame, next_index - 1, self.stats) is False:
+                    self.stop()
+
+        for thread in threads:
+            thread.join()
+        if self._error is not None:
+            raise self._error
+        return self.stats
+
+
+def draw_stats(frame, stats, dropped=0):
+    """Overlay the FPS/latency readout on a frame"""
+    text = f"FPS {stats.fps:.1f} | latency {stats.latency_ms:.0f} ms | dropped {dropped}"
+    cv2.putText(frame, text, (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+    return frame
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import detector
+
+OBJECT_DETECTION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('module', ['detector', 'main', 'offline'])
+def test_import_does_not_load_torch(module):
+    code = f"import sys, {module}; print('torch' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=OBJECT_DETECTION_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'False'
+
+
+def test_missing_weights_fail_instead_of_downloading(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(detector, 'DEFAULT_WEIGHTS', (str(tmp_path / 'yolov5s.pt'),))
+    with pytest.raises(FileNotFoundError, match='YOLO_WEIGHTS'):
+        detector.load_detector(hub_dir=str(tmp_path))
+
+
+def test_missing_hub_checkout_fails_instead_of_downloading(tmp_path):
+    weights = tmp_path / 'yolov5s.pt'
+    weights.write_bytes(b'')
+    with pytest.raises(FileNotFoundError, match='YOLO_HUB_DIR'):
+        detector.load_detector(str(weights), hub_dir=str(tmp_path / 'no-checkout'))
+
+
+def test_detector_options_from_env(monkeypatch):
+    monkeypatch.setenv('YOLO_WEIGHTS', 'model.onnx')
+    monkeypatch.setenv('YOLO_DOWNLOAD', '1')
+    monkeypatch.delenv('YOLO_QUANTIZE', raising=False)
+    options = detector.detector_options_from_env()
+    assert options['weights'] == 'model.onnx'
+    assert options['download'] is True
+    assert options['quantize'] is False
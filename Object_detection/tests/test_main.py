@@ -0,0 +1,115 @@
+import cv2
+import numpy as np
+import pytest
+
+import detector
+import main
+
+pd = pytest.importorskip('pandas')
+
+NAMES = {0: 'person', 1: 'car', 2: 'dog'}
+
+
+class Tensor:
+    def __init__(self, array):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array.copy()
+
+
+class StubResults:
+    """The two views YOLOv5's Detections object gives of the same boxes"""
+
+    def __init__(self, arrays):
+        self.xyxy = [Tensor(array) for array in arrays]
+        self.arrays = arrays
+
+    def pandas(self):
+        class Frames:
+            xyxy = []
+        for array in self.arrays:
+            frame = pd.DataFrame(array[:, :5], columns=['xmin', 'ymin', 'xmax', 'ymax', 'confidence'])
+            frame['class'] = array[:, 5].astype(int)
+            frame['name'] = [NAMES[class_id] for class_id in frame['class']]
+            Frames.xyxy.append(frame)
+        return Frames()
+
+
+class StubDetector:
+    names = NAMES
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+
+    def __call__(self, rgb_frames):
+        assert len(rgb_frames) == len(self.arrays)
+        return StubResults(self.arrays)
+
+
+def random_detections(rng, count, size=(160, 120)):
+    xy = rng.uniform(0, (size[0] - 40, size[1] - 40), size=(count, 2))
+    wh = rng.uniform(5, 40, size=(count, 2))
+    confidence = rng.uniform(0.05, 1.0, size=(count, 1))
+    class_id = rng.integers(0, len(NAMES), size=(count, 1))
+    return np.hstack([xy, xy + wh, confidence, class_id]).astype(np.float32)
+
+
+def draw_dataframe(frame, detections):
+    """The drawing loop main.py used before detections became arrays"""
+    for _, detection in detections.iterrows():
+        label = f"{detection['name']} {detection['confidence']:.2f}"
+        xmin, ymin, xmax, ymax = detection[['xmin', 'ymin', 'xmax', 'ymax']].astype(int)
+        cv2.rectangle(frame, (xmin, ymin), (xmax, ymax), (0, 255, 0), 2)
+        cv2.rectangle(frame, (xmin, ymin-20), (xmin+len(label)*10, ymin), (0, 255, 0), -1)
+        cv2.putText(frame, label, (xmin, ymin-5),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+    return frame
+
+
+def filter_dataframe(detections, conf_threshold, classes):
+    if conf_threshold is not None:
+        detections = detections[detections['confidence'] >= conf_threshold]
+    if classes is not None:
+        detections = detections[detections['class'].isin(list(classes))]
+    return detections
+
+
+@pytest.mark.parametrize('conf_threshold, classes', [
+    (None, None),
+    (0.5, None),
+    (None, {0, 2}),
+    (0.4, {1}),
+    (1.1, None),  # Nothing left to draw
+])
+def test_array_path_draws_the_same_frames_as_the_dataframe_path(conf_threshold, classes):
+    rng = np.random.default_rng(0)
+    arrays = [random_detections(rng, count) for count in (0, 1, 7, 15)]
+    frames = [rng.integers(0, 256, size=(120, 160, 3), dtype=np.uint8) for _ in arrays]
+
+    stub = StubDetector(arrays)
+    detector.set_detector(stub)
+    try:
+        annotated = main.detect_objects_batch([frame.copy() for frame in frames], batch_size=len(frames),
+                                              conf_threshold=conf_threshold, classes=classes)
+    finally:
+        detector.set_detector(None)
+
+    dataframes = stub([cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames]).pandas().xyxy
+    for frame, dataframe, actual in zip(frames, dataframes, annotated):
+        expected = draw_dataframe(frame.copy(), filter_dataframe(dataframe, conf_threshold, classes))
+        np.testing.assert_array_equal(actual, expected)
+    if conf_threshold is None and classes is None:
+        # The boxes were drawn, not just both paths drawing nothing
+        assert not np.array_equal(annotated[-1], frames[-1])
+
+
+def test_filter_detections():
+    detections = np.array([[0, 0, 1, 1, 0.3, 0], [0, 0, 1, 1, 0.6, 1], [0, 0, 1, 1, 0.9, 2]], dtype=np.float32)
+    assert main.filter_detections(detections, conf_threshold=0.5)[:, 5].tolist() == [1, 2]
+    assert main.filter_detections(detections, classes={0, 2})[:, 5].tolist() == [0, 2]
+    assert main.filter_detections(detections, 0.5, {0, 2})[:, 5].tolist() == [2]
+    assert main.filter_detections(detections[:0], 0.5, {0}).shape == (0, 6)
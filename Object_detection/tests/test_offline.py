@@ -0,0 +1,182 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+import detector
+import offline
+
+
+class Tensor:
+    def __init__(self, array):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array.copy()
+
+
+class StubDetector:
+    """One box at (1, 2, 11, 12) in every image it is given, class 0 with 0.9 confidence,
+    plus a class 1 box whose confidence is the frame's top-left pixel value / 255"""
+    names = {0: 'person', 1: 'car'}
+
+    def __init__(self):
+        self.shapes = []
+
+    def __call__(self, rgb_frames):
+        self.shapes.extend(frame.shape for frame in rgb_frames)
+
+        class Results:
+            xyxy = [Tensor(np.array([[1, 2, 11, 12, 0.9, 0],
+                                     [0, 0, 4, 4, frame[0, 0, 0] / 255, 1]], dtype=np.float32))
+                    for frame in rgb_frames]
+        return Results()
+
+
+@pytest.fixture
+def stub_detector():
+    stub = StubDetector()
+    detector.set_detector(stub)
+    yield stub
+    detector.set_detector(None)
+
+
+def write_video(path, num_frames=20, size=(64, 48)):
+    """Frame i is filled with the value 10 * i, so the stub's class 1 confidence encodes the frame index"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 10, size)
+    for i in range(num_frames):
+        writer.write(np.full((size[1], size[0], 3), i * 10, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def read_jsonl(path):
+    with open(path) as file:
+        return [json.loads(line) for line in file]
+
+
+@pytest.mark.parametrize('total, parts, stride, expected', [
+    (100, 4, 1, [(0, 25), (25, 50), (50, 75), (75, 100)]),
+    (100, 4, 3, [(0, 27), (27, 54), (54, 81), (81, 100)]),
+    (10, 4, 1, [(0, 3), (3, 6), (6, 9), (9, 10)]),
+    (3, 8, 1, [(0, 1), (1, 2), (2, 3)]),
+    (7, 2, 5, [(0, 5), (5, 7)]),
+])
+def test_split_frame_range(total, parts, stride, expected):
+    ranges = offline.split_frame_range(total, parts, stride)
+    assert ranges == expected
+    # Contiguous, and every part starts on the stride grid
+    assert all(start % stride == 0 for start, _ in ranges)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+
+
+def test_stride_and_range_boundaries(tmp_path, stub_detector):
+    video = write_video(tmp_path / 'clip.avi')
+    out = str(tmp_path / 'range.jsonl')
+    processed = offline.process_video_range(video, detections_out=out, start=4, end=13, stride=3)
+    assert processed == 3
+    assert [record['frame'] for record in read_jsonl(out)] == [4, 7, 10]
+
+    out = str(tmp_path / 'tail.jsonl')
+    assert offline.process_video_range(video, detections_out=out, start=15, stride=2) == 3
+    assert [record['frame'] for record in read_jsonl(out)] == [15, 17, 19]
+
+
+def test_jsonl_writer_output(tmp_path, stub_detector):
+    path = str(tmp_path / 'detections.jsonl')
+    with offline.DetectionWriter(path) as writer:
+        writer.write('clip.mp4', 3, np.array([[1.26, 2, 11, 12, 0.91234, 0], [0, 0, 4, 4, 0.5, 1]], dtype=np.float32))
+        writer.write('clip.mp4', 4, np.zeros((0, 6), dtype=np.float32))
+    first, second = read_jsonl(path)
+    assert first == {'source': 'clip.mp4', 'frame': 3, 'boxes': [[1.3, 2.0, 11.0, 12.0], [0.0, 0.0, 4.0, 4.0]],
+                     'confidences': [0.9123, 0.5], 'class_ids': [0, 1], 'names': ['person', 'car']}
+    assert second['boxes'] == [] and second['names'] == []
+
+
+def test_parquet_writer_output(tmp_path, stub_detector):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'detections.parquet')
+    # A small row group size also exercises the flushes between frames
+    with offline.DetectionWriter(path, row_group_size=2) as writer:
+        for frame in range(3):
+            writer.write('clip.mp4', frame, np.array([[frame, 2, 11, 12, 0.9, 0], [0, 0, 4, 4, 0.5, 1]],
+                                                     dtype=np.float32))
+    table = pq.read_table(path).to_pydict()
+    assert table['frame'] == [0, 0, 1, 1, 2, 2]
+    assert table['xmin'] == [0.0, 0.0, 1.0, 0.0, 2.0, 0.0]
+    assert table['name'] == ['person', 'car'] * 3
+    assert table['class_id'] == [0, 1] * 3
+    assert set(table) == set(offline.DetectionWriter.PARQUET_COLUMNS)
+
+
+def test_roi_boxes_map_back_to_the_full_frame(stub_detector):
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    (detections,) = offline.detect_frames([frame], roi=(20, 10, 30, 25))
+    assert stub_detector.shapes == [(25, 30, 3)]
+    np.testing.assert_allclose(detections[0, :4], [21, 12, 31, 22])
+
+
+def test_roi_is_clipped_to_the_frame(stub_detector):
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    (detections,) = offline.detect_frames([frame], roi=(50, -5, 100, 20))
+    assert stub_detector.shapes == [(15, 14, 3)]
+    np.testing.assert_allclose(detections[0, :4], [51, 2, 61, 12])
+
+
+def test_roi_outside_the_frame_is_rejected(stub_detector):
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    with pytest.raises(ValueError, match='outside the 64x48 frame'):
+        offline.detect_frames([frame], roi=(100, 0, 10, 10))
+    assert stub_detector.shapes == []
+
+
+def test_process_video_rejects_an_roi_outside_the_video(tmp_path, stub_detector):
+    video = write_video(tmp_path / 'clip.avi')
+    with pytest.raises(ValueError, match='outside'):
+        offline.process_video(video, detections_out=str(tmp_path / 'd.jsonl'), roi=(0, 100, 10, 10))
+
+
+def test_unreadable_images_are_skipped(tmp_path, stub_detector):
+    images = tmp_path / 'images'
+    images.mkdir()
+    cv2.imwrite(str(images / 'a.png'), np.zeros((48, 64, 3), dtype=np.uint8))
+    (images / 'b.jpg').write_bytes(b'not an image')
+    cv2.imwrite(str(images / 'c.png'), np.zeros((20, 20, 3), dtype=np.uint8))
+    out = tmp_path / 'annotated'
+    detections = str(tmp_path / 'detections.jsonl')
+
+    # c.png is too small for the ROI, b.jpg cannot be read
+    processed = offline.process_images(str(images), str(out), detections, roi=(30, 0, 20, 20), batch_size=8)
+    assert processed == 1
+    assert [record['source'] for record in read_jsonl(detections)] == [str(images / 'a.png')]
+    assert sorted(p.name for p in out.iterdir()) == ['a.png']
+
+
+@pytest.mark.parametrize('extension', ['.jsonl', '.parquet'])
+def test_part_files_are_joined_in_frame_order(tmp_path, stub_detector, extension):
+    if extension == '.parquet':
+        pq = pytest.importorskip('pyarrow.parquet')
+    video = write_video(tmp_path / 'clip.avi')
+    output = str(tmp_path / f'detections{extension}')
+    ranges = offline.split_frame_range(20, 3, stride=2)
+    parts = [offline.part_path(output, i) for i in range(len(ranges))]
+    # What each worker process does, in reverse to show the order comes from the part list
+    for (start, end), part in reversed(list(zip(ranges, parts))):
+        offline.process_video_range(video, detections_out=part, start=start, end=end, stride=2)
+    offline.concat_detections(parts, output)
+
+    if extension == '.jsonl':
+        records = read_jsonl(output)
+        frames = [record['frame'] for record in records]
+        # The stub's class 1 confidence is the pixel value, 10 * the frame index
+        encoded = [round(record['confidences'][1] * 255 / 10) for record in records]
+    else:
+        table = pq.read_table(output).to_pydict()
+        frames = table['frame'][::2]
+        encoded = [round(confidence * 255 / 10) for confidence in table['confidence'][1::2]]
+    assert frames == list(range(0, 20, 2))
+    assert encoded == frames
@@ -0,0 +1,57 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from pipeline import VideoPipeline
+
+
+def write_video(path, num_frames=20, size=(64, 48)):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 10, size)
+    for i in range(num_frames):
+        writer.write(np.full((size[1], size[0], 3), i * 10 % 255, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def run_with_timeout(pipeline, timeout=10):
+    """run() in a thread; returns (stats, error) or fails the test if it hangs"""
+    result = {}
+
+    def target():
+        try:
+            result['stats'] = pipeline.run()
+        except Exception as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "VideoPipeline.run() hung"
+    return result.get('stats'), result.get('error')
+
+
+def test_headless_run_renders_every_frame_in_order(tmp_path):
+    video = write_video(tmp_path / 'clip.avi')
+    seen = []
+    pipeline = VideoPipeline(video, lambda frames: frames, sink=lambda frame, index, stats: seen.append(index),
+                             workers=2, batch_size=3, queue_size=2)
+    stats, error = run_with_timeout(pipeline)
+    assert error is None
+    assert seen == list(range(20))
+    assert stats.frames == 20
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_detector_error_stops_run_and_is_reraised(tmp_path, workers):
+    video = write_video(tmp_path / 'clip.avi', num_frames=50)
+
+    def failing_detector(frames):
+        raise RuntimeError("detector unavailable")
+
+    # A small queue keeps the decoder blocked on put() when the worker dies
+    pipeline = VideoPipeline(video, failing_detector, workers=workers, batch_size=2, queue_size=2)
+    _, error = run_with_timeout(pipeline)
+    assert isinstance(error, RuntimeError)
+    assert str(error) == "detector unavailable"
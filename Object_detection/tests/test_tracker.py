@@ -0,0 +1,154 @@
+import numpy as np
+import pytest
+
+from tracker import BoxTracker, KeyframeScheduler, KeyframeDetector, iou_matrix
+
+
+def detections(*rows):
+    """(N, 6) detections from (xmin, ymin, xmax, ymax, confidence, class id) rows"""
+    return np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+
+def moving_box(frame, class_id=0, speed=(2.0, 1.0)):
+    """A 20x10 box moving `speed` pixels per frame"""
+    x, y = 10 + speed[0] * frame, 20 + speed[1] * frame
+    return (x, y, x + 20, y + 10, 0.9, class_id)
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10]], dtype=np.float32)
+    np.testing.assert_allclose(iou_matrix(a, b), [[1.0, 50 / 150], [0.0, 0.0]])
+
+
+def test_track_follows_constant_velocity():
+    tracker = BoxTracker()
+    tracker.update(detections(moving_box(0)), 0)
+    tracker.update(detections(moving_box(2)), 2)
+    np.testing.assert_allclose(tracker.velocities, [[2, 1, 2, 1]])
+
+    # Between keyframes the box is extrapolated
+    np.testing.assert_allclose(tracker.predict(5), detections(moving_box(5)), atol=1e-4)
+
+    # Far from the last keyframe but where it was predicted: matched, still one track
+    tracker.update(detections(moving_box(10)), 10)
+    assert len(tracker.detections) == 1
+    assert tracker.hits.tolist() == [2]
+    np.testing.assert_allclose(tracker.predict(12), detections(moving_box(12)), atol=1e-4)
+
+
+def test_velocity_is_smoothed_after_the_first_match():
+    tracker = BoxTracker(smoothing=0.5)
+    tracker.update(detections(moving_box(0)), 0)
+    tracker.update(detections(moving_box(1)), 1)
+    # Speeds up to 4 px/frame in x: the estimate moves halfway
+    tracker.update(detections((16, 22, 36, 32, 0.9, 0)), 2)
+    np.testing.assert_allclose(tracker.velocities, [[3, 1, 3, 1]])
+
+
+def test_detections_of_another_class_start_new_tracks():
+    tracker = BoxTracker(max_misses=1)
+    tracker.update(detections(moving_box(0, class_id=0)), 0)
+    tracked = tracker.update(detections(moving_box(1, class_id=1)), 1)
+    # The class-1 box is new (no velocity); the class-0 track coasts
+    assert sorted(tracked[:, 5].tolist()) == [0, 1]
+    assert tracker.misses.tolist() == [0, 1]
+    np.testing.assert_allclose(tracker.velocities, 0)
+
+
+def test_greedy_matching_prefers_the_highest_overlap():
+    tracker = BoxTracker(iou_threshold=0.1)
+    tracker.update(detections((0, 0, 10, 10, 0.9, 0), (8, 0, 18, 10, 0.9, 0)), 0)
+    # One detection overlapping both tracks, the second track far more
+    tracker.update(detections((8, 0, 18, 10, 0.8, 0)), 1)
+    # The second track was matched (no velocity); the first one coasts
+    assert tracker.misses.tolist() == [0, 1]
+    np.testing.assert_allclose(tracker.detections[1, :4], [0, 0, 10, 10])
+
+
+def test_tracks_expire_after_max_misses():
+    tracker = BoxTracker(max_misses=2)
+    tracker.update(detections(moving_box(0)), 0)
+    tracker.update(detections(moving_box(1)), 1)
+
+    coasted = tracker.update(detections(), 2)
+    np.testing.assert_allclose(coasted, detections(moving_box(2)), atol=1e-4)
+    assert len(tracker.update(detections(), 3)) == 1
+    assert len(tracker.update(detections(), 4)) == 0
+
+
+def make_scheduler(**kwargs):
+    # smoothing=1: the averages are the latest measurement
+    return KeyframeScheduler(target_fps=10, smoothing=1.0, **kwargs)
+
+
+def run_frames(scheduler, inference, tracking, frames):
+    keyframes = []
+    for _ in range(frames):
+        keyframe = scheduler.is_keyframe()
+        keyframes.append(keyframe)
+        scheduler.record(keyframe, inference if keyframe else tracking)
+    return keyframes
+
+
+def test_scheduler_detects_every_frame_when_inference_fits_the_budget():
+    scheduler = make_scheduler()
+    assert all(run_frames(scheduler, inference=0.05, tracking=0.01, frames=5))
+    assert scheduler.interval == 1
+
+
+def test_scheduler_lengthens_and_shortens_the_interval_with_costs():
+    scheduler = make_scheduler()
+    # 0.5 s detections and 10 ms tracking in a 100 ms frame budget:
+    # ceil((0.5 - 0.01) / (0.1 - 0.01)) = 6 (5 until a tracked frame is measured)
+    keyframes = run_frames(scheduler, inference=0.5, tracking=0.01, frames=13)
+    assert scheduler.interval == 6
+    assert [i for i, keyframe in enumerate(keyframes) if keyframe] == [0, 6, 12]
+
+    # Inference got faster: back to a detection on every frame
+    run_frames(scheduler, inference=0.05, tracking=0.01, frames=8)
+    assert scheduler.interval == 1
+
+
+def test_scheduler_interval_is_clamped():
+    scheduler = make_scheduler(max_interval=4)
+    run_frames(scheduler, inference=2.0, tracking=0.01, frames=3)
+    assert scheduler.interval == 4
+    # Tracking alone over budget
+    run_frames(scheduler, inference=0.05, tracking=0.2, frames=3)
+    assert scheduler.interval == 4
+
+
+class FakeDetector:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, frames):
+        index = frames[0]['index']
+        self.calls.append(index)
+        return [detections(moving_box(index))]
+
+
+def test_keyframe_detector_detects_on_keyframes_and_tracks_between():
+    detector = FakeDetector()
+    drawn = []
+    scheduler = KeyframeScheduler(target_fps=10, min_interval=3, max_interval=3)
+    keyframe_detector = KeyframeDetector(detector, lambda frame, boxes: (frame['index'], boxes.copy()),
+                                         target_fps=10, scheduler=scheduler)
+
+    frames = [{'index': i} for i in range(8)]
+    drawn.extend(keyframe_detector(frames[:5]))
+    drawn.extend(keyframe_detector(frames[5:]))
+
+    assert detector.calls == [0, 3, 6]
+    assert (keyframe_detector.frames, keyframe_detector.keyframes) == (8, 3)
+    assert [index for index, _ in drawn] == list(range(8))
+    # Frames 1-2 repeat frame 0 (no velocity yet); after frame 3 the box moves with the track
+    np.testing.assert_allclose(drawn[2][1], detections(moving_box(0)), atol=1e-4)
+    np.testing.assert_allclose(drawn[4][1], detections(moving_box(4)), atol=1e-4)
+    np.testing.assert_allclose(drawn[7][1], detections(moving_box(7)), atol=1e-4)
+
+
+@pytest.mark.parametrize('frames', [0, 1])
+def test_tracker_with_no_tracks(frames):
+    assert BoxTracker().predict(frames).shape == (0, 6)
@@ -0,0 +1,164 @@
+import math
+import time
+
+import numpy as np
+
+# Same row layout as main.py's detections: xmin, ymin, xmax, ymax, confidence, class id
+BOX = slice(0, 4)
+CONFIDENCE, CLASS_ID = 4, 5
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU of two (N, 4) and (M, 4) xyxy box arrays -> (N, M)"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return intersection / np.maximum(union, 1e-9)
+
+
+class BoxTracker:
+    """Carries detections forward between keyframes with a constant-velocity model.
+
+    On a keyframe, new detections are matched to existing tracks greedily by
+    IoU (same class only) against where the tracks are predicted to be, and
+    each matched track's per-frame velocity is re-estimated. Unmatched
+    detections start new tracks; tracks that miss more than `max_misses`
+    keyframes in a row are dropped.
+    """
+    def __init__(self, iou_threshold=0.3, max_misses=1, smoothing=0.5):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.smoothing = smoothing
+        self.detections = np.zeros((0, 6), dtype=np.float32)  # at the last keyframe
+        self.velocities = np.zeros((0, 4), dtype=np.float32)  # box change per frame
+        self.misses = np.zeros(0, dtype=int)
+        self.hits = np.zeros(0, dtype=int)  # keyframes each track was matched on
+        self.keyframe = 0
+
+    def predict(self, frame_index):
+        """Tracked boxes extrapolated to `frame_index`, as a detections array"""
+        predicted = self.detections.copy()
+        predicted[:, BOX] += self.velocities * (frame_index - self.keyframe)
+        return predicted
+
+    def _match(self, predicted, detections):
+        """Greedy highest-IoU-first matching; returns [(track, detection)]"""
+        if not len(predicted) or not len(detections):
+            return []
+        iou = iou_matrix(predicted[:, BOX], detections[:, BOX])
+        iou[predicted[:, None, CLASS_ID] != detections[None, :, CLASS_ID]] = 0
+        order = np.argsort(-iou, axis=None)
+        matches = []
+        used_tracks, used_detections = set(), set()
+        for flat, overlap in zip(order.tolist(), iou.flat[order].tolist()):
+            if overlap < self.iou_threshold:
+                break
+            track, detection = divmod(flat, iou.shape[1])
+            if track in used_tracks or detection in used_detections:
+                continue
+            matches.append((track, detection))
+            used_tracks.add(track)
+            used_detections.add(detection)
+        return matches
+
+    def update(self, detections, frame_index):
+        """Feed the detections of a keyframe; returns every tracked box at that frame"""
+        elapsed = max(frame_index - self.keyframe, 1)
+        predicted = self.predict(frame_index)
+        matches = self._match(predicted, detections)
+
+        velocities = np.zeros((len(detections), 4), dtype=np.float32)
+        hits = np.zeros(len(detections), dtype=int)
+        matched_tracks = np.zeros(len(predicted), dtype=bool)
+        for track, detection in matches:
+            measured = (detections[detection, BOX] - self.detections[track, BOX]) / elapsed
+            if self.hits[track]:
+                measured = self.smoothing * measured + (1 - self.smoothing) * self.velocities[track]
+            velocities[detection] = measured
+            hits[detection] = self.hits[track] + 1
+            matched_tracks[track] = True
+
+        # Tracks that missed this keyframe keep coasting until max_misses
+        misses = self.misses + 1
+        coasting = ~matched_tracks & (misses <= self.max_misses)
+        self.detections = np.concatenate([detections, predicted[coasting]])
+        self.velocities = np.concatenate([velocities, self.velocities[coasting]])
+        self.misses = np.concatenate([np.zeros(len(detections), dtype=int), misses[coasting]])
+        self.hits = np.concatenate([hits, self.hits[coasting]])
+        self.keyframe = frame_index
+        return self.detections
+
+
+class KeyframeScheduler:
+    """Chooses how many frames pass between full detections to hold `target_fps`.
+
+    With inference taking L seconds and a tracked frame c seconds, an
+    interval of k frames takes L + (k - 1) c, which fits the k / target_fps
+    budget once k >= (L - c) / (1 / target_fps - c). Both costs are
+    exponentially averaged, so the interval follows load changes.
+    """
+    def __init__(self, target_fps, min_interval=1, max_interval=30, smoothing=0.2):
+        self.target_fps = target_fps
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.smoothing = smoothing
+        self.inference_time = None
+        self.tracking_time = 0.0
+        self.interval = min_interval
+        self._since_keyframe = None
+
+    def _average(self, current, sample):
+        return sample if current is None else current + self.smoothing * (sample - current)
+
+    def is_keyframe(self):
+        return self._since_keyframe is None or self._since_keyframe >= self.interval
+
+    def record(self, keyframe, seconds):
+        """Account for one processed frame and update the interval"""
+        if keyframe:
+            self.inference_time = self._average(self.inference_time, seconds)
+            self._since_keyframe = 1
+        else:
+            self.tracking_time = self._average(self.tracking_time, seconds)
+            self._since_keyframe += 1
+
+        budget = 1.0 / self.target_fps - self.tracking_time
+        if budget <= 0:
+            interval = self.max_interval
+        else:
+            interval = math.ceil((self.inference_time - self.tracking_time) / budget)
+        self.interval = min(max(interval, self.min_interval), self.max_interval)
+
+
+class KeyframeDetector:
+    """Frame-batch callable for VideoPipeline: detects on keyframes, tracks in between.
+
+    `detect_fn(frames)` returns one detections array per frame and
+    `draw_fn(frame, detections)` annotates a frame. Frames must arrive in
+    order, so run the pipeline with a single inference worker.
+    """
+    def __init__(self, detect_fn, draw_fn, target_fps, tracker=None, scheduler=None):
+        self.detect_fn = detect_fn
+        self.draw_fn = draw_fn
+        self.tracker = tracker or BoxTracker()
+        self.scheduler = scheduler or KeyframeScheduler(target_fps)
+        self.frames = 0
+        self.keyframes = 0
+
+    def __call__(self, frames):
+        annotated = []
+        for frame in frames:
+            start = time.perf_counter()
+            keyframe = self.scheduler.is_keyframe()
+            if keyframe:
+                detections = self.tracker.update(self.detect_fn([frame])[0], self.frames)
+                self.keyframes += 1
+            else:
+                detections = self.tracker.predict(self.frames)
+            annotated.append(self.draw_fn(frame, detections))
+            self.scheduler.record(keyframe, time.perf_counter() - start)
+            self.frames += 1
+        return annotated